@@ -0,0 +1,40 @@
+"""Configuration of the performance benchmarks
+
+The benchmarks rely on pytest-benchmark. To record the baseline, run:
+
+    pdm bench_baseline
+
+and to compare the current tree with it (failing on regressions), run:
+
+    pdm bench
+
+"""
+import matplotlib
+import numpy as np
+import pytest
+
+matplotlib.use("Agg")
+
+#: Sizes of the rendered lines
+NPOINTS = [10**k for k in range(3, 9)]
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--bench-max-points",
+        action="store",
+        type=float,
+        default=1e6,
+        help="Largest number of points used in the rendering benchmarks (up to 1e8)",
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "npoints" in metafunc.fixturenames:
+        max_points = metafunc.config.getoption("--bench-max-points")
+        metafunc.parametrize("npoints", [n for n in NPOINTS if n <= max_points])
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(seed=45)
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from soyut.utils import getUnitAbbrev
+from soyut.frontend.BFigure import BFigure
+from soyut.frontend.GHistogram import GHistogram
+from soyut.frontend.GPlottable import GPlottable, GVariable
+from soyut.frontend.Plottable import PlottableFactory
+
+NS = 100_000
+
+
+def _inputs():
+    x = np.arange(NS, dtype=np.float64)
+    y = np.sin(x)
+    df = pd.DataFrame({"t": x, "y": y})
+    hist = GHistogram(vmin=-1, vmax=1, nbins=100)
+    hist.update(y)
+    return {
+        "ndarray": y,
+        "list": list(y[:1000]),
+        "series": pd.Series(y),
+        "tuple_arrays": (x, y),
+        "tuple_dicts": ({"data": x, "name": "t", "unit": "s"}, {"data": y, "name": "y"}),
+        "tuple_dataframe": (df, "t", "y"),
+        "histogram": hist,
+    }
+
+
+INPUTS = _inputs()
+
+
+@pytest.mark.parametrize("kind", list(INPUTS.keys()))
+def test_factory_create(benchmark, kind):
+    mline = INPUTS[kind]
+    benchmark.group = "PlottableFactory.create"
+    res = benchmark(PlottableFactory.create, mline, name=kind, kwargs={})
+    assert res is not None
+
+
+@pytest.mark.parametrize("xkind", ["numeric", "timedelta"])
+@pytest.mark.parametrize("cache", ["cold", "warm"])
+def test_make_line(benchmark, xkind, cache):
+    if xkind == "numeric":
+        x = np.arange(NS, dtype=np.float64)
+    else:
+        x = pd.to_timedelta(np.arange(NS), unit="s").to_numpy()
+    y = np.sin(np.arange(NS, dtype=np.float64))
+
+    def setup():
+        gp = GPlottable(name="line", xvar=GVariable(data=x), yvar=GVariable(data=y))
+        if cache == "warm":
+            gp.make_line()
+        return (gp,), {}
+
+    benchmark.group = "GPlottable.make_line"
+    benchmark.pedantic(lambda gp: gp.make_line(), setup=setup, rounds=50)
+
+
+@pytest.mark.parametrize("samp", [1.5e-3, 13.6, 90.0, 1e7])
+@pytest.mark.parametrize("unit", ["s", "m"])
+def test_getUnitAbbrev(benchmark, samp, unit):
+    benchmark.group = "getUnitAbbrev"
+    benchmark(getUnitAbbrev, samp, unit)
+
+
+@pytest.mark.parametrize("naxes", [10, 100, 1000])
+def test_figure_construction(benchmark, naxes):
+    x = np.arange(100, dtype=np.float64)
+
+    def build():
+        fig = BFigure("Benchmark")
+        gs = fig.add_gridspec(nrows=naxes, ncols=1)
+        first = None
+        for k in range(naxes):
+            axe = fig.add_axe(f"Axe {k}", spec=gs[k, 0], sharex=first)
+            axe.plot((x, x))
+            first = first or axe
+        first.set_xlim(0, 50)
+        return fig
+
+    benchmark.group = "BFigure construction"
+    fig = benchmark(build)
+    assert len(fig.list_axes) == naxes
+
+
+MAKE_LINE_OPTIONS = {
+    "none": {},
+    "gaps": dict(max_dt=5.0),
+    "gaps+decimation": dict(max_dt=5.0, max_points=2000),
+}
+
+
+@pytest.mark.parametrize("options", list(MAKE_LINE_OPTIONS))
+def test_make_line_gaps(benchmark, options):
+    # Irregular sampling with a dropout every 1000 samples
+    x = np.cumsum(np.where(np.arange(NS) % 1000 == 0, 10.0, 1.0))
+    gp = GPlottable(name="gaps", xvar=GVariable(data=x), yvar=GVariable(data=np.sin(x)))
+
+    benchmark.group = "GPlottable.make_line with gaps"
+    benchmark(gp.make_line, **MAKE_LINE_OPTIONS[options])
+
+
+@pytest.mark.parametrize("window", ["full", "1%"])
+def test_make_line_window(benchmark, window):
+    x = np.arange(100 * NS, dtype=np.float64)
+    gp = GPlottable(name="zoom", xvar=GVariable(data=x), yvar=GVariable(data=np.sin(x)))
+    gp.xvar.monotonic
+    xbounds = None if window == "full" else (0.5 * len(x), 0.51 * len(x))
+
+    benchmark.group = "GPlottable.make_line of a zoomed view"
+    benchmark(gp.make_line, transform=np.abs, max_points=2000, xbounds=xbounds)
+
+
+@pytest.mark.parametrize("query", ["nearest", "corner", "in_box"])
+def test_spatial_index(benchmark, query):
+    from soyut.frontend.GSpatialIndex import GridIndex
+
+    rng = np.random.default_rng(seed=7)
+    x, y = rng.normal(size=(2, 100 * NS))
+    idx = GridIndex(x, y)
+
+    benchmark.group = "Scatter spatial index (1e7 points)"
+    if query == "nearest":
+        benchmark(idx.nearest, 0.3, -0.2)
+    elif query == "corner":
+        # In an empty corner of the grid
+        benchmark(idx.nearest, x.min(), y.min())
+    else:
+        benchmark(idx.in_box, 0.0, 0.01, 0.0, 0.01)
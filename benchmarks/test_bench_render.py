@@ -0,0 +1,122 @@
+import io
+
+import numpy as np
+import pytest
+from matplotlib import pyplot as plt
+
+from soyut.frontend.BFigure import BFigure
+from soyut.frontend.GraphicSpec import FigureSpec
+from soyut.backend.MplRenderer import simple_mpl_renderer
+from soyut.backend.MplTemplate import FigureTemplate
+from soyut.backend.PlotlyRenderer import simple_plotly_renderer
+from soyut.backend.PlotlyDictRenderer import dict_plotly_renderer, figure_json
+
+
+def _make_figure(npoints: int) -> BFigure:
+    t = np.linspace(0, 10, npoints)
+    y = np.sin(2 * np.pi * t) * 1e-3
+
+    fig = BFigure("Benchmark")
+    gs = fig.add_gridspec(nrows=2, ncols=1)
+    axe = fig.add_axe("Line", spec=gs[0, 0])
+    axe.plot(({"data": t, "name": "Time", "unit": "s"}, {"data": y, "name": "Y", "unit": "m"}))
+    axe = fig.add_axe("Histogram", spec=gs[1, 0])
+    axe.hist(y, vmin=-1e-3, vmax=1e-3, nbins=100)
+
+    return fig
+
+
+def test_render_mpl(benchmark, npoints):
+    fig = _make_figure(npoints)
+
+    def render():
+        mfig = simple_mpl_renderer(fig, show=False)
+        buf = io.BytesIO()
+        mfig.savefig(buf, format="png")
+        plt.close(mfig)
+        return buf
+
+    benchmark.group = "render mpl"
+    benchmark.pedantic(render, rounds=3, iterations=1)
+
+
+def test_render_plotly(benchmark, npoints):
+    fig = _make_figure(npoints)
+
+    def render():
+        pfig = simple_plotly_renderer(fig, show=False)
+        return pfig.to_json()
+
+    benchmark.group = "render plotly"
+    benchmark.pedantic(render, rounds=3, iterations=1)
+
+
+@pytest.mark.parametrize("raw", [False, True])
+def test_render_plotly_traces(benchmark, raw):
+    t = np.linspace(0, 1, 1000)
+    fig = BFigure("Traces")
+    gs = fig.add_gridspec(nrows=2, ncols=2)
+    for k in range(4):
+        axe = fig.add_axe(f"Axe {k}", spec=gs[k // 2, k % 2])
+        for j in range(75):
+            axe.plot((t, np.sin(j * t)))
+
+    def render():
+        if raw:
+            return figure_json(dict_plotly_renderer(fig))
+        return simple_plotly_renderer(fig, show=False).to_json()
+
+    benchmark.group = "300 traces plotly"
+    benchmark.pedantic(render, rounds=3, iterations=1)
+
+
+def test_render_spec_mpl(benchmark, npoints):
+    spec = FigureSpec.specForOneAxeMultiLines([{"var": "y"}])
+    t = np.linspace(0, 10, npoints)
+    runs = [{"t": t, "y": np.sin(2 * np.pi * t) * 10.0**-k} for k in range(3)]
+
+    def render():
+        for data in runs:
+            fig = BFigure.from_spec(spec, data)
+            mfig = simple_mpl_renderer(fig, show=False)
+            buf = io.BytesIO()
+            mfig.savefig(buf, format="png")
+
+    benchmark.group = "spec runs mpl"
+    benchmark.pedantic(render, rounds=3, iterations=1)
+
+
+def test_render_template_mpl(benchmark, npoints):
+    spec = FigureSpec.specForOneAxeMultiLines([{"var": "y"}])
+    t = np.linspace(0, 10, npoints)
+    runs = [{"t": t, "y": np.sin(2 * np.pi * t) * 10.0**-k} for k in range(3)]
+    tpl = FigureTemplate(spec)
+
+    def render():
+        for data in runs:
+            tpl.render(data)
+
+    benchmark.group = "spec runs mpl"
+    benchmark.pedantic(render, rounds=3, iterations=1)
+
+
+@pytest.mark.parametrize("batched", [False, True])
+def test_render_channels_mpl(benchmark, batched):
+    t = np.linspace(0, 1, 500)
+    channels = np.sin(np.arange(500)[:, None] * t)
+
+    def render():
+        fig = BFigure("Channels")
+        gs = fig.add_gridspec(nrows=1, ncols=1)
+        axe = fig.add_axe("Channels", spec=gs[0, 0])
+        if batched:
+            axe.plot_lines(channels.T, x=t)
+        else:
+            for ch in channels:
+                axe.plot((t, ch))
+        mfig = simple_mpl_renderer(fig, show=False)
+        buf = io.BytesIO()
+        mfig.savefig(buf, format="png")
+
+    benchmark.group = "500 channels mpl"
+    benchmark.pedantic(render, rounds=3, iterations=1)
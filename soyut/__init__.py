@@ -32,6 +32,33 @@ Once the tests ran, the reports are generated. See the links below:
 
 [See coverage](../coverage/index.html)
 
+# Benchmarks
+
+The benchmarks in the benchmarks folder time each stage of the pipeline,
+from `soyut.frontend.Plottable.PlottableFactory` to the rendering by the backends.
+To record the baseline results, run:
+
+    pdm bench_baseline
+
+Then, to compare the current tree with the baseline, run:
+
+    pdm bench
+
+which fails if the mean time of a benchmark regressed by more than 15%.
+The rendering benchmarks use up to 1e6 points by default. Add `--bench-max-points=1e8`
+to the pytest command line to go up to 1e8 points.
+
+# Instrumentation
+
+To know where the time goes when rendering a figure, set the SOYUT_TRACE environment variable
+to the path of a JSON file, or use the `soyut.instrumentation.trace` context manager.
+The timings of each stage (data conversion, unit scaling, artist creation, file writing),
+per axe and per plottable, are then written as a structured JSON trace and as a Chrome
+trace-event file, and a summary table is logged.
+
+Set SOYUT_TRACE_MEMORY=1 (or use `trace(memory=True)`) to also record the memory high-water
+mark of each stage and of each figure, and to flag the copies of plottable data.
+
 # Building distribution
 
 The following command builds a wheel file in the dist folder:
@@ -57,6 +84,14 @@ logger.setLevel(os.environ.get("LOGLEVEL", "info").upper())
 stream_handler = RichHandler()
 logger.addHandler(stream_handler)
 
+if os.environ.get("SOYUT_TRACE", "") != "":
+    from .instrumentation import _enable_from_env
+
+    _enable_from_env(
+        os.environ["SOYUT_TRACE"],
+        memory=os.environ.get("SOYUT_TRACE_MEMORY", "0").lower() in ("1", "true", "yes"),
+    )
+
 
 def get_soyut_version() -> str:
     import importlib.metadata as im
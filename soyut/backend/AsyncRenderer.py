@@ -0,0 +1,291 @@
+"""Rendering of BFigure from asyncio code
+
+"""
+import io
+import asyncio
+import typing as T
+from pathlib import Path
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from .. import logger
+from ..frontend.BFigure import BFigure
+from .SharedTransport import SharedArrayTransport
+
+__all__ = ["RenderQueueFull", "AsyncRenderer", "render_to_bytes", "export_figure"]
+
+
+class RenderQueueFull(Exception):
+    """Raised when too many rendering requests are already waiting"""
+
+    pass
+
+
+def render_to_bytes(fig: BFigure, backend: str = "mpl", format: str = "png") -> bytes:
+    """Renders a BFigure into an in-memory file
+
+    Args:
+        fig: The BFigure to render
+        backend: 'mpl', 'plotly', or 'plotly-dict'
+            (see `soyut.backend.PlotlyDictRenderer.dict_plotly_renderer`)
+        format: Format of the file: an image format supported by the backend,
+            or 'html' and 'json' for plotly
+
+    Returns:
+        The content of the file
+
+    """
+    if backend == "mpl":
+        from .MplRenderer import simple_mpl_renderer
+
+        mfig = simple_mpl_renderer(fig, show=False)
+        buf = io.BytesIO()
+        mfig.savefig(buf, format=format)
+        return buf.getvalue()
+
+    elif backend == "plotly":
+        from .PlotlyRenderer import simple_plotly_renderer
+
+        pfig = simple_plotly_renderer(fig, show=False)
+        if format == "html":
+            return pfig.to_html().encode("utf-8")
+        elif format == "json":
+            return pfig.to_json().encode("utf-8")
+        else:
+            return pfig.to_image(format=format)
+
+    elif backend == "plotly-dict":
+        from .PlotlyDictRenderer import figure_json, dict_plotly_renderer, figure_html
+
+        fdict = dict_plotly_renderer(fig, show=False)
+        if format == "html":
+            return figure_html(fdict).encode("utf-8")
+        elif format == "json":
+            return figure_json(fdict).encode("utf-8")
+        else:
+            import plotly.io as pio
+
+            return pio.to_image(fdict, format=format)
+
+    else:
+        raise ValueError(f"Unknown backend '{backend}'")
+
+
+def export_figure(fig: BFigure, path: Path, backend: str = "mpl") -> Path:
+    """Renders a BFigure into a file. The format is deduced from the suffix of path
+
+    Args:
+        fig: The BFigure to render
+        path: Path of the file to write
+        backend: 'mpl', 'plotly', or 'plotly-dict'
+
+    Returns:
+        The path of the written file
+
+    """
+    if backend == "mpl":
+        from .MplRenderer import simple_mpl_renderer
+
+        simple_mpl_renderer(fig, show=False, path=path)
+
+    elif backend == "plotly":
+        from .PlotlyRenderer import simple_plotly_renderer
+
+        simple_plotly_renderer(fig, show=False, path=path)
+
+    elif backend == "plotly-dict":
+        from .PlotlyDictRenderer import dict_plotly_renderer
+
+        dict_plotly_renderer(fig, show=False, path=path)
+
+    else:
+        raise ValueError(f"Unknown backend '{backend}'")
+
+    return Path(path)
+
+
+class AsyncRenderer(object):
+    """Renders BFigure objects without blocking the event loop.
+
+    The rendering jobs are offloaded to a thread or process pool.
+    At most *max_pending* jobs are submitted to the pool at the same time, and at most
+    *max_waiting* requests wait for a slot: the following ones are rejected with
+    `RenderQueueFull`, so that a burst of requests cannot accumulate without bound.
+
+    Each request can have a timeout, covering both the wait for a slot and the rendering.
+    When a request times out or is cancelled, its job is cancelled if it has not started yet.
+    A job already running in a thread or a process cannot be interrupted: it goes on,
+    keeps its slot until it finishes, and its result is discarded.
+
+    The figures are pickled to be sent to the processes of a process pool,
+    so the plotting options shall not hold lambda functions.
+    With *shared_memory*, the large arrays of the figures are placed once in shared memory
+    segments, and the processes read them without copy (see
+    `soyut.backend.SharedTransport.SharedArrayTransport`).
+
+    Args:
+        max_workers: Number of threads or processes of the pool
+        max_pending: Maximum number of jobs submitted to the pool
+        max_waiting: Maximum number of requests waiting for a slot. None for no limit
+        use_processes: True to use a process pool instead of a thread pool
+        timeout: Default timeout of the requests (s). None for no timeout
+        executor: An existing executor to use instead of creating a pool
+        shared_memory: True to send the arrays of the figures through shared memory.
+            By default, True with a process pool
+
+    Examples:
+        >>> async def handler(fig):
+        ...     async with AsyncRenderer(max_workers=2) as renderer:
+        ...         return await renderer.render(fig, format="svg", timeout=30)
+
+    """
+
+    __slots__ = [
+        "executor",
+        "max_pending",
+        "max_waiting",
+        "timeout",
+        "_own_executor",
+        "_semaphore",
+        "_waiting",
+        "_transport",
+    ]
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_pending: int = None,
+        max_waiting: int = 64,
+        use_processes: bool = False,
+        timeout: float = None,
+        executor: Executor = None,
+        shared_memory: bool = None,
+    ):
+        if shared_memory is None:
+            shared_memory = use_processes
+        self._transport = SharedArrayTransport() if shared_memory else None
+
+        if executor is None:
+            if use_processes:
+                executor = ProcessPoolExecutor(max_workers=max_workers)
+            else:
+                executor = ThreadPoolExecutor(
+                    max_workers=max_workers, thread_name_prefix="soyut-render"
+                )
+            self._own_executor = True
+        else:
+            self._own_executor = False
+
+        self.executor = executor
+        self.max_pending = max_workers if max_pending is None else max_pending
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self._semaphore: asyncio.Semaphore = None
+        self._waiting = 0
+
+    @property
+    def waiting(self) -> int:
+        """Number of requests waiting for a slot"""
+        return self._waiting
+
+    async def _submit(self, func: T.Callable, *args, timeout: float = None):
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+        sem = self._semaphore
+
+        if timeout is None:
+            timeout = self.timeout
+
+        deadline = None if timeout is None else loop.time() + timeout
+        if sem.locked():
+            if self.max_waiting is not None and self._waiting >= self.max_waiting:
+                raise RenderQueueFull(f"{self._waiting} rendering requests already waiting")
+            # Counted before the first await, so that a burst of requests sees the waiting ones
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(sem.acquire(), timeout)
+            finally:
+                self._waiting -= 1
+        else:
+            # Does not suspend, as a slot is free
+            await sem.acquire()
+
+        try:
+            if self._transport is None:
+                cfut = self.executor.submit(func, *args)
+            else:
+                cfut = self._transport.submit(self.executor, func, *args)
+        except BaseException:
+            sem.release()
+            raise
+
+        # The slot is freed when the job actually ends, even if the request was cancelled
+        cfut.add_done_callback(lambda _: loop.call_soon_threadsafe(sem.release))
+        remaining = None if deadline is None else max(deadline - loop.time(), 0.0)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(cfut), remaining)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            if not cfut.cancel():
+                logger.debug("Rendering job already running, its result will be discarded")
+            raise
+
+    async def render(
+        self, fig: BFigure, backend: str = "mpl", format: str = "png", timeout: float = None
+    ) -> bytes:
+        """Renders a BFigure into an in-memory file. See `render_to_bytes`
+
+        Args:
+            fig: The BFigure to render
+            backend: 'mpl' or 'plotly'
+            format: Format of the file
+            timeout: Timeout of the request (s). By default, the one given at creation
+
+        Returns:
+            The content of the file
+
+        Raises:
+            RenderQueueFull: if too many requests are waiting
+            asyncio.TimeoutError: if the request timed out
+
+        """
+        return await self._submit(render_to_bytes, fig, backend, format, timeout=timeout)
+
+    async def export(
+        self, fig: BFigure, path: Path, backend: str = "mpl", timeout: float = None
+    ) -> Path:
+        """Renders a BFigure into a file. See `export_figure`
+
+        Args:
+            fig: The BFigure to render
+            path: Path of the file to write
+            backend: 'mpl' or 'plotly'
+            timeout: Timeout of the request (s). By default, the one given at creation
+
+        Returns:
+            The path of the written file
+
+        Raises:
+            RenderQueueFull: if too many requests are waiting
+            asyncio.TimeoutError: if the request timed out
+
+        """
+        return await self._submit(export_figure, fig, path, backend, timeout=timeout)
+
+    def close(self, wait: bool = True):
+        """Shuts the pool down, if it was created by the AsyncRenderer
+
+        Args:
+            wait: True to wait for the running jobs
+
+        """
+        if self._own_executor:
+            self.executor.shutdown(wait=wait)
+        if self._transport is not None and (wait or self._own_executor):
+            self._transport.close()
+
+    async def __aenter__(self) -> "AsyncRenderer":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.close)
@@ -0,0 +1,236 @@
+"""Preparation of the data of a BFigure, before the drawing by a backend
+
+"""
+import os
+import threading
+import typing as T
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+
+from .. import logger
+from ..instrumentation import stage, annotate, annotate_arrays, flag_copy
+from ..utils import FloatArr, getUnitAbbrev, simplify_rdp
+from ..frontend.BAxe import ABaxe
+from ..frontend.BFigure import BFigure
+from ..frontend.GraphicSpec import DSPLineType
+from ..frontend.Plottable import APlottable, ViewWindow
+
+__all__ = [
+    "PreparedLine",
+    "prepare_plottable",
+    "prepare_figure",
+    "simplification_tolerance",
+    "simplify_line",
+]
+
+#: Default number of threads used by `prepare_figure`.
+#: Can be set with the SOYUT_PREPARE_WORKERS environment variable
+DEFAULT_WORKERS = int(os.environ.get("SOYUT_PREPARE_WORKERS", min(8, os.cpu_count() or 1)))
+
+#: Suffixes of the vector outputs, whose lines are simplified by default.
+#: Not the interactive HTML pages, where zooming in would reveal the simplification
+VECTOR_FORMATS = (".svg", ".svgz", ".pdf", ".eps", ".ps")
+
+#: Default tolerance of the simplification of the lines of vector outputs, in pixels
+DEFAULT_SIMPLIFY_TOLERANCE = 0.25
+
+
+@dataclass(init=True)
+class PreparedLine:
+    """Data of a plottable, ready to be drawn by a backend"""
+
+    #: The plottable the line comes from
+    plottable: APlottable
+    #: X coordinates, divided by xmult
+    xd: FloatArr
+    #: Y coordinates, divided by ymult
+    yd: FloatArr
+    #: Multiplier of the X coordinates
+    xmult: float
+    #: Multiplier of the Y coordinates
+    ymult: float
+    #: Label of the X axis, with name and unit
+    xlabel: str
+    #: Label of the Y axis, with name and unit
+    ylabel: str
+
+    @property
+    def name(self) -> str:
+        return self.plottable.name
+
+    @property
+    def line_type(self) -> DSPLineType:
+        return self.plottable.line_type
+
+
+_scaled_lock = threading.Lock()
+
+
+def _scale(a: FloatArr, mult: float, scaled: dict) -> T.Tuple[FloatArr, bool]:
+    # Divides a by mult, and tells if the result was already computed. The results are shared
+    # through scaled, so that an array used by several plottables (an interned GVariable)
+    # is scaled once
+    if mult == 1:
+        return a, False
+    if scaled is not None:
+        key = (id(a), mult)
+        with _scaled_lock:
+            entry = scaled.get(key, None)
+        if entry is not None and entry[0] is a:
+            return entry[1], True
+
+    res = a / mult
+    flag_copy("unit_scaling", a, res)
+    if scaled is not None:
+        with _scaled_lock:
+            scaled[key] = (a, res)
+    return res, False
+
+
+def prepare_plottable(
+    axe: ABaxe, plottable: APlottable, scaled: dict = None, view: ViewWindow = None
+) -> PreparedLine:
+    """Converts the data of a plottable and scales them to their display unit
+
+    Args:
+        axe: The axe where the plottable is drawn
+        plottable: The plottable to prepare
+        scaled: If given, cache of the scaled arrays, shared by the plottables of a figure
+        view: If given, part of the data to prepare, instead of the X limits of the axe.
+            The multipliers and the labels do not depend on it
+
+    Returns:
+        The prepared line
+
+    """
+    with stage("make_mline", axe=axe.title, plottable=plottable.name):
+        (
+            xd,
+            yd,
+            name_of_x_var,
+            unit_of_x_var,
+            name_of_y_var,
+            unit_of_y_var,
+        ) = plottable._make_mline(axe, view)
+        annotate_arrays(xd, yd, sources=plottable._sourceArrays())
+
+    with stage("unit_scaling", axe=axe.title, plottable=plottable.name):
+        xstats, ystats = plottable.getStats(axe)
+        _, xmult, xlbl, xunit = getUnitAbbrev(xstats.absmax, unit_of_x_var)
+        _, ymult, ylbl, yunit = getUnitAbbrev(ystats.absmax, unit_of_y_var)
+        xlabel = f"{name_of_x_var}\u00A0({xlbl}{xunit})"
+        ylabel = f"{name_of_y_var}\u00A0({ylbl}{yunit})"
+        # No copy when the data are displayed without multiplier
+        xs, xshared = _scale(xd, xmult, scaled)
+        ys, yshared = _scale(yd, ymult, scaled)
+        # The arrays already scaled for another plottable are not copies made by this one
+        shared = tuple(a for a, sh in ((xs, xshared), (ys, yshared)) if sh)
+        annotate_arrays(xs, ys, sources=(xd, yd) + shared)
+
+    return PreparedLine(
+        plottable=plottable,
+        xd=xs,
+        yd=ys,
+        xmult=xmult,
+        ymult=ymult,
+        xlabel=xlabel,
+        ylabel=ylabel,
+    )
+
+
+def prepare_figure(fig: BFigure, workers: int = None) -> T.List[T.List[PreparedLine]]:
+    """Prepares all the plottables of a figure, fanning the work out to a thread pool.
+    The conversions are mostly numpy operations that release the GIL.
+    The result does not depend on the number of workers: the lines are returned
+    in the order of the axes and of the plottables in each axe
+
+    Args:
+        fig: The BFigure to prepare
+        workers: Number of threads. 1 to prepare in the calling thread.
+            By default, `DEFAULT_WORKERS`
+
+    Returns:
+        For each axe of fig.list_axes, the list of its prepared lines
+
+    """
+    if workers is None:
+        workers = DEFAULT_WORKERS
+
+    scaled = {}
+    jobs = [(axe, plottable, scaled) for axe in fig.list_axes for plottable in axe.list_plottables]
+
+    with stage("prepare", figure=fig.title, workers=workers):
+        if workers <= 1 or len(jobs) <= 1:
+            lines = [prepare_plottable(*job) for job in jobs]
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(workers, len(jobs)), thread_name_prefix="soyut-prepare"
+            ) as executor:
+                lines = list(executor.map(lambda job: prepare_plottable(*job), jobs))
+
+    res = []
+    k = 0
+    for axe in fig.list_axes:
+        n = len(axe.list_plottables)
+        res.append(lines[k : k + n])
+        k += n
+
+    return res
+
+
+def simplification_tolerance(path, tolerance: float = None) -> float:
+    """Returns the tolerance of the simplification of the lines of an output
+
+    Args:
+        path: The output file, or None
+        tolerance: The tolerance requested, in pixels. By default, `DEFAULT_SIMPLIFY_TOLERANCE`
+            for the vector outputs (see `VECTOR_FORMATS`), and no simplification otherwise
+
+    Returns:
+        The tolerance, in pixels. 0 if the lines shall not be simplified
+
+    """
+    if tolerance is not None:
+        return tolerance
+    if path is not None and os.path.splitext(str(path))[1].lower() in VECTOR_FORMATS:
+        return DEFAULT_SIMPLIFY_TOLERANCE
+    return 0.0
+
+
+def simplify_line(
+    pline: PreparedLine,
+    to_pixels: T.Callable[[FloatArr, FloatArr], T.Tuple[FloatArr, FloatArr]],
+    tolerance: float,
+) -> PreparedLine:
+    """Drops the points of a prepared line that do not move it by more than tolerance pixels
+    in the output (see `soyut.utils.simplify_rdp`). The blocks of lines and the histograms
+    are not simplified. The numbers of vertices before and after are recorded in the
+    'simplify' stage of the trace (see `soyut.instrumentation`)
+
+    Args:
+        pline: The prepared line
+        to_pixels: Function converting the coordinates of pline into output pixels
+        tolerance: The tolerance, in pixels
+
+    Returns:
+        The simplified line, or pline if it cannot be simplified
+
+    """
+    if tolerance <= 0 or pline.line_type in (DSPLineType.MULTI, DSPLineType.HISTOGRAM):
+        return pline
+
+    with stage("simplify", plottable=pline.name, tolerance=tolerance):
+        px, py = to_pixels(pline.xd, pline.yd)
+        keep = simplify_rdp(px, py, tolerance)
+        annotate(vertices_in=len(pline.xd), vertices_out=len(keep))
+        logger.debug(f"Simplified '{pline.name}' from {len(pline.xd)} to {len(keep)} vertices")
+
+    return PreparedLine(
+        plottable=pline.plottable,
+        xd=pline.xd[keep],
+        yd=pline.yd[keep],
+        xmult=pline.xmult,
+        ymult=pline.ymult,
+        xlabel=pline.xlabel,
+        ylabel=pline.ylabel,
+    )
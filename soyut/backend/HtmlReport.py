@@ -0,0 +1,228 @@
+"""Single-page HTML reports gathering many BFigure objects
+
+Writing each figure of a report with plotly's write_html embeds a copy of plotly.js (about 3 MB)
+and of all its data in each file. A `HtmlReport` writes all its figures into one page, with:
+
+* a single copy of plotly.js and of plotly's template,
+* the arrays of the traces stored once, in content-addressed blocks: the time base shared
+  by many figures is written once,
+* the figures rendered only when they get close to the viewport, so that the page opens fast.
+
+"""
+import html
+import json
+import hashlib
+import typing as T
+from pathlib import Path
+
+from ..instrumentation import stage, annotate
+from ..frontend.BFigure import BFigure
+from .PlotlyRenderer import DEFAULT_SIZE
+from .PlotlyDictRenderer import _template, figure_dict, plotlyjs_tag
+
+__all__ = ["REPORT_TEMPLATE", "HtmlReport"]
+
+#: Template of the report pages
+REPORT_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8" />
+<title>{title}</title>
+<style>.soyut-figure {{ width: 100%; height: {height}px; }}</style>
+{plotlyjs}
+</head>
+<body>
+<h1>{title}</h1>
+{divs}
+<script type="application/json" id="soyut-template">{template}</script>
+<script type="application/json" id="soyut-blocks">{blocks}</script>
+<script type="application/json" id="soyut-figures">{figures}</script>
+<script type="text/javascript">
+(function () {{
+  function load(id) {{ return JSON.parse(document.getElementById(id).textContent); }}
+  var template = load("soyut-template");
+  var blocks = load("soyut-blocks");
+  var figures = load("soyut-figures");
+  var types = {{
+    f8: Float64Array, f4: Float32Array, i4: Int32Array, u4: Uint32Array,
+    i2: Int16Array, u2: Uint16Array, i1: Int8Array, u1: Uint8Array
+  }};
+  // Each block is decoded once, and its typed array shared by the traces using it
+  var decoded = {{}};
+  function decode(key) {{
+    if (!(key in decoded)) {{
+      var block = blocks[key];
+      var bin = atob(block.bdata);
+      var bytes = new Uint8Array(bin.length);
+      for (var i = 0; i < bin.length; i++) {{ bytes[i] = bin.charCodeAt(i); }}
+      decoded[key] = new types[block.dtype](bytes.buffer);
+    }}
+    return decoded[key];
+  }}
+  function resolve(obj) {{
+    for (var key in obj) {{
+      var v = obj[key];
+      if (v !== null && typeof v === "object") {{
+        if ("$ref" in v) {{ obj[key] = decode(v["$ref"]); }} else {{ resolve(v); }}
+      }}
+    }}
+  }}
+  function render(div) {{
+    var fig = figures[div.dataset.index];
+    resolve(fig.data);
+    fig.layout.template = template;
+    Plotly.newPlot(div, fig.data, fig.layout, {{ responsive: true }});
+  }}
+  var divs = Array.prototype.slice.call(document.querySelectorAll(".soyut-figure"));
+  if ("IntersectionObserver" in window) {{
+    var observer = new IntersectionObserver(function (entries) {{
+      entries.forEach(function (entry) {{
+        if (entry.isIntersecting) {{
+          observer.unobserve(entry.target);
+          render(entry.target);
+        }}
+      }});
+    }}, {{ rootMargin: "{margin}px" }});
+    divs.forEach(function (div) {{ observer.observe(div); }});
+  }} else {{
+    divs.forEach(render);
+  }}
+}})();
+</script>
+</body>
+</html>
+"""
+
+
+def _script_json(obj) -> str:
+    # JSON embedded in a script tag, that shall not close it
+    return json.dumps(obj, separators=(",", ":")).replace("</", "<\\/")
+
+
+class HtmlReport(object):
+    """Report gathering many BFigure objects in a single HTML page.
+    The figures are converted when added (see
+    `soyut.backend.PlotlyDictRenderer.figure_dict`), so they can be modified or freed afterwards.
+    The binary arrays of their traces are replaced by references to blocks named by the hash
+    of their content, so that the size of the page grows with the unique data only
+
+    Args:
+        title: Title of the page
+        include_plotlyjs: True to embed plotly.js in the page,
+            'cdn' to load it from plotly's CDN, False to leave it out
+        height: Height of each figure, in pixels
+        margin: Distance to the viewport, in pixels, at which a figure is rendered
+
+    Examples:
+        >>> import numpy as np
+        >>> report = HtmlReport("Report", include_plotlyjs=False)
+        >>> for k in range(3):
+        ...     fig = BFigure(f"Figure {k}")
+        ...     gs = fig.add_gridspec(nrows=1, ncols=1)
+        ...     axe = fig.add_axe("Axe", spec=gs[0, 0])
+        ...     _ = axe.plot((np.arange(100.0), np.full(100, k + 0.5)))
+        ...     _ = report.add(fig)
+        >>> len(report), len(report.blocks)
+        (3, 4)
+
+    """
+
+    __slots__ = ["title", "include_plotlyjs", "height", "margin", "figures", "blocks"]
+
+    def __init__(
+        self,
+        title: str = "Report",
+        include_plotlyjs: T.Union[bool, str] = True,
+        height: int = DEFAULT_SIZE[1],
+        margin: int = 200,
+    ):
+        self.title = title
+        self.include_plotlyjs = include_plotlyjs
+        self.height = height
+        self.margin = margin
+        #: Figure dictionaries, whose arrays reference the blocks
+        self.figures: T.List[dict] = []
+        #: Encoded arrays, by hash of their content
+        self.blocks: T.Dict[str, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self.figures)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the encoded data of the blocks"""
+        return sum(len(block["bdata"]) for block in self.blocks.values())
+
+    def _extract_blocks(self, obj):
+        # Replaces the binary arrays of a figure dictionary by references to the blocks
+        items = obj.items() if isinstance(obj, dict) else enumerate(obj)
+        for key, v in items:
+            if isinstance(v, dict) and "bdata" in v:
+                digest = hashlib.sha1(v["dtype"].encode("ascii"))
+                digest.update(v["bdata"].encode("ascii"))
+                ref = digest.hexdigest()
+                self.blocks.setdefault(ref, v)
+                obj[key] = {"$ref": ref}
+            elif isinstance(v, (dict, list)):
+                self._extract_blocks(v)
+
+    def add(self, fig: BFigure, workers: int = None, simplify: float = 0.0) -> int:
+        """Adds a figure at the end of the report
+
+        Args:
+            fig: The figure
+            workers: Number of threads used to prepare the data.
+                See `soyut.backend.FigurePreparation.prepare_figure`
+            simplify: Tolerance of the simplification of the lines, in estimated pixels.
+                By default, the lines are not simplified, so that their shared arrays are
+                stored once. See `soyut.backend.FigurePreparation.simplify_line`
+
+        Returns:
+            The index of the figure in the report
+
+        """
+        with stage("report_figure", figure=fig.title):
+            fdict = figure_dict(fig, workers=workers, simplify=simplify)
+            nblocks = len(self.blocks)
+            self._extract_blocks(fdict["data"])
+            annotate(new_blocks=len(self.blocks) - nblocks)
+
+        self.figures.append(fdict)
+        return len(self.figures) - 1
+
+    def to_html(self) -> str:
+        """Builds the page
+
+        Returns:
+            The HTML page
+
+        """
+        divs = "\n".join(
+            f'<div class="soyut-figure" data-index="{k}"></div>' for k in range(len(self.figures))
+        )
+        return REPORT_TEMPLATE.format(
+            title=html.escape(self.title),
+            height=int(self.height),
+            margin=int(self.margin),
+            plotlyjs=plotlyjs_tag(self.include_plotlyjs),
+            divs=divs,
+            template=_template().replace("</", "<\\/"),
+            blocks=_script_json(self.blocks),
+            figures=_script_json(self.figures),
+        )
+
+    def write(self, path: Path) -> Path:
+        """Writes the page into a file
+
+        Args:
+            path: Path of the HTML file
+
+        Returns:
+            The path of the written file
+
+        """
+        with stage("write", path=str(path)):
+            page = self.to_html()
+            annotate(figures=len(self.figures), blocks=len(self.blocks), size=len(page))
+            Path(path).write_text(page, encoding="utf-8")
+        return Path(path)
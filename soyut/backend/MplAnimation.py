@@ -0,0 +1,302 @@
+"""Export of animations of BFigure, rendered with matplotlib
+
+"""
+import os
+import shutil
+import tempfile
+import subprocess
+import typing as T
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib import rcParams
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from .. import logger
+from ..instrumentation import stage
+from ..frontend.BFigure import BFigure
+from .FigurePreparation import prepare_plottable
+from .MplTemplate import autoscale_artists, build_artists, set_artist_data
+from .SharedTransport import SharedArrayTransport
+
+__all__ = ["MplAnimation"]
+
+
+class _ImageSequenceSink(object):
+    # Writes each frame in its own image file. pattern is formatted with the frame index
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        Path(pattern.format(0)).parent.mkdir(parents=True, exist_ok=True)
+
+    def write(self, frame: int, rgba: np.ndarray):
+        from matplotlib.image import imsave
+
+        imsave(self.pattern.format(frame), rgba)
+
+    def close(self):
+        pass
+
+
+class _FFmpegSink(object):
+    # Streams the raw RGBA frames to the standard input of ffmpeg
+    def __init__(self, path: Path, width: int, height: int, fps: float):
+        cmd = [
+            rcParams["animation.ffmpeg_path"],
+            "-y",
+            "-loglevel",
+            "error",
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            "rgba",
+            "-s",
+            f"{width}x{height}",
+            "-r",
+            str(fps),
+            "-i",
+            "-",
+        ]
+        if Path(path).suffix != ".gif":
+            # yuv420p, for the compatibility with most players, needs even dimensions
+            cmd += ["-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-pix_fmt", "yuv420p"]
+        cmd.append(str(path))
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    def write(self, frame: int, rgba: np.ndarray):
+        self.proc.stdin.write(rgba.tobytes())
+
+    def close(self):
+        self.proc.stdin.close()
+        if self.proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed with code {self.proc.returncode}")
+
+
+def _concat_videos(segments: T.List[Path], path: Path):
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        for seg in segments:
+            f.write(f"file '{seg.absolute()}'\n")
+        list_path = f.name
+
+    cmd = [rcParams["animation.ffmpeg_path"], "-y", "-loglevel", "error"]
+    cmd += ["-f", "concat", "-safe", "0", "-i", list_path]
+    if Path(path).suffix != ".gif":
+        cmd += ["-c", "copy"]
+    cmd.append(str(path))
+    try:
+        subprocess.run(cmd, check=True)
+    finally:
+        os.unlink(list_path)
+
+
+class MplAnimation(object):
+    """Animation of a BFigure. The frames are streamed to ffmpeg or to an image sequence,
+    so that they are never all held in memory.
+
+    For each frame, the function *update* is called with the BFigure and the frame index.
+    It changes what moves: the data of GVariable objects (`GVariable.data` setter),
+    the limits of the axes (`soyut.frontend.BAxe.ABaxe.set_xlim`, ...).
+    Then, only the lines whose data or X limits changed are prepared again,
+    and updated in place with set_data.
+    As long as the limits and the axes labels do not change, the static part of the figure
+    (axes, ticks, grid, titles) is drawn once and restored from a cached background (blitting).
+    The limits of the axes without explicit limits are set by the data of the first frame.
+
+    For the frames to be rendered in parallel processes, *update* shall give the state of
+    a frame from its index only (and not from the state of the previous frame),
+    and the figure and *update* shall be picklable.
+
+    Args:
+        fig: The BFigure to animate
+        update: Function called before each frame, as update(fig, frame)
+        nframes: Number of frames
+        fps: Number of frames per second
+        dpi: Resolution of the frames. By default, the one of matplotlib's rcParams
+        blit: False to fully redraw each frame
+
+    Examples:
+        >>> t = np.linspace(0, 1, 100)
+        >>> fig = BFigure("Animation")
+        >>> gs = fig.add_gridspec(nrows=1, ncols=1)
+        >>> axe = fig.add_axe("Axe", spec=gs[0, 0])
+        >>> p = axe.plot((t, t))
+        >>> axe.set_ylim(-1, 1)
+        >>> def update(fig, frame):
+        ...     fig.list_axes[0].list_plottables[0].data_source.yvar.data = np.sin(t + frame)
+        >>> anim = MplAnimation(fig, update, nframes=3)
+        >>> # anim.save("anim.mp4")
+
+    """
+
+    __slots__ = ["figure", "update", "nframes", "fps", "dpi", "blit"]
+
+    def __init__(
+        self,
+        fig: BFigure,
+        update: T.Callable[[BFigure, int], None],
+        nframes: int,
+        fps: float = 25,
+        dpi: float = None,
+        blit: bool = True,
+    ):
+        self.figure = fig
+        self.update = update
+        self.nframes = nframes
+        self.fps = fps
+        self.dpi = dpi
+        self.blit = blit
+
+    def save(self, path: Path, workers: int = 1) -> Path:
+        """Renders the animation into a video, or into an image sequence
+
+        Args:
+            path: Either a video file (mp4, gif, ...), written by ffmpeg,
+                or a pattern of image files formatted with the frame index, like 'img_{:05d}.png'
+            workers: Number of processes rendering chunks of consecutive frames.
+                The arrays of the figure are sent to the processes through shared memory,
+                read-only: the update function shall replace the data, not modify it in place
+
+        Returns:
+            The path, or pattern, given
+
+        """
+        path = str(path)
+        sequence = "{" in path
+        chunks = [c for c in np.array_split(np.arange(self.nframes), max(workers, 1)) if len(c) > 0]
+
+        if len(chunks) <= 1:
+            target = path if sequence else Path(path)
+            _render_chunk(self, 0, self.nframes, target)
+            return path
+
+        tmpdir = None
+        if sequence:
+            targets = [path] * len(chunks)
+        else:
+            tmpdir = Path(tempfile.mkdtemp(prefix="soyut-anim-"))
+            targets = [tmpdir / f"chunk{i:04d}{Path(path).suffix}" for i in range(len(chunks))]
+
+        try:
+            # The arrays of the figure are shared by the processes, instead of pickled in each job
+            with SharedArrayTransport() as transport, ProcessPoolExecutor(
+                max_workers=len(chunks)
+            ) as executor:
+                futures = [
+                    transport.submit(
+                        executor, _render_chunk, self, int(c[0]), int(c[-1]) + 1, target
+                    )
+                    for c, target in zip(chunks, targets)
+                ]
+                for fut in futures:
+                    fut.result()
+
+            if not sequence:
+                _concat_videos(targets, Path(path))
+        finally:
+            if tmpdir is not None:
+                shutil.rmtree(tmpdir, ignore_errors=True)
+
+        return path
+
+
+class _FrameRenderer(object):
+    # Renders the frames of an animation with a single matplotlib figure
+    def __init__(self, anim: MplAnimation):
+        self.anim = anim
+        fig = anim.figure
+        self.mfig, self.maxes, self.artists = build_artists(fig)
+        if anim.dpi is not None:
+            self.mfig.set_dpi(anim.dpi)
+        self.canvas = FigureCanvasAgg(self.mfig)
+        for lines in self.artists:
+            for line in lines:
+                line.set_animated(anim.blit)
+
+        # None never equals a data version, so that all the lines are drawn in the first frame
+        self.versions = [[None] * len(axe.list_plottables) for axe in fig.list_axes]
+        self.mults = [None] * len(fig.list_axes)
+        self.bounds = [None] * len(fig.list_axes)
+        self.background = None
+
+    @property
+    def size(self) -> T.Tuple[int, int]:
+        width, height = self.canvas.get_width_height()
+        return int(width), int(height)
+
+    def _update_axe(self, k: int) -> bool:
+        # Updates the artists of the k-th axe. Returns True if the static part changed
+        axe = self.anim.figure.list_axes[k]
+        maxe = self.maxes[k]
+        dirty = False
+        pline = None
+        for i, (plottable, line) in enumerate(zip(axe.list_plottables, self.artists[k])):
+            # The lines of sorted data only keep the samples within the X limits
+            version = plottable._dataVersion(), axe.xbounds
+            if version == self.versions[k][i]:
+                continue
+            self.versions[k][i] = version
+            pline = prepare_plottable(axe, plottable)
+            set_artist_data(line, pline)
+
+        if pline is not None and (pline.xmult, pline.ymult) != self.mults[k]:
+            self.mults[k] = pline.xmult, pline.ymult
+            maxe.set_xlabel(pline.xlabel)
+            maxe.set_ylabel(pline.ylabel)
+            dirty = True
+
+        bounds = (axe.xbounds, axe.ybounds)
+        if bounds != self.bounds[k] or dirty:
+            self.bounds[k] = bounds
+            if self.mults[k] is not None:
+                xmult, ymult = self.mults[k]
+                autoscale_artists(maxe, self.artists[k])
+                (xmin, xmax), (ymin, ymax) = bounds
+                maxe.set_xlim(
+                    None if xmin is None else xmin / xmult, None if xmax is None else xmax / xmult
+                )
+                maxe.set_ylim(
+                    None if ymin is None else ymin / ymult, None if ymax is None else ymax / ymult
+                )
+            dirty = True
+
+        return dirty
+
+    def render(self, frame: int) -> np.ndarray:
+        """Renders a frame, and returns the RGBA buffer of the canvas"""
+        self.anim.update(self.anim.figure, frame)
+
+        dirty = False
+        for k in range(len(self.maxes)):
+            dirty |= self._update_axe(k)
+
+        if not self.anim.blit:
+            self.canvas.draw()
+        else:
+            if dirty or self.background is None:
+                # The animated lines are skipped by draw
+                self.canvas.draw()
+                self.background = self.canvas.copy_from_bbox(self.mfig.bbox)
+            else:
+                self.canvas.restore_region(self.background)
+            for maxe, lines in zip(self.maxes, self.artists):
+                for line in lines:
+                    maxe.draw_artist(line)
+
+        return np.asarray(self.canvas.buffer_rgba())
+
+
+def _render_chunk(anim: MplAnimation, start: int, stop: int, target):
+    renderer = _FrameRenderer(anim)
+    if isinstance(target, str):
+        sink = _ImageSequenceSink(target)
+    else:
+        width, height = renderer.size
+        sink = _FFmpegSink(target, width, height, anim.fps)
+
+    logger.debug(f"Rendering frames {start} to {stop - 1} into {target}")
+    try:
+        for frame in range(start, stop):
+            with stage("frame", figure=anim.figure.title, frame=frame):
+                sink.write(frame, renderer.render(frame))
+    finally:
+        sink.close()
@@ -0,0 +1,247 @@
+"""Interactive rendering of BFigure with matplotlib, resampling the lines on pan and zoom
+
+"""
+import typing as T
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from matplotlib.artist import Artist
+from matplotlib.figure import Figure as MFigure
+
+from .. import logger
+from ..instrumentation import stage
+from ..frontend.BFigure import BFigure
+from ..frontend.Plottable import ViewWindow
+from .FigurePreparation import PreparedLine, prepare_plottable
+from .MplTemplate import autoscale_artists, build_artists, set_artist_data
+
+__all__ = ["MplResampler", "interactive_mpl_renderer"]
+
+
+class MplResampler(object):
+    """Keeps the lines of a matplotlib figure at screen resolution while its axes
+    are panned or zoomed.
+
+    A callback is registered on the xlim_changed event of each axe. Once the limits have not
+    changed for *delay* seconds, the data of the new window are prepared again in a worker
+    thread (see `soyut.frontend.Plottable.ViewWindow`): for sorted X data, only the visible
+    samples are read, and the lines are decimated down to *points_per_pixel* points
+    per pixel of the axe width. The artists are then updated in place from the GUI thread.
+    While the worker runs, the GUI keeps drawing the previous data, so that the navigation
+    stays smooth on very long traces.
+
+    The debounce and the polling of the worker use the timers of the matplotlib canvas.
+    With a non interactive canvas (Agg), whose timers never fire, `MplResampler.flush`
+    performs the pending updates.
+
+    matplotlib only keeps a weak reference to the callbacks: the MplResampler object shall be
+    kept alive as long as the figure is displayed.
+
+    Args:
+        fig: The BFigure
+        mfig: The matplotlib figure, built by `soyut.backend.MplTemplate.build_artists`
+        maxes: The matplotlib axes, in the order of fig.list_axes
+        artists: For each axe, the artists of its plottables
+        delay: Time without limits change before the resampling, in s
+        points_per_pixel: Number of points per pixel of the axe width kept by the decimation
+
+    """
+
+    __slots__ = [
+        "figure",
+        "mfig",
+        "maxes",
+        "artists",
+        "delay",
+        "points_per_pixel",
+        "_mults",
+        "_pending",
+        "_futures",
+        "_generation",
+        "_cids",
+        "_executor",
+        "_debounce",
+        "_poll",
+        "__weakref__",
+    ]
+
+    def __init__(
+        self,
+        fig: BFigure,
+        mfig: MFigure,
+        maxes: list,
+        artists: T.List[T.List[Artist]],
+        delay: float = 0.1,
+        points_per_pixel: float = 2,
+    ):
+        self.figure = fig
+        self.mfig = mfig
+        self.maxes = maxes
+        self.artists = artists
+        self.delay = delay
+        self.points_per_pixel = points_per_pixel
+
+        # X multiplier of each axe, to convert the limits of matplotlib in S.I. units
+        self._mults: T.List[float] = [1.0] * len(maxes)
+        # Axes whose limits changed since the last submission
+        self._pending: T.Set[int] = set()
+        self._futures: T.Dict[int, T.Tuple[int, Future]] = {}
+        self._generation = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="soyut-resample")
+
+        canvas = mfig.canvas
+        self._debounce = canvas.new_timer(interval=int(delay * 1000))
+        self._debounce.single_shot = True
+        self._debounce.add_callback(self._submit)
+        self._poll = canvas.new_timer(interval=20)
+        self._poll.add_callback(self._apply_done)
+
+        self._cids = [
+            maxe.callbacks.connect("xlim_changed", self._on_xlim_changed) for maxe in maxes
+        ]
+
+    def _max_points(self, k: int) -> int:
+        npix = max(int(self.maxes[k].bbox.width), 1)
+        return int(npix * self.points_per_pixel)
+
+    def _view(self, k: int) -> ViewWindow:
+        # The window currently displayed by the k-th axe
+        xmin, xmax = sorted(self.maxes[k].get_xlim())
+        mult = self._mults[k]
+        return ViewWindow(xbounds=(xmin * mult, xmax * mult), max_points=self._max_points(k))
+
+    def _prepare(self, k: int, view: ViewWindow) -> T.List[PreparedLine]:
+        axe = self.figure.list_axes[k]
+        with stage("resample", axe=axe.title):
+            return [
+                prepare_plottable(axe, plottable, view=view) for plottable in axe.list_plottables
+            ]
+
+    def _apply(self, k: int, plines: T.List[PreparedLine]):
+        for artist, pline in zip(self.artists[k], plines):
+            set_artist_data(artist, pline)
+        if len(plines) > 0:
+            self._mults[k] = plines[-1].xmult
+
+    def _on_xlim_changed(self, maxe):
+        try:
+            k = self.maxes.index(maxe)
+        except ValueError:
+            return
+        self._pending.add(k)
+        # Each change restarts the timer: the resampling runs once the navigation pauses
+        self._debounce.stop()
+        self._debounce.start()
+
+    def _submit(self):
+        # Sends the pending axes to the worker thread. Called from the GUI thread
+        for k in sorted(self._pending):
+            self._generation += 1
+            view = self._view(k)
+            logger.debug(f"Resampling axe {k} on {view.xbounds}")
+            self._futures[k] = self._generation, self._executor.submit(self._prepare, k, view)
+        self._pending.clear()
+        if len(self._futures) > 0:
+            self._poll.start()
+
+    def _apply_done(self, wait: bool = False):
+        # Updates the artists with the results of the worker. Called from the GUI thread
+        updated = False
+        for k, (generation, future) in list(self._futures.items()):
+            if not wait and not future.done():
+                continue
+            # A more recent request of the same axe may have been submitted meanwhile
+            latest = self._futures.get(k, (None,))[0] == generation
+            if latest:
+                del self._futures[k]
+            try:
+                plines = future.result()
+            except Exception:
+                # The previous data stay displayed
+                logger.exception(f"Resampling of axe {k} failed")
+                continue
+            if latest:
+                self._apply(k, plines)
+                updated = True
+
+        if len(self._futures) == 0:
+            self._poll.stop()
+        if updated:
+            self.mfig.canvas.draw_idle()
+
+    def resample_all(self):
+        """Prepares all the axes for their current limits, in the calling thread,
+        and updates the artists"""
+        for k in range(len(self.maxes)):
+            self._apply(k, self._prepare(k, self._view(k)))
+
+    def flush(self):
+        """Performs the pending updates, and waits for them"""
+        self._debounce.stop()
+        self._submit()
+        self._apply_done(wait=True)
+
+    def close(self):
+        """Disconnects the callbacks, and stops the worker thread"""
+        for maxe, cid in zip(self.maxes, self._cids):
+            maxe.callbacks.disconnect(cid)
+        self._debounce.stop()
+        self._poll.stop()
+        for _, future in self._futures.values():
+            future.cancel()
+        self._executor.shutdown(wait=False)
+
+
+def interactive_mpl_renderer(
+    fig: BFigure,
+    show: bool = True,
+    delay: float = 0.1,
+    points_per_pixel: float = 2,
+) -> MplResampler:
+    """Renders a BFigure with matplotlib, in a window whose lines are resampled
+    at screen resolution on pan and zoom. See `MplResampler`
+
+    Args:
+        fig: The BFigure to render
+        show: True to call matplotlib.pyplot.show once the figure is built.
+            If False, the figure is not registered in pyplot
+        delay: Time without limits change before the resampling, in s
+        points_per_pixel: Number of points per pixel of the axe width kept by the decimation
+
+    Returns:
+        The resampler, whose attribute mfig is the matplotlib figure
+
+    """
+    from matplotlib import pyplot as plt
+
+    with stage("render", backend="matplotlib-interactive", figure=fig.title):
+        mfig, maxes, artists = build_artists(fig, mfig=plt.figure() if show else None)
+        resampler = MplResampler(
+            fig, mfig, maxes, artists, delay=delay, points_per_pixel=points_per_pixel
+        )
+
+        # First drawing: the data within the explicit limits, at the resolution of the axes
+        for k, (axe, maxe) in enumerate(zip(fig.list_axes, maxes)):
+            view = ViewWindow(xbounds=axe.xbounds, max_points=resampler._max_points(k))
+            plines = resampler._prepare(k, view)
+            resampler._apply(k, plines)
+            if len(plines) == 0:
+                continue
+            xmult, ymult = plines[-1].xmult, plines[-1].ymult
+            maxe.set_xlabel(plines[-1].xlabel)
+            maxe.set_ylabel(plines[-1].ylabel)
+            autoscale_artists(maxe, artists[k])
+            (xmin, xmax), (ymin, ymax) = axe.xbounds, axe.ybounds
+            maxe.set_xlim(
+                None if xmin is None else xmin / xmult, None if xmax is None else xmax / xmult
+            )
+            maxe.set_ylim(
+                None if ymin is None else ymin / ymult, None if ymax is None else ymax / ymult
+            )
+        # The limits set above are the ones of the first drawing
+        resampler._pending.clear()
+        resampler._debounce.stop()
+
+    if show:
+        plt.show()
+
+    return resampler
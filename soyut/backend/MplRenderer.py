@@ -0,0 +1,175 @@
+"""Rendering of BFigure with matplotlib
+
+"""
+from pathlib import Path
+
+import numpy as np
+from matplotlib.artist import Artist
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure as MFigure
+from matplotlib.font_manager import FontProperties
+
+from ..instrumentation import stage
+from ..frontend.BFigure import BFigure
+from ..frontend.GAnnotations import GAnnotationLayer
+from ..frontend.GraphicSpec import DSPLineType
+from .FigurePreparation import prepare_figure, simplification_tolerance, simplify_line
+
+__all__ = ["line_segments", "TextCollection", "simple_mpl_renderer"]
+
+
+def line_segments(xd, yd) -> np.ndarray:
+    """Builds the segments of a LineCollection drawing a block of lines sharing the same X data
+
+    Args:
+        xd: X data, of shape (nsamples,)
+        yd: Y data, of shape (nsamples, nlines)
+
+    Returns:
+        The segments, of shape (nlines, nsamples, 2)
+
+    """
+    segs = np.empty((yd.shape[1], yd.shape[0], 2), dtype=np.result_type(xd, yd))
+    segs[:, :, 0] = xd
+    segs[:, :, 1] = yd.T
+    return segs
+
+
+class TextCollection(Artist):
+    """Artist drawing all the labels of a `soyut.frontend.GAnnotations.GAnnotationLayer`.
+    The labels are placed at each draw, for the current limits and size of the axe,
+    and drawn with a single graphics context
+
+    Args:
+        layer: The annotations
+        xd: X coordinates of the points, in the data coordinates of the axe
+        yd: Y coordinates of the points, in the data coordinates of the axe
+
+    """
+
+    def __init__(self, layer: GAnnotationLayer, xd, yd):
+        super().__init__()
+        self.layer = layer
+        self.xy = np.column_stack([xd, yd])
+        self.color = layer.kwargs.get("color", "black")
+        self.fontprop = FontProperties(size=layer.fontsize)
+        self.corner = None
+
+    def draw(self, renderer):
+        if not self.get_visible() or len(self.layer) == 0:
+            return
+
+        pts = self.axes.transData.transform(self.xy)
+        ppp = renderer.points_to_pixels(1.0)
+        x0, y0, x1, y1 = self.axes.bbox.extents
+        self.corner, left, bottom = self.layer.place(
+            pts[:, 0], pts[:, 1], pixels_per_point=ppp, bounds=(x0, x1, y0, y1)
+        )
+
+        renderer.open_group("soyut_annotations", gid=self.get_gid())
+        gc = renderer.new_gc()
+        gc.set_foreground(self.color)
+        gc.set_clip_rectangle(self.axes.bbox)
+        # draw_text takes the left of the baseline: the descent is about 20% of the font size
+        baseline = bottom + 0.2 * self.layer.fontsize * ppp
+        if renderer.flipy():
+            # Like matplotlib.text.Text.draw, the renderers with a downward Y axis (Agg, ...)
+            # take Y from the top of the canvas
+            _, height = renderer.get_canvas_width_height()
+            baseline = height - baseline
+        for i in np.flatnonzero(self.corner >= 0):
+            text = str(self.layer.texts[i])
+            renderer.draw_text(gc, left[i], baseline[i], text, self.fontprop, 0.0)
+        gc.restore()
+        renderer.close_group("soyut_annotations")
+        self.stale = False
+
+
+def simple_mpl_renderer(
+    fig: BFigure,
+    show: bool = True,
+    path: Path = None,
+    workers: int = None,
+    simplify: float = None,
+) -> MFigure:
+    """Renders a BFigure with matplotlib
+
+    Args:
+        fig: The BFigure to render
+        show: True to call matplotlib.pyplot.show once the figure is built.
+            If False, the figure is not registered in pyplot, so that it can be built
+            from any thread and is freed once no longer referenced
+        path: If given, path of the image file where the figure is saved
+        workers: Number of threads used to prepare the data.
+            See `soyut.backend.FigurePreparation.prepare_figure`
+        simplify: Tolerance of the simplification of the lines, in pixels of the figure.
+            By default, the lines are simplified only for the vector outputs (svg, pdf, ...).
+            0 to disable. See `soyut.backend.FigurePreparation.simplify_line`
+
+    Returns:
+        The matplotlib figure
+
+    """
+    from matplotlib import pyplot as plt
+
+    with stage("render", backend="matplotlib", figure=fig.title):
+        prepared = prepare_figure(fig, workers=workers)
+        tolerance = simplification_tolerance(path, simplify)
+
+        mfig = plt.figure() if show else MFigure()
+        mfig.suptitle(fig.title)
+        mgs = mfig.add_gridspec(nrows=fig.grid_spec.nrows, ncols=fig.grid_spec.ncols)
+
+        for axe, lines in zip(fig.list_axes, prepared):
+            with stage("axe", axe=axe.title):
+                mge = mgs[axe.spec.coord]
+                maxe = mfig.add_subplot(mge)
+                maxe.set_title(axe.title)
+                maxe.grid(True)
+
+                plain = []
+                for line in lines:
+                    with stage("artist", axe=axe.title, plottable=line.name):
+                        if line.line_type == DSPLineType.HISTOGRAM:
+                            maxe.plot(line.xd, line.yd, drawstyle="steps-mid")
+                        elif line.line_type == DSPLineType.MULTI:
+                            # One artist for the whole block
+                            maxe.add_collection(LineCollection(line_segments(line.xd, line.yd)))
+                            maxe.autoscale_view()
+                        else:
+                            (artist,) = maxe.plot(line.xd, line.yd)
+                            plain.append((artist, line))
+
+                        maxe.set_xlabel(line.xlabel)
+                        maxe.set_ylabel(line.ylabel)
+
+                if tolerance > 0 and len(plain) > 0:
+                    # The pixels of the lines are known once the limits are set
+                    maxe.autoscale_view()
+
+                    def to_pixels(xd, yd, maxe=maxe):
+                        pts = maxe.transData.transform(np.column_stack([xd, yd]))
+                        return pts[:, 0], pts[:, 1]
+
+                    for artist, line in plain:
+                        simple = simplify_line(line, to_pixels, tolerance)
+                        artist.set_data(simple.xd, simple.yd)
+
+                xmult, ymult = (lines[-1].xmult, lines[-1].ymult) if len(lines) > 0 else (1, 1)
+                for layer in axe.annotations:
+                    with stage("annotations", axe=axe.title, size=len(layer)):
+                        xd, yd = layer.make_points(axe)
+                        coll = TextCollection(layer, xd / xmult, yd / ymult)
+                        maxe.add_artist(coll)
+                        # Unlike the lines, the artists are not taken into account by autoscale
+                        maxe.update_datalim(coll.xy[np.isfinite(coll.xy).all(axis=1)])
+                        maxe.autoscale_view()
+
+        if path is not None:
+            with stage("write", path=str(path)):
+                mfig.savefig(path)
+
+    if show:
+        plt.show()
+
+    return mfig
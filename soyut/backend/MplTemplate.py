@@ -0,0 +1,193 @@
+"""Reusable matplotlib figures, compiled once from a FigureSpec
+
+"""
+import io
+import typing as T
+from pathlib import Path
+
+import numpy as np
+from matplotlib.figure import Figure as MFigure
+from matplotlib.artist import Artist
+from matplotlib.collections import LineCollection
+
+from ..instrumentation import stage
+from ..frontend.BFigure import BFigure
+from ..frontend.GPlottable import GVariable
+from ..frontend.GraphicSpec import DSPLineType, FigureSpec
+from ..frontend.Plottable import SOYUT_OPTIONS
+from .FigurePreparation import PreparedLine, prepare_figure
+from .MplRenderer import line_segments
+
+__all__ = ["build_artists", "set_artist_data", "autoscale_artists", "FigureTemplate"]
+
+
+def build_artists(
+    fig: BFigure, mfig: MFigure = None
+) -> T.Tuple[MFigure, list, T.List[T.List[Artist]]]:
+    """Creates the matplotlib figure and axes of a BFigure, with one empty artist per plottable:
+    a Line2D, or a LineCollection for a block of lines
+
+    Args:
+        fig: The BFigure
+        mfig: The empty matplotlib figure to fill. By default, a new figure,
+            not registered in pyplot
+
+    Returns:
+        The matplotlib figure
+        The matplotlib axes, in the order of fig.list_axes
+        For each axe, the lines of its plottables
+
+    """
+    if mfig is None:
+        mfig = MFigure()
+    mfig.suptitle(fig.title)
+    mgs = mfig.add_gridspec(nrows=fig.grid_spec.nrows, ncols=fig.grid_spec.ncols)
+
+    maxes = []
+    artists = []
+    for axe in fig.list_axes:
+        maxe = mfig.add_subplot(mgs[axe.spec.coord])
+        maxe.set_title(axe.title)
+        maxe.grid(True)
+        maxes.append(maxe)
+
+        lines = []
+        for plottable in axe.list_plottables:
+            kwargs = {k: v for k, v in plottable.kwargs.items() if k not in SOYUT_OPTIONS}
+            if plottable.line_type == DSPLineType.MULTI:
+                line = maxe.add_collection(LineCollection([], **kwargs), autolim=False)
+            else:
+                if plottable.line_type == DSPLineType.HISTOGRAM:
+                    kwargs.setdefault("drawstyle", "steps-mid")
+                (line,) = maxe.plot([], [], **kwargs)
+            lines.append(line)
+        artists.append(lines)
+
+    return mfig, maxes, artists
+
+
+def set_artist_data(artist: Artist, pline: PreparedLine):
+    """Updates in place an artist created by `build_artists`
+
+    Args:
+        artist: The artist
+        pline: The new data
+
+    """
+    if isinstance(artist, LineCollection):
+        artist.set_segments(line_segments(pline.xd, pline.yd))
+    else:
+        artist.set_data(pline.xd, pline.yd)
+
+
+def autoscale_artists(maxe, artists: T.List[Artist]):
+    """Autoscales an axe on the data of its artists. Unlike matplotlib's relim,
+    the line collections are taken into account
+
+    Args:
+        maxe: The matplotlib axe
+        artists: The artists of the axe
+
+    """
+    maxe.relim()
+    for artist in artists:
+        if isinstance(artist, LineCollection) and len(artist.get_segments()) > 0:
+            maxe.update_datalim(artist.get_datalim(maxe.transData).get_points())
+    maxe.autoscale_view()
+
+
+class _VariableRegistry(dict):
+    # Creates an empty GVariable the first time a name is looked up
+    def __init__(self, units: dict):
+        super().__init__()
+        self.units = units
+
+    def __missing__(self, name: str) -> GVariable:
+        var = GVariable(data=np.empty(0), name=name, unit=self.units.get(name, "-"))
+        self[name] = var
+        return var
+
+
+class FigureTemplate(object):
+    """A FigureSpec compiled into a matplotlib figure, whose axes and lines are created once.
+
+    Each call to `FigureTemplate.render` swaps the data of the variables, updates the existing
+    artists with set_data, and rasterizes the figure: the BFigure, the matplotlib figure,
+    its axes and its artists are not built again.
+    The unit multipliers, the axes labels and the limits are updated at each run,
+    as they depend on the data.
+
+    A FigureTemplate is not thread-safe: use one template per thread.
+
+    Args:
+        spec: The description of the figure. See `soyut.frontend.BFigure.BFigure.from_spec`
+        units: Mapping of the variables' names to their units
+
+    Examples:
+        >>> spec = FigureSpec.specForOneAxeMultiLines([{"var": "y"}])
+        >>> tpl = FigureTemplate(spec, units={"t": "s"})
+        >>> t = np.linspace(0, 1, 50)
+        >>> png = tpl.render({"t": t, "y": t**2})
+        >>> png = tpl.render({"t": t, "y": t**3})
+
+    """
+
+    __slots__ = ["figure", "variables", "mfig", "maxes", "artists"]
+
+    def __init__(self, spec: FigureSpec, units: dict = None):
+        self.variables = _VariableRegistry({} if units is None else units)
+        self.figure = BFigure.from_spec(spec, self.variables)
+
+        self.mfig, self.maxes, self.artists = build_artists(self.figure)
+
+    def update(self, data):
+        """Swaps the data of the variables, and updates the artists
+
+        Args:
+            data: Mapping (dict, pandas.DataFrame, ...) of the variables' names to their data.
+                The variables not given keep their previous data
+
+        """
+        for name, var in self.variables.items():
+            try:
+                value = data[name]
+            except KeyError:
+                continue
+            var.data = value
+
+        prepared = prepare_figure(self.figure)
+
+        with stage("set_data", figure=self.figure.title):
+            for maxe, lines, plines in zip(self.maxes, self.artists, prepared):
+                for line, pline in zip(lines, plines):
+                    set_artist_data(line, pline)
+
+                if len(plines) > 0:
+                    maxe.set_xlabel(plines[-1].xlabel)
+                    maxe.set_ylabel(plines[-1].ylabel)
+                    autoscale_artists(maxe, lines)
+
+    def render(self, data=None, path: Path = None, format: str = "png") -> T.Union[bytes, Path]:
+        """Updates the template with new data, and rasterizes it
+
+        Args:
+            data: Mapping of the variables' names to their data. None to keep the current data
+            path: If given, path of the image file where the figure is saved
+            format: Format of the image, if path is None
+
+        Returns:
+            The content of the image file if path is None, the path otherwise
+
+        """
+        with stage("render", backend="matplotlib-template", figure=self.figure.title):
+            if data is not None:
+                self.update(data)
+
+            with stage("write", path=str(path)):
+                if path is None:
+                    buf = io.BytesIO()
+                    self.mfig.savefig(buf, format=format)
+                    return buf.getvalue()
+                else:
+                    self.mfig.savefig(path)
+                    return Path(path)
@@ -0,0 +1,474 @@
+"""Rendering of BFigure into plotly figure dictionaries, without plotly.graph_objects
+
+plotly.graph_objects validates each property of each trace when it is created or added
+to a figure, which dominates the build time of the figures with many traces.
+This backend builds the figure dictionary directly from the BFigure tree,
+with the arrays in plotly's binary form (base64-encoded typed arrays),
+and writes the HTML files through a single template.
+
+"""
+import json
+import base64
+import typing as T
+import functools
+from pathlib import Path
+
+import numpy as np
+
+from ..instrumentation import stage
+from ..frontend.BAxe import ABaxe
+from ..frontend.BFigure import BFigure
+from ..frontend.BLayout import BGridSpec
+from ..frontend.GraphicSpec import DSPLineType
+from .FigurePreparation import (
+    PreparedLine,
+    prepare_figure,
+    simplification_tolerance,
+    simplify_line,
+)
+from .PlotlyRenderer import (
+    TEXT_POSITIONS,
+    _axe_size,
+    _pixel_mapping,
+    _place_annotations,
+    get_axe_coord,
+)
+
+__all__ = [
+    "HTML_TEMPLATE",
+    "encode_array",
+    "subplot_domains",
+    "figure_dict",
+    "figure_json",
+    "plotlyjs_tag",
+    "shared_blocks",
+    "figure_html",
+    "dict_plotly_renderer",
+]
+
+#: Template of the HTML files. plotlyjs is the script tag of plotly.js, figure the JSON
+#: of the figure, and blocks the JSON of the arrays shared by several traces,
+#: that the traces reference as {{"$ref": key}}
+HTML_TEMPLATE = """<html>
+<head><meta charset="utf-8" /></head>
+<body>
+<div>
+{plotlyjs}
+<div id="{div_id}" class="plotly-graph-div" style="height:100%; width:100%;"></div>
+<script type="text/javascript">
+var blocks = {blocks};
+var fig = {figure};
+(function () {{
+  var types = {{
+    f8: Float64Array, f4: Float32Array, i4: Int32Array, u4: Uint32Array,
+    i2: Int16Array, u2: Uint16Array, i1: Int8Array, u1: Uint8Array
+  }};
+  // Each block is decoded once, and its typed array shared by the traces using it
+  var decoded = {{}};
+  function decode(key) {{
+    if (!(key in decoded)) {{
+      var block = blocks[key];
+      var bin = atob(block.bdata);
+      var bytes = new Uint8Array(bin.length);
+      for (var i = 0; i < bin.length; i++) {{ bytes[i] = bin.charCodeAt(i); }}
+      decoded[key] = new types[block.dtype](bytes.buffer);
+    }}
+    return decoded[key];
+  }}
+  fig.data.forEach(function (trace) {{
+    for (var key in trace) {{
+      var v = trace[key];
+      if (v !== null && typeof v === "object" && "$ref" in v) {{ trace[key] = decode(v["$ref"]); }}
+    }}
+  }});
+}})();
+Plotly.newPlot("{div_id}", fig.data, fig.layout, {{"responsive": true}});
+</script>
+</div>
+</body>
+</html>
+"""
+
+# numpy kinds and sizes of the typed arrays understood by plotly.js
+_BINARY_DTYPES = {
+    np.dtype("float64"): "f8",
+    np.dtype("float32"): "f4",
+    np.dtype("int32"): "i4",
+    np.dtype("uint32"): "u4",
+    np.dtype("int16"): "i2",
+    np.dtype("uint16"): "u2",
+    np.dtype("int8"): "i1",
+    np.dtype("uint8"): "u1",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _binary_arrays() -> bool:
+    # plotly.js reads the arrays in binary form since its version 2.28 (plotly 5.19)
+    from plotly.offline import get_plotlyjs_version
+
+    version = tuple(int(v) for v in get_plotlyjs_version().split(".")[:2])
+    return version >= (2, 28)
+
+
+def encode_array(a) -> T.Union[dict, list]:
+    """Encodes an array in plotly's binary form: a dictionary holding its type and its
+    little-endian content in base64. The arrays that plotly.js cannot read as typed arrays
+    are returned as lists, as are all the arrays when the plotly.js bundled with
+    the installed plotly is older than 2.28 (plotly 5.19), which does not read the binary form
+
+    Args:
+        a: The array
+
+    Returns:
+        The encoded array
+
+    Examples:
+        >>> encode_array(np.array([1.0, 2.0]))
+        {'dtype': 'f8', 'bdata': 'AAAAAAAA8D8AAAAAAAAAQA=='}
+        >>> encode_array(np.array(["a", "b"]))
+        ['a', 'b']
+
+    """
+    a = np.asarray(a)
+    if a.dtype.kind in "iu" and a.dtype.itemsize == 8:
+        # plotly.js has no 64 bits integer arrays
+        a = a.astype(np.float64)
+    dtype = a.dtype.newbyteorder("=")
+    code = _BINARY_DTYPES.get(dtype, None)
+    if code is None or not _binary_arrays():
+        return a.tolist()
+
+    data = np.ascontiguousarray(a, dtype=dtype.newbyteorder("<"))
+    return {"dtype": code, "bdata": base64.b64encode(data.tobytes()).decode("ascii")}
+
+
+def _array_encoder() -> T.Callable[[np.ndarray], T.Union[dict, list]]:
+    # encode_array, returning the same encoded array for the same array object,
+    # so that the X shared by many lines is encoded once and can be written once
+    cache = {}
+
+    def encode(a):
+        entry = cache.get(id(a), None)
+        if entry is None or entry[0] is not a:
+            entry = (a, encode_array(a))
+            cache[id(a)] = entry
+        return entry[1]
+
+    return encode
+
+
+def subplot_domains(gs: BGridSpec) -> T.List[T.Tuple[ABaxe, T.List[float], T.List[float]]]:
+    """Computes the domains of the axes of a grid, like plotly.subplots.make_subplots
+    with subplot titles. The axes are numbered like make_subplots does: in the row-major order
+    of their top-left cell
+
+    Args:
+        gs: The grid of the figure
+
+    Returns:
+        For each axe, in the order of the plotly axes, the axe,
+        its X domain and its Y domain, in the paper coordinates
+
+    """
+    ncols, nrows = gs.ncols, gs.nrows
+    hspacing = 0.2 / ncols
+    vspacing = 0.5 / nrows
+    width = (1 - hspacing * (ncols - 1)) / ncols
+    height = (1 - vspacing * (nrows - 1)) / nrows
+
+    res = []
+    for axe in gs.figure.list_axes:
+        (start_r, stop_r), (start_c, stop_c) = get_axe_coord(axe)
+        ncells_c = max(stop_c - start_c, 1)
+        ncells_r = max(stop_r - start_r, 1)
+        x0 = start_c * (width + hspacing)
+        # The first row is at the top
+        y1 = 1 - start_r * (height + vspacing)
+        xdomain = [x0, x0 + ncells_c * width + (ncells_c - 1) * hspacing]
+        ydomain = [y1 - ncells_r * height - (ncells_r - 1) * vspacing, y1]
+        res.append(((start_r, start_c), axe, xdomain, ydomain))
+
+    res.sort(key=lambda item: item[0])
+    return [(axe, xdomain, ydomain) for _, axe, xdomain, ydomain in res]
+
+
+@functools.lru_cache(maxsize=None)
+def _template() -> str:
+    # JSON of plotly's default template, that make_subplots sets in the layout
+    import plotly.io as pio
+
+    return json.dumps(pio.templates[pio.templates.default].to_plotly_json())
+
+
+def _line_traces(
+    line: PreparedLine, xref: str, yref: str, encode: T.Callable = encode_array
+) -> T.List[dict]:
+    if line.line_type == DSPLineType.HISTOGRAM:
+        return [
+            {
+                "type": "bar",
+                "x": encode(line.xd),
+                "y": encode_array(line.yd),
+                "name": line.name,
+                "xaxis": xref,
+                "yaxis": yref,
+            }
+        ]
+
+    if line.line_type == DSPLineType.MULTI:
+        # One trace per line, grouped in the legend
+        block = line.plottable.data_source
+        xd = encode(line.xd)
+        return [
+            {
+                "type": "scatter",
+                "x": xd,
+                "y": encode_array(line.yd[:, j]),
+                "name": f"{block.names[j]} ({block.units[j]})",
+                "legendgroup": line.name,
+                "legendgrouptitle": {"text": line.name},
+                "xaxis": xref,
+                "yaxis": yref,
+            }
+            for j in range(block.nlines)
+        ]
+
+    return [
+        {
+            "type": "scatter",
+            "x": encode(line.xd),
+            "y": encode_array(line.yd),
+            "name": line.name,
+            "xaxis": xref,
+            "yaxis": yref,
+        }
+    ]
+
+
+def figure_dict(fig: BFigure, workers: int = None, simplify: float = 0.0) -> dict:
+    """Builds the plotly figure dictionary of a BFigure, equivalent to the figure of
+    `soyut.backend.PlotlyRenderer.simple_plotly_renderer`, without validating it
+
+    Args:
+        fig: The BFigure to render
+        workers: Number of threads used to prepare the data.
+            See `soyut.backend.FigurePreparation.prepare_figure`
+        simplify: Tolerance of the simplification of the lines, in estimated pixels.
+            0 to disable. See `soyut.backend.FigurePreparation.simplify_line`
+
+    Returns:
+        The figure, as a dictionary with the data and layout keys.
+        The traces sharing an X array share its encoded dictionary
+
+    """
+    prepared = dict(zip(map(id, fig.list_axes), prepare_figure(fig, workers=workers)))
+    encode = _array_encoder()
+
+    data = []
+    layout = {"title": {"text": fig.title}, "annotations": []}
+    for k, (axe, xdomain, ydomain) in enumerate(subplot_domains(fig.grid_spec)):
+        with stage("axe", axe=axe.title):
+            suffix = "" if k == 0 else str(k + 1)
+            xaxis = {"anchor": f"y{suffix}", "domain": xdomain}
+            yaxis = {"anchor": f"x{suffix}", "domain": ydomain}
+            layout["annotations"].append(
+                {
+                    "font": {"size": 16},
+                    "showarrow": False,
+                    "text": axe.title,
+                    "x": 0.5 * (xdomain[0] + xdomain[1]),
+                    "xanchor": "center",
+                    "xref": "paper",
+                    "y": ydomain[1],
+                    "yanchor": "bottom",
+                    "yref": "paper",
+                }
+            )
+
+            lines = prepared[id(axe)]
+            size = _axe_size(axe)
+            if simplify > 0 and len(lines) > 0:
+                to_pixels = _pixel_mapping(
+                    [line.xd for line in lines], [line.yd for line in lines], size
+                )
+                lines = [simplify_line(line, to_pixels, simplify) for line in lines]
+
+            for line in lines:
+                with stage("artist", axe=axe.title, plottable=line.name):
+                    data.extend(_line_traces(line, f"x{suffix}", f"y{suffix}", encode))
+                xaxis["title"] = {"text": line.xlabel}
+                yaxis["title"] = {"text": line.ylabel}
+
+            for layer in axe.annotations:
+                with stage("annotations", axe=axe.title, size=len(layer)):
+                    xd, yd, corner = _place_annotations(layer, axe, lines, size)
+                    placed = corner >= 0
+                    textfont = {"size": layer.fontsize}
+                    if "color" in layer.kwargs:
+                        textfont["color"] = layer.kwargs["color"]
+                    data.append(
+                        {
+                            "type": "scatter",
+                            "x": encode_array(xd[placed]),
+                            "y": encode_array(yd[placed]),
+                            "text": [str(t) for t in layer.texts[placed]],
+                            "mode": "text",
+                            "textposition": TEXT_POSITIONS[corner[placed]].tolist(),
+                            "textfont": textfont,
+                            "showlegend": False,
+                            "hoverinfo": "text",
+                            "xaxis": f"x{suffix}",
+                            "yaxis": f"y{suffix}",
+                        }
+                    )
+
+            layout[f"xaxis{suffix}"] = xaxis
+            layout[f"yaxis{suffix}"] = yaxis
+
+    return {"data": data, "layout": layout}
+
+
+def figure_json(fdict: dict) -> str:
+    """Serializes a figure dictionary, with plotly's default template.
+    The template is serialized once per process, and spliced into the layout
+
+    Args:
+        fdict: The figure, see `figure_dict`
+
+    Returns:
+        The JSON of the figure
+
+    """
+    layout = json.dumps(fdict["layout"], separators=(",", ":"))
+    layout = layout[:-1] + ',"template":' + _template() + "}"
+    data = json.dumps(fdict["data"], separators=(",", ":"))
+    return '{"data":' + data + ',"layout":' + layout + "}"
+
+
+def plotlyjs_tag(include_plotlyjs: T.Union[bool, str] = True) -> str:
+    """Returns the script tag loading plotly.js in a page
+
+    Args:
+        include_plotlyjs: True to embed plotly.js in the page,
+            'cdn' to load it from plotly's CDN, False to leave it out
+
+    Returns:
+        The script tag, empty if plotly.js is left out
+
+    """
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+    if include_plotlyjs == "cdn":
+        url = f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
+        return f'<script charset="utf-8" src="{url}"></script>'
+    elif include_plotlyjs:
+        return f'<script type="text/javascript">{get_plotlyjs()}</script>'
+    return ""
+
+
+def shared_blocks(data: T.List[dict]) -> T.Tuple[T.List[dict], T.Dict[str, dict]]:
+    """Replaces the encoded arrays used by several traces (the same dictionary object,
+    see `figure_dict`) by references to blocks, so that they are written once
+
+    Args:
+        data: The traces of a figure dictionary
+
+    Returns:
+        Copies of the traces, where the shared arrays are replaced by {"$ref": key},
+        and the blocks by key
+
+    """
+    counts = {}
+    for trace in data:
+        for v in trace.values():
+            if isinstance(v, dict) and "bdata" in v:
+                counts[id(v)] = counts.get(id(v), 0) + 1
+
+    refs = {}
+    blocks = {}
+    res = []
+    for trace in data:
+        trace = dict(trace)
+        for key, v in trace.items():
+            if isinstance(v, dict) and counts.get(id(v), 0) > 1:
+                if id(v) not in refs:
+                    refs[id(v)] = str(len(blocks))
+                    blocks[refs[id(v)]] = v
+                trace[key] = {"$ref": refs[id(v)]}
+        res.append(trace)
+    return res, blocks
+
+
+def figure_html(fdict: dict, include_plotlyjs: T.Union[bool, str] = True) -> str:
+    """Writes a figure dictionary into a standalone HTML page (see `HTML_TEMPLATE`).
+    The arrays shared by several traces are written once (see `shared_blocks`)
+
+    Args:
+        fdict: The figure, see `figure_dict`
+        include_plotlyjs: True to embed plotly.js in the page,
+            'cdn' to load it from plotly's CDN, False to leave it out
+
+    Returns:
+        The HTML page
+
+    """
+    div_id = f"soyut-{id(fdict):x}"
+    # Inlined in a script tag, that a '</script>' in a title shall not close
+    data, blocks = shared_blocks(fdict["data"])
+    figure = figure_json({"data": data, "layout": fdict["layout"]}).replace("</", "<\\/")
+    return HTML_TEMPLATE.format(
+        plotlyjs=plotlyjs_tag(include_plotlyjs),
+        div_id=div_id,
+        blocks=json.dumps(blocks, separators=(",", ":")),
+        figure=figure,
+    )
+
+
+def dict_plotly_renderer(
+    fig: BFigure,
+    show: bool = False,
+    path: Path = None,
+    workers: int = None,
+    simplify: float = None,
+) -> dict:
+    """Renders a BFigure with plotly, building the figure dictionary directly.
+    The .html and .json files are written without plotly.graph_objects,
+    the static images go through plotly.io and need kaleido
+
+    Args:
+        fig: The BFigure to render
+        show: True to display the figure once built
+        path: If given, path of the file where the figure is saved.
+            HTML if the suffix is .html, JSON if .json, static image otherwise
+        workers: Number of threads used to prepare the data.
+            See `soyut.backend.FigurePreparation.prepare_figure`
+        simplify: Tolerance of the simplification of the lines, in estimated pixels.
+            By default, the lines are simplified only for the vector outputs (svg, pdf).
+            0 to disable. See `soyut.backend.FigurePreparation.simplify_line`
+
+    Returns:
+        The plotly figure dictionary
+
+    """
+    with stage("render", backend="plotly-dict", figure=fig.title):
+        fdict = figure_dict(fig, workers=workers, simplify=simplification_tolerance(path, simplify))
+
+        if path is not None:
+            with stage("write", path=str(path)):
+                suffix = Path(path).suffix
+                if suffix == ".html":
+                    Path(path).write_text(figure_html(fdict), encoding="utf-8")
+                elif suffix == ".json":
+                    Path(path).write_text(figure_json(fdict), encoding="utf-8")
+                else:
+                    import plotly.io as pio
+
+                    pio.write_image(fdict, path)
+
+    if show:
+        import plotly.io as pio
+
+        pio.show(fdict)
+
+    return fdict
@@ -0,0 +1,280 @@
+"""Rendering of BFigure with plotly
+
+"""
+import typing as T
+from pathlib import Path
+
+import numpy as np
+import plotly.graph_objects as go
+
+from ..instrumentation import stage
+from ..frontend.BAxe import ABaxe
+from ..frontend.BFigure import BFigure
+from ..frontend.BLayout import BGridSpec
+from ..frontend.GAnnotations import GAnnotationLayer
+from ..frontend.GraphicSpec import DSPLineType
+from .FigurePreparation import (
+    PreparedLine,
+    prepare_figure,
+    simplification_tolerance,
+    simplify_line,
+)
+
+__all__ = [
+    "get_axe_coord",
+    "gridspec_to_plotly_specs",
+    "annotation_trace",
+    "simple_plotly_renderer",
+]
+
+#: Size of the figures, in pixels, when not set in their layout (plotly's default)
+DEFAULT_SIZE = (700, 450)
+
+#: plotly text position of each corner of `soyut.frontend.GAnnotations.CORNERS`
+TEXT_POSITIONS = np.array(["top right", "top left", "bottom right", "bottom left"])
+
+
+def get_axe_coord(axe: ABaxe) -> T.Tuple[T.Tuple[int, int], T.Tuple[int, int]]:
+    ge = axe.spec
+    gs = axe.figure.grid_spec
+    sr, sc = ge.coord
+
+    if isinstance(sr, int):
+        start_r, stop_r = sr, sr
+    else:
+        start_r, stop_r, _ = sr.indices(gs.nrows)
+
+    if isinstance(sc, int):
+        start_c, stop_c = sc, sc
+    else:
+        start_c, stop_c, _ = sc.indices(gs.ncols)
+
+    return (start_r, stop_r), (start_c, stop_c)
+
+
+def gridspec_to_plotly_specs(gs: BGridSpec):
+    # https://plotly.com/python/subplots/#multiple-custom-sized-subplots
+    axe: ABaxe
+    specs = [[None for _ in range(gs.ncols)] for _ in range(gs.nrows)]
+    for axe in gs.figure.list_axes:
+        (start_r, stop_r), (start_c, stop_c) = get_axe_coord(axe)
+
+        if start_r == stop_r and start_c == stop_c:
+            axe_spec = {}
+        elif start_r < stop_r and start_c == stop_c:
+            axe_spec = {"rowspan": stop_r - start_r}
+        elif start_r == stop_r and start_c < stop_c:
+            axe_spec = {"colspan": stop_c - start_c}
+        elif start_r < stop_r and start_c < stop_c:
+            axe_spec = {"rowspan": stop_r - start_r, "colspan": stop_c - start_c}
+
+        specs[start_r][start_c] = axe_spec
+
+    return specs
+
+
+def _pixel_mapping(
+    xs: T.List[np.ndarray], ys: T.List[np.ndarray], size: T.Tuple[float, float]
+) -> T.Callable:
+    # Linear conversion of the data coordinates into the pixels of an axe of the given size,
+    # autoscaled on the arrays xs and ys
+    lims = []
+    for arrs in (xs, ys):
+        arrs = [a for a in map(np.ravel, arrs) if np.isfinite(a).any()]
+        vmin = min((np.nanmin(a) for a in arrs), default=0.0)
+        vmax = max((np.nanmax(a) for a in arrs), default=1.0)
+        lims.append((vmin, vmax if vmax > vmin else vmin + 1.0))
+    (x0, x1), (y0, y1) = lims
+    width, height = size
+
+    def to_pixels(xd, yd):
+        return (xd - x0) * (width / (x1 - x0)), (yd - y0) * (height / (y1 - y0))
+
+    return to_pixels
+
+
+def _place_annotations(
+    layer: GAnnotationLayer,
+    axe: ABaxe,
+    lines: T.List[PreparedLine],
+    size: T.Tuple[float, float],
+) -> T.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Coordinates of the annotated points, in the units of the lines, and corner of their labels
+    xmult, ymult = (lines[-1].xmult, lines[-1].ymult) if len(lines) > 0 else (1, 1)
+    xd, yd = layer.make_points(axe)
+    xd = xd / xmult
+    yd = yd / ymult
+
+    # Autoscaled limits: the ones of the lines and of the annotated points
+    to_pixels = _pixel_mapping(
+        [xd] + [line.xd for line in lines], [yd] + [line.yd for line in lines], size
+    )
+    px, py = to_pixels(xd, yd)
+    corner, _, _ = layer.place(px, py)
+    return xd, yd, corner
+
+
+def _axe_size(axe: ABaxe) -> T.Tuple[float, float]:
+    # About 75% of the cells of the grid covered by the axe is the plotting area
+    (start_r, stop_r), (start_c, stop_c) = get_axe_coord(axe)
+    gs = axe.figure.grid_spec
+    return (
+        0.75 * DEFAULT_SIZE[0] * max(stop_c - start_c, 1) / gs.ncols,
+        0.75 * DEFAULT_SIZE[1] * max(stop_r - start_r, 1) / gs.nrows,
+    )
+
+
+def annotation_trace(
+    layer: GAnnotationLayer,
+    axe: ABaxe,
+    lines: T.List[PreparedLine],
+    size: T.Tuple[float, float],
+) -> go.Scatter:
+    """Builds a single text trace with the labels of an annotation layer.
+    As plotly places the texts in the browser, the labels are placed beforehand for the
+    autoscaled limits of the axe, and an estimate of its size in pixels
+
+    Args:
+        layer: The annotations
+        axe: The axe where the layer is drawn
+        lines: The prepared lines of the axe
+        size: Estimated width and height of the axe, in pixels
+
+    Returns:
+        The trace, with the labels that could be placed
+
+    """
+    xd, yd, corner = _place_annotations(layer, axe, lines, size)
+    placed = corner >= 0
+
+    return go.Scatter(
+        x=xd[placed],
+        y=yd[placed],
+        text=list(layer.texts[placed]),
+        mode="text",
+        textposition=list(TEXT_POSITIONS[corner[placed]]),
+        textfont=dict(size=layer.fontsize, color=layer.kwargs.get("color", None)),
+        showlegend=False,
+        hoverinfo="text",
+    )
+
+
+def _write_html(pfig: go.Figure, xsources: T.List[T.Optional[np.ndarray]], path: Path):
+    # Writes the figure like pfig.write_html, but with the X arrays shared by several traces
+    # written once. xsources holds the X array of each trace, None if it is not shared
+    from .PlotlyDictRenderer import _array_encoder, encode_array, figure_html
+
+    fdict = pfig.to_plotly_json()
+    # plotly's default template, that figure_html adds
+    fdict["layout"].pop("template", None)
+    encode = _array_encoder()
+    for trace, xd in zip(fdict["data"], xsources):
+        for key, v in trace.items():
+            if isinstance(v, np.ndarray):
+                trace[key] = encode_array(v)
+        if xd is not None:
+            trace["x"] = encode(xd)
+    Path(path).write_text(figure_html(fdict), encoding="utf-8")
+
+
+def simple_plotly_renderer(
+    fig: BFigure,
+    show: bool = True,
+    path: Path = None,
+    workers: int = None,
+    simplify: float = None,
+) -> go.Figure:
+    """Renders a BFigure with plotly
+
+    Args:
+        fig: The BFigure to render
+        show: True to display the figure once built
+        path: If given, path of the file where the figure is saved.
+            HTML if the suffix is .html, static image otherwise
+        workers: Number of threads used to prepare the data.
+            See `soyut.backend.FigurePreparation.prepare_figure`
+        simplify: Tolerance of the simplification of the lines, in estimated pixels.
+            By default, the lines are simplified only for the vector outputs (svg, pdf).
+            0 to disable. See `soyut.backend.FigurePreparation.simplify_line`
+
+    Returns:
+        The plotly figure
+
+    """
+    from plotly.subplots import make_subplots
+
+    with stage("render", backend="plotly", figure=fig.title):
+        prepared = prepare_figure(fig, workers=workers)
+        tolerance = simplification_tolerance(path, simplify)
+
+        specs = gridspec_to_plotly_specs(fig.grid_spec)
+        axes_titles = [axe.title for axe in fig.list_axes]
+        pfig = make_subplots(
+            rows=fig.grid_spec.nrows,
+            cols=fig.grid_spec.ncols,
+            specs=specs,
+            subplot_titles=axes_titles,
+        )
+        pfig.update_layout(title_text=fig.title)
+        # X array of each trace, so that the shared ones are written once
+        xsources = []
+
+        for i, (axe, lines) in enumerate(zip(fig.list_axes, prepared)):
+            with stage("axe", axe=axe.title):
+                (start_r, stop_r), (start_c, stop_c) = get_axe_coord(axe)
+                size = _axe_size(axe)
+                if tolerance > 0 and len(lines) > 0:
+                    to_pixels = _pixel_mapping(
+                        [line.xd for line in lines], [line.yd for line in lines], size
+                    )
+                    lines = [simplify_line(line, to_pixels, tolerance) for line in lines]
+
+                for line in lines:
+                    with stage("artist", axe=axe.title, plottable=line.name):
+                        if line.line_type == DSPLineType.HISTOGRAM:
+                            traces = [go.Bar(x=line.xd, y=line.yd, name=line.name)]
+                        elif line.line_type == DSPLineType.MULTI:
+                            # One trace per line, grouped in the legend
+                            block = line.plottable.data_source
+                            traces = [
+                                go.Scatter(
+                                    x=line.xd,
+                                    y=line.yd[:, j],
+                                    name=f"{block.names[j]} ({block.units[j]})",
+                                    legendgroup=line.name,
+                                    legendgrouptitle_text=line.name,
+                                )
+                                for j in range(block.nlines)
+                            ]
+                        else:
+                            traces = [go.Scatter(x=line.xd, y=line.yd, name=line.name)]
+                        pfig.add_traces(
+                            traces,
+                            rows=start_r + 1,
+                            cols=start_c + 1,
+                        )
+                        xsources.extend([line.xd] * len(traces))
+
+                    pfig["layout"][f"xaxis{i+1}"]["title"] = line.xlabel
+                    pfig["layout"][f"yaxis{i+1}"]["title"] = line.ylabel
+
+                for layer in axe.annotations:
+                    with stage("annotations", axe=axe.title, size=len(layer)):
+                        pfig.add_trace(
+                            annotation_trace(layer, axe, lines, size),
+                            row=start_r + 1,
+                            col=start_c + 1,
+                        )
+                        xsources.append(None)
+
+        if path is not None:
+            with stage("write", path=str(path)):
+                if Path(path).suffix == ".html":
+                    _write_html(pfig, xsources, path)
+                else:
+                    pfig.write_image(path)
+
+    if show:
+        pfig.show()
+
+    return pfig
@@ -0,0 +1,706 @@
+"""Local render server, that keeps the backends imported and warm between figures
+
+Importing matplotlib and plotly and loading their fonts and templates takes seconds, which
+dominates the rendering time of small figures when each report is produced by a new
+Python process. The render server is started once, and batch scripts send it their figures.
+
+The jobs are `RenderJob` objects, pickled and posted over HTTP, on a Unix socket or on TCP.
+As unpickling runs arbitrary code, the server shall only be reachable by trusted clients:
+by default it listens on a Unix socket only accessible by its owner, in a private folder.
+Listening on TCP is opt-in, and then every request shall carry the secret token of the server
+in its Authorization header (`Bearer <token>`), which is checked before the body is read.
+
+Endpoints:
+
+* POST /render: renders the pickled `RenderJob` of the request body.
+  Returns the content of the file, or a JSON object with the path of the written file
+* GET /metrics: returns the queue depth and latency metrics as a JSON object
+* GET /health: returns 'ok'. The only endpoint that does not need the token
+
+Examples:
+    Start the server, then render a pickled BFigure from the command line:
+
+        python -m soyut.backend.RenderServer serve
+        python -m soyut.backend.RenderServer render fig.pkl -o fig.png
+
+    Both use the socket given by `default_socket_path`. To serve on TCP, share a token:
+
+        export SOYUT_RENDER_TOKEN=...
+        python -m soyut.backend.RenderServer --port 10124 serve
+
+"""
+import os
+import sys
+import hmac
+import json
+import time
+import pickle
+import shutil
+import socket
+import secrets
+import tempfile
+import argparse
+import threading
+import typing as T
+import http.client
+from pathlib import Path
+from collections import deque
+from dataclasses import dataclass, field
+from socketserver import ThreadingMixIn, UnixStreamServer
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from .. import logger
+from ..frontend.BFigure import BFigure
+from ..frontend.GraphicSpec import FigureSpec
+from .AsyncRenderer import RenderQueueFull, render_to_bytes, export_figure
+
+__all__ = [
+    "RenderJob",
+    "RenderMetrics",
+    "RenderServer",
+    "RenderClient",
+    "default_socket_path",
+    "main",
+]
+
+#: Environment variable holding the token of the TCP render servers, used by the CLI
+TOKEN_ENV = "SOYUT_RENDER_TOKEN"
+
+#: Content types of the rendered files
+CONTENT_TYPES = {
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "svg": "image/svg+xml",
+    "pdf": "application/pdf",
+    "html": "text/html",
+    "json": "application/json",
+}
+
+
+@dataclass(init=True)
+class RenderJob:
+    """A figure to render, described either by a BFigure, or by a FigureSpec and its data
+
+    Args:
+        figure: The BFigure to render
+        spec: The FigureSpec to render, if figure is None.
+            See `soyut.frontend.BFigure.BFigure.from_spec`
+        data: Mapping of the variables' names of spec to their data
+        units: Mapping of the variables' names of spec to their units
+        backend: 'mpl' or 'plotly'
+        format: Format of the file. Ignored if path is given
+        path: If given, path of the file written by the server. The content of the file
+            is returned otherwise
+
+    """
+
+    figure: BFigure = None
+    spec: FigureSpec = None
+    data: dict = None
+    units: dict = None
+    backend: str = "mpl"
+    format: str = "png"
+    path: str = None
+
+    def build(self) -> BFigure:
+        """Returns the BFigure to render
+
+        Returns:
+            The BFigure of the job, or the one built from its FigureSpec
+
+        """
+        if self.figure is not None:
+            return self.figure
+        if self.spec is None:
+            raise ValueError("A RenderJob needs a figure or a spec")
+        return BFigure.from_spec(self.spec, self.data, units=self.units)
+
+    def run(self) -> T.Union[bytes, Path]:
+        """Renders the job in the calling thread
+
+        Returns:
+            The content of the file, or the path of the written file
+
+        """
+        fig = self.build()
+        if self.path is None:
+            return render_to_bytes(fig, backend=self.backend, format=self.format)
+        else:
+            return export_figure(fig, self.path, backend=self.backend)
+
+
+@dataclass(init=True)
+class RenderMetrics:
+    """Thread-safe counters of a RenderServer
+
+    Args:
+        window: Number of jobs over which the latencies are computed
+
+    """
+
+    window: int = 1024
+    pending: int = 0
+    running: int = 0
+    completed: int = 0
+    failed: int = 0
+    rejected: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    _latencies: deque = None
+    _waits: deque = None
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def __post_init__(self):
+        self._latencies = deque(maxlen=self.window)
+        self._waits = deque(maxlen=self.window)
+
+    def try_submit(self, max_queue: int) -> bool:
+        """Counts a new pending job, unless max_queue jobs are already pending.
+        The check and the count are done under the same lock
+
+        Args:
+            max_queue: Maximum number of pending jobs
+
+        Returns:
+            True if the job was counted, False if it was counted as rejected
+
+        """
+        with self._lock:
+            if self.pending >= max_queue:
+                self.rejected += 1
+                return False
+            self.pending += 1
+            return True
+
+    def on_start(self, wait: float):
+        with self._lock:
+            self.pending -= 1
+            self.running += 1
+            self._waits.append(wait)
+
+    def on_end(self, latency: float, ok: bool):
+        with self._lock:
+            self.running -= 1
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+            self._latencies.append(latency)
+
+    @staticmethod
+    def _describe(values: T.Iterable[float]) -> dict:
+        a = np.fromiter(values, dtype=np.float64)
+        if len(a) == 0:
+            return dict(mean=None, p50=None, p95=None, max=None)
+        p50, p95 = np.percentile(a, [50, 95])
+        return dict(mean=float(a.mean()), p50=float(p50), p95=float(p95), max=float(a.max()))
+
+    def snapshot(self) -> dict:
+        """Returns the current values of the metrics. The latencies and the times spent in queue
+        are given in seconds, over the last jobs
+
+        Returns:
+            A JSON-serializable dictionary
+
+        """
+        with self._lock:
+            latencies = list(self._latencies)
+            waits = list(self._waits)
+            res = dict(
+                queue_depth=self.pending,
+                running=self.running,
+                completed=self.completed,
+                failed=self.failed,
+                rejected=self.rejected,
+                uptime=time.monotonic() - self.started_at,
+            )
+        res["latency"] = self._describe(latencies)
+        res["queue_wait"] = self._describe(waits)
+        return res
+
+
+class _RenderRequestHandler(BaseHTTPRequestHandler):
+    server_version = "soyut-render"
+
+    def log_message(self, format, *args):
+        logger.debug("render server: " + format % args)
+
+    def _reply(self, code: int, body: bytes, content_type: str):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _reply_json(self, code: int, obj):
+        self._reply(code, json.dumps(obj).encode("utf-8"), "application/json")
+
+    def _authorized(self) -> bool:
+        token = self.server.render_server.token
+        if token is None:
+            return True
+        given = self.headers.get("Authorization", "")
+        if hmac.compare_digest(given.encode("utf-8"), f"Bearer {token}".encode("utf-8")):
+            return True
+        self.close_connection = True
+        self._reply_json(401, dict(error="Missing or invalid render server token"))
+        return False
+
+    def do_GET(self):
+        render_server: RenderServer = self.server.render_server
+        if self.path == "/health":
+            self._reply(200, b"ok", "text/plain")
+        elif not self._authorized():
+            return
+        elif self.path == "/metrics":
+            self._reply_json(200, render_server.metrics())
+        else:
+            self._reply_json(404, dict(error=f"Unknown path '{self.path}'"))
+
+    def do_POST(self):
+        render_server: RenderServer = self.server.render_server
+        # Nothing is read, let alone unpickled, before the client is authenticated
+        if not self._authorized():
+            return
+        if self.path != "/render":
+            self._reply_json(404, dict(error=f"Unknown path '{self.path}'"))
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            job = pickle.loads(self.rfile.read(length))
+            if isinstance(job, BFigure):
+                job = RenderJob(figure=job)
+            res = render_server.submit(job).result()
+        except RenderQueueFull as e:
+            self._reply_json(503, dict(error=str(e)))
+            return
+        except Exception as e:
+            logger.exception("Rendering job failed")
+            self._reply_json(500, dict(error=f"{type(e).__name__}: {e}"))
+            return
+
+        if isinstance(res, Path):
+            self._reply_json(200, dict(path=str(res)))
+        else:
+            self._reply(200, res, CONTENT_TYPES.get(job.format, "application/octet-stream"))
+
+
+class _UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        UnixStreamServer.server_bind(self)
+        os.chmod(self.server_address, 0o600)
+
+
+class _UnixHTTPHandler(_RenderRequestHandler):
+    def address_string(self):
+        return "unix"
+
+
+def default_socket_path() -> str:
+    """Returns the path of the Unix socket used by default by the command line interface.
+    The socket is in $XDG_RUNTIME_DIR if defined, or else in a folder of the temporary
+    directory, created only accessible by the user
+
+    Returns:
+        The path of the socket
+
+    Raises:
+        PermissionError: if the folder already exists, and is not private to the user
+
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR", None)
+    if runtime_dir:
+        return os.path.join(runtime_dir, "soyut-render.sock")
+
+    folder = os.path.join(tempfile.gettempdir(), f"soyut-render-{os.getuid()}")
+    os.makedirs(folder, mode=0o700, exist_ok=True)
+    st = os.lstat(folder)
+    if st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(f"The folder '{folder}' shall only be accessible by its owner")
+    return os.path.join(folder, "render.sock")
+
+
+class RenderServer(object):
+    """Local render server. The jobs are rendered by a pool of threads,
+    where the backends were imported and exercised once at startup.
+
+    By default, the server listens on a Unix socket created in a new private folder,
+    removed by `RenderServer.shutdown`. If a port is given, it listens on TCP instead,
+    and the clients shall send the token of the server (see `RenderClient`)
+
+    Args:
+        host: Address to listen on, if port is given
+        port: If given, port to listen on, instead of a Unix socket. 0 to pick a free port
+        socket_path: If given, path of the Unix socket to listen on.
+            Its folder shall not be writable by other users
+        token: Secret that the clients shall send. Required on TCP, where a random one is
+            generated if None. Optional on a Unix socket
+        max_workers: Number of rendering threads
+        max_queue: Maximum number of jobs waiting for a thread.
+            The following ones are rejected with `soyut.backend.AsyncRenderer.RenderQueueFull`
+        warm: Backends to import and exercise at startup
+
+    Examples:
+        >>> server = RenderServer(warm=[])
+        >>> server.start()
+        >>> client = RenderClient(server.url)
+        >>> client.metrics()["queue_depth"]
+        0
+        >>> server.shutdown()
+
+    """
+
+    __slots__ = [
+        "socket_path",
+        "token",
+        "max_queue",
+        "executor",
+        "httpd",
+        "_metrics",
+        "_thread",
+        "_tmpdir",
+    ]
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = None,
+        socket_path: str = None,
+        token: str = None,
+        max_workers: int = 4,
+        max_queue: int = 256,
+        warm: T.Iterable[str] = ("mpl", "plotly"),
+    ):
+        if port is not None and socket_path is not None:
+            raise ValueError("Give either a port or a socket_path")
+        if port is not None and token is None:
+            token = secrets.token_urlsafe(32)
+
+        self.token = token
+        self.max_queue = max_queue
+        self._metrics = RenderMetrics()
+        self._thread: threading.Thread = None
+        self._tmpdir: str = None
+
+        for backend in warm:
+            self.warm(backend)
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="soyut-serve"
+        )
+
+        if port is not None:
+            self.socket_path = None
+            self.httpd = ThreadingHTTPServer((host, port), _RenderRequestHandler)
+        else:
+            if socket_path is None:
+                # mkdtemp creates the folder with the mode 0o700
+                self._tmpdir = tempfile.mkdtemp(prefix="soyut-render-")
+                socket_path = os.path.join(self._tmpdir, "render.sock")
+            elif os.path.exists(socket_path):
+                os.unlink(socket_path)
+            self.socket_path = socket_path
+            self.httpd = _UnixHTTPServer(socket_path, _UnixHTTPHandler)
+        self.httpd.render_server = self
+
+    @property
+    def url(self) -> str:
+        """Address of the server: an http URL, or the path of the Unix socket"""
+        if self.socket_path is not None:
+            return self.socket_path
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @staticmethod
+    def warm(backend: str):
+        """Imports a backend and renders a small figure with it,
+        so that the first actual job does not pay for the imports and the font loading
+
+        Args:
+            backend: 'mpl' or 'plotly'
+
+        """
+        t0 = time.monotonic()
+        fig = BFigure("warm")
+        gs = fig.add_gridspec(nrows=1, ncols=1)
+        axe = fig.add_axe("warm", spec=gs[0, 0])
+        axe.plot((np.arange(3.0), np.arange(3.0)))
+        render_to_bytes(fig, backend=backend, format="png" if backend == "mpl" else "json")
+        logger.info(f"Backend '{backend}' warmed in {time.monotonic() - t0:.2f} s")
+
+    def metrics(self) -> dict:
+        """Returns the metrics of the server. See `RenderMetrics.snapshot`
+
+        Returns:
+            A JSON-serializable dictionary
+
+        """
+        res = self._metrics.snapshot()
+        res["workers"] = self.executor._max_workers
+        return res
+
+    def _run(self, job: RenderJob, t_submit: float):
+        t_start = time.monotonic()
+        self._metrics.on_start(t_start - t_submit)
+        ok = False
+        try:
+            res = job.run()
+            ok = True
+            return res
+        finally:
+            self._metrics.on_end(time.monotonic() - t_submit, ok)
+
+    def submit(self, job: RenderJob) -> Future:
+        """Submits a job to the rendering threads
+
+        Args:
+            job: The job to render
+
+        Returns:
+            The future result of `RenderJob.run`
+
+        Raises:
+            RenderQueueFull: if max_queue jobs are already waiting
+
+        """
+        if not self._metrics.try_submit(self.max_queue):
+            raise RenderQueueFull(f"{self.max_queue} rendering jobs already waiting")
+
+        return self.executor.submit(self._run, job, time.monotonic())
+
+    def serve_forever(self):
+        """Serves the requests until `RenderServer.shutdown` is called"""
+        self.httpd.serve_forever()
+
+    def start(self):
+        """Serves the requests in a background thread"""
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="soyut-render-server", daemon=True
+        )
+        self._thread.start()
+
+    def shutdown(self):
+        """Stops serving, and waits for the running jobs"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        self.executor.shutdown(wait=True)
+        if self.socket_path is not None and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        if self._tmpdir is not None:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class RenderClient(object):
+    """Client of a `RenderServer`
+
+    Args:
+        url: An http URL, or the path of a Unix socket
+        timeout: Timeout of the requests (s). None for no timeout
+        token: Token of the server (see `RenderServer`), sent with every request
+
+    Raises:
+        PermissionError: by the requests, if the server rejected the token
+
+    """
+
+    __slots__ = ["url", "timeout", "token"]
+
+    def __init__(self, url: str, timeout: float = None, token: str = None):
+        self.url = url
+        self.timeout = timeout
+        self.token = token
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self.url.startswith("http://"):
+            hostport = self.url[len("http://") :].rstrip("/")
+            return http.client.HTTPConnection(hostport, timeout=self.timeout)
+        return _UnixHTTPConnection(self.url, timeout=self.timeout)
+
+    def _request(self, method: str, path: str, body: bytes = None) -> T.Tuple[bytes, str]:
+        headers = {}
+        if self.token is not None:
+            headers["Authorization"] = f"Bearer {self.token}"
+        conn = self._connection()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            data = resp.read()
+        finally:
+            conn.close()
+
+        if resp.status == 503:
+            raise RenderQueueFull(json.loads(data)["error"])
+        if resp.status == 401:
+            raise PermissionError(json.loads(data)["error"])
+        if resp.status != 200:
+            raise RuntimeError(json.loads(data)["error"])
+
+        return data, resp.getheader("Content-Type")
+
+    def submit(self, job: RenderJob) -> T.Union[bytes, Path]:
+        """Sends a job to the server and waits for its result
+
+        Args:
+            job: The job to render
+
+        Returns:
+            The content of the file, or the path of the written file
+
+        """
+        data, ctype = self._request("POST", "/render", body=pickle.dumps(job))
+        if job.path is not None:
+            return Path(json.loads(data)["path"])
+        return data
+
+    def render(self, fig: BFigure, backend: str = "mpl", format: str = "png") -> bytes:
+        """Renders a BFigure into an in-memory file
+
+        Args:
+            fig: The BFigure to render
+            backend: 'mpl' or 'plotly'
+            format: Format of the file
+
+        Returns:
+            The content of the file
+
+        """
+        return self.submit(RenderJob(figure=fig, backend=backend, format=format))
+
+    def export(self, fig: BFigure, path: Path, backend: str = "mpl") -> Path:
+        """Renders a BFigure into a file, written by the server
+
+        Args:
+            fig: The BFigure to render
+            path: Path of the file to write. Made absolute, as the server may run elsewhere
+            backend: 'mpl' or 'plotly'
+
+        Returns:
+            The path of the written file
+
+        """
+        path = str(Path(path).absolute())
+        return self.submit(RenderJob(figure=fig, backend=backend, path=path))
+
+    def metrics(self) -> dict:
+        """Returns the metrics of the server. See `RenderServer.metrics`
+
+        Returns:
+            A dictionary
+
+        """
+        data, _ = self._request("GET", "/metrics")
+        return json.loads(data)
+
+
+def main(argv: T.List[str] = None) -> int:
+    """Command line interface of the render server and of its client
+
+    Args:
+        argv: The command line arguments. By default, sys.argv[1:]
+
+    Returns:
+        The exit code
+
+    """
+    parser = argparse.ArgumentParser(prog="soyut-render", description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1", help="Address of the TCP server")
+    parser.add_argument(
+        "--port", type=int, default=None, help="Port of the TCP server, instead of a Unix socket"
+    )
+    parser.add_argument(
+        "--socket", default=None, help="Unix socket of the server. See default_socket_path"
+    )
+    parser.add_argument(
+        "--token",
+        default=os.environ.get(TOKEN_ENV, None),
+        help=f"Token of the server. By default, ${TOKEN_ENV}",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_serve = sub.add_parser("serve", help="Starts a render server")
+    p_serve.add_argument("--workers", type=int, default=4, help="Number of rendering threads")
+    p_serve.add_argument("--max-queue", type=int, default=256, help="Maximum queue depth")
+
+    p_render = sub.add_parser("render", help="Renders pickled BFigure or RenderJob files")
+    p_render.add_argument("inputs", nargs="+", help="Pickled BFigure or RenderJob files")
+    p_render.add_argument(
+        "-o", "--output", default=None, help="Output file, or folder if several inputs"
+    )
+    p_render.add_argument("--backend", default="mpl", help="'mpl' or 'plotly'")
+    p_render.add_argument("--format", default="png", help="Format of the files")
+
+    sub.add_parser("metrics", help="Prints the metrics of a render server")
+
+    args = parser.parse_args(argv)
+    if args.port is None and args.socket is None:
+        args.socket = default_socket_path()
+
+    if args.command == "serve":
+        server = RenderServer(
+            host=args.host,
+            port=args.port,
+            socket_path=args.socket,
+            token=args.token,
+            max_workers=args.workers,
+            max_queue=args.max_queue,
+        )
+        logger.info(f"Render server listening on {server.url}")
+        if args.port is not None and args.token is None:
+            print(f"{TOKEN_ENV}={server.token}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
+        return 0
+
+    url = args.socket if args.socket is not None else f"http://{args.host}:{args.port}"
+    client = RenderClient(url, token=args.token)
+
+    if args.command == "metrics":
+        print(json.dumps(client.metrics(), indent=2))
+        return 0
+
+    for inp in args.inputs:
+        inp = Path(inp)
+        with open(inp, "rb") as f:
+            job = pickle.load(f)
+        if isinstance(job, BFigure):
+            job = RenderJob(figure=job, backend=args.backend, format=args.format)
+
+        if args.output is None:
+            out = inp.with_suffix(f".{job.format}")
+        elif len(args.inputs) > 1 or Path(args.output).is_dir():
+            out = Path(args.output) / f"{inp.stem}.{job.format}"
+        else:
+            out = Path(args.output)
+        job.path = str(out.absolute())
+
+        print(client.submit(job))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""Transport of BFigure objects to worker processes, with their arrays in shared memory
+
+"""
+import io
+import sys
+import pickle
+import threading
+import typing as T
+from concurrent.futures import Executor, Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .. import logger
+
+__all__ = ["SharedPayload", "SharedArrayTransport", "loads"]
+
+#: Arrays smaller than this size, in bytes, are pickled as usual
+DEFAULT_MIN_BYTES = 64 * 1024
+
+# Tag of the persistent ids of the shared arrays
+_TAG = "soyut-shm"
+
+
+class SharedPayload(object):
+    """A pickled object whose large arrays are in shared memory segments.
+    Only the pickle, and the names of the segments, are sent to the worker processes
+
+    Args:
+        data: The pickle, referencing the segments
+        names: Names of the segments referenced
+
+    """
+
+    __slots__ = ["data", "names"]
+
+    def __init__(self, data: bytes, names: T.List[str]):
+        self.data = data
+        self.names = names
+
+    def __getstate__(self):
+        return self.data, self.names
+
+    def __setstate__(self, state):
+        self.data, self.names = state
+
+
+def _slot_values(obj) -> T.Iterator:
+    for cls in type(obj).__mro__:
+        for slot in getattr(cls, "__slots__", ()):
+            value = getattr(obj, slot, None)
+            if value is not None:
+                yield value
+
+
+class _Pickler(pickle.Pickler):
+    # Replaces the large arrays by the names of their shared segments
+    def __init__(self, file, transport: "SharedArrayTransport", names: T.List[str]):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.transport = transport
+        self.names = names
+        # id of an array -> (id, version) of the GVariable or GMultiLine holding it
+        self.versions: T.Dict[int, tuple] = {}
+
+    def _register(self, owner):
+        # The owner is pickled before its arrays: they are shared under its current version,
+        # so that an array modified in place and invalidated gets a new segment
+        tag = (id(owner), owner.version)
+        for value in _slot_values(owner):
+            if isinstance(value, np.ndarray):
+                self.versions[id(value)] = tag
+            elif hasattr(type(value), "__slots__") and not hasattr(value, "version"):
+                # Arrays of a CompactArray for instance
+                for v in _slot_values(value):
+                    if isinstance(v, np.ndarray):
+                        self.versions[id(v)] = tag
+
+    def persistent_id(self, obj):
+        if type(obj) is not np.ndarray:
+            if hasattr(type(obj), "__slots__") and isinstance(getattr(obj, "version", None), int):
+                self._register(obj)
+            return None
+
+        if obj.nbytes < self.transport.min_bytes or obj.dtype.hasobject:
+            return None
+
+        return self.transport._share(obj, self.versions.get(id(obj), None), self.names)
+
+
+# Segments attached by this process, by name
+_attached: T.Dict[str, shared_memory.SharedMemory] = {}
+_attached_lock = threading.Lock()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    with _attached_lock:
+        shm = _attached.get(name, None)
+        if shm is None:
+            if sys.version_info >= (3, 13):
+                # The segment belongs to the process that created it
+                shm = shared_memory.SharedMemory(name=name, track=False)
+            else:
+                shm = shared_memory.SharedMemory(name=name)
+            _attached[name] = shm
+    return shm
+
+
+def _detach(names: T.List[str]):
+    # Closes the segments whose arrays are no longer referenced
+    with _attached_lock:
+        for name in names:
+            shm = _attached.pop(name, None)
+            if shm is None:
+                continue
+            try:
+                shm.close()
+            except BufferError:
+                # An array of the segment is still alive, in the result for instance
+                _attached[name] = shm
+
+
+class _Unpickler(pickle.Unpickler):
+    def persistent_load(self, pid):
+        tag, name, dtype, shape, order = pid
+        if tag != _TAG:
+            raise pickle.UnpicklingError(f"Unknown persistent id '{tag}'")
+        shm = _attach(name)
+        a = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, order=order)
+        # The segment is shared with the other workers
+        a.flags.writeable = False
+        return a
+
+
+def loads(payload: SharedPayload):
+    """Rebuilds an object sent by `SharedArrayTransport.dumps`. Its large arrays are read-only
+    views of the shared segments, attached without copy
+
+    Args:
+        payload: The payload
+
+    Returns:
+        The object
+
+    """
+    return _Unpickler(io.BytesIO(payload.data)).load()
+
+
+def _call_shared(func: T.Callable, payload: SharedPayload, *args):
+    # Runs in a worker process
+    obj = loads(payload)
+    try:
+        return func(obj, *args)
+    finally:
+        del obj
+        _detach(payload.names)
+
+
+class SharedArrayTransport(object):
+    """Sends objects holding large numpy arrays, like BFigure objects, to worker processes
+    without copying the arrays into each pickle.
+
+    Each array of at least *min_bytes* bytes is copied once into a named
+    multiprocessing.shared_memory segment, and the pickle sent to the workers only holds
+    the name, type and shape of the segment. The workers attach the segments, and get
+    read-only views of the arrays. An array shared by several objects, or sent several times,
+    uses a single segment.
+
+    The segments are reference-counted: each payload holds a reference on the segments it
+    uses, until it is released (`SharedArrayTransport.release`, or automatically with
+    `SharedArrayTransport.submit`). A segment without references is unlinked.
+    `SharedArrayTransport.close` unlinks all the segments.
+
+    The arrays of a GVariable or of a GMultiLine are shared under the version of their owner:
+    once modified in place and invalidated, they are copied in a new segment, and the payloads
+    already sent keep the previous data. The other arrays shall not be modified in place
+    while they are shared.
+
+    Args:
+        min_bytes: Size under which the arrays are pickled as usual
+
+    Examples:
+        >>> from concurrent.futures import ProcessPoolExecutor
+        >>> with SharedArrayTransport() as transport:  # doctest: +SKIP
+        ...     with ProcessPoolExecutor(4) as pool:
+        ...         futures = [
+        ...             transport.submit(pool, export_figure, fig, f"{i}.png") for i in range(4)
+        ...         ]
+
+    """
+
+    __slots__ = ["min_bytes", "_lock", "_segments", "_by_name"]
+
+    def __init__(self, min_bytes: int = DEFAULT_MIN_BYTES):
+        self.min_bytes = min_bytes
+        self._lock = threading.Lock()
+        # (id of the shared array, version of its owner)
+        # -> [array, segment, persistent id, number of references]
+        self._segments: T.Dict[tuple, list] = {}
+        self._by_name: T.Dict[str, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of the shared segments"""
+        with self._lock:
+            return sum(entry[1].size for entry in self._segments.values())
+
+    def _share(self, a: np.ndarray, version: tuple, names: T.List[str]) -> tuple:
+        # Returns the persistent id of an array, copied once in a new segment, and takes
+        # the reference of the payload being pickled, whose segments are listed in names.
+        # Both are done under the lock, so that a concurrent release cannot unlink the segment.
+        # The array is kept referenced, so that its id is not reused while it is shared
+        key = (id(a), version)
+        with self._lock:
+            entry = self._segments.get(key, None)
+            if entry is None or entry[0] is not a:
+                order = "F" if a.flags.f_contiguous and not a.flags.c_contiguous else "C"
+                shm = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+                view = np.ndarray(a.shape, dtype=a.dtype, buffer=shm.buf, order=order)
+                view[...] = a
+                del view
+                pid = (_TAG, shm.name, a.dtype.str, a.shape, order)
+                entry = [a, shm, pid, 0]
+                self._segments[key] = entry
+                self._by_name[shm.name] = key
+                logger.debug(f"Shared array of {a.nbytes} bytes in segment {shm.name}")
+
+            pid = entry[2]
+            if pid[1] not in names:
+                entry[3] += 1
+                names.append(pid[1])
+            return pid
+
+    def dumps(self, obj) -> SharedPayload:
+        """Pickles an object, with its large arrays in shared segments.
+        The payload holds a reference on its segments, until it is released
+
+        Args:
+            obj: The object to send
+
+        Returns:
+            The payload, to be given to `loads` in the worker
+
+        """
+        names: T.List[str] = []
+        buf = io.BytesIO()
+        try:
+            _Pickler(buf, self, names).dump(obj)
+        except BaseException:
+            self.release(SharedPayload(b"", names))
+            raise
+        return SharedPayload(buf.getvalue(), names)
+
+    def release(self, payload: SharedPayload):
+        """Releases the references of a payload. The segments without references are unlinked
+
+        Args:
+            payload: A payload returned by `SharedArrayTransport.dumps`
+
+        """
+        with self._lock:
+            for name in payload.names:
+                key = self._by_name.get(name, None)
+                if key is None:
+                    continue
+                entry = self._segments[key]
+                entry[3] -= 1
+                if entry[3] <= 0:
+                    self._unlink(key)
+
+    def _unlink(self, key: tuple):
+        _, shm, pid, _ = self._segments.pop(key)
+        del self._by_name[pid[1]]
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def submit(self, executor: Executor, func: T.Callable, obj, *args) -> Future:
+        """Submits func(obj, *args) to an executor, obj being sent with
+        `SharedArrayTransport.dumps`. The payload is released when the job ends
+
+        Args:
+            executor: The executor, typically a ProcessPoolExecutor
+            func: The function to run. It shall be picklable
+            obj: The object holding the arrays
+            args: The other arguments of func
+
+        Returns:
+            The future of the job
+
+        """
+        payload = self.dumps(obj)
+        try:
+            fut = executor.submit(_call_shared, func, payload, *args)
+        except BaseException:
+            self.release(payload)
+            raise
+        fut.add_done_callback(lambda _: self.release(payload))
+        return fut
+
+    def close(self):
+        """Unlinks all the segments, whatever their references"""
+        with self._lock:
+            for key in list(self._segments):
+                self._unlink(key)
+
+    def __enter__(self) -> "SharedArrayTransport":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,137 @@
+"""Groups of axes sharing their limits
+
+"""
+import typing as T
+
+import numpy as np
+
+if T.TYPE_CHECKING:
+    from .BAxe import ABaxe
+else:
+    ABaxe = "soyut.frontend.BAxe.ABaxe"
+
+__all__ = ["BBounds", "AxeLinkGroup"]
+
+
+class BBounds(object):
+    """Limits of an axis, in S.I. units (without scaling). None means automatic
+
+    Args:
+        vmin: Lower limit
+        vmax: Upper limit
+
+    """
+
+    __slots__ = ["vmin", "vmax"]
+
+    def __init__(self, vmin: float = None, vmax: float = None):
+        self.vmin = vmin
+        self.vmax = vmax
+
+    def as_tuple(self) -> T.Tuple[float, float]:
+        return self.vmin, self.vmax
+
+
+class AxeLinkGroup(object):
+    """Group of axes sharing the limits of one of their axis (X or Y).
+
+    This is a union-find structure where each axe references its group directly:
+    when two groups are linked, the members of the smaller one are moved to the larger one.
+    All the members of a group reference the same `BBounds` instance,
+    so that setting the limits of an axe is O(1), whatever the number of linked axes.
+
+    The data-driven limits of the group are computed from the statistics cached
+    by the plottables of its members, without scanning their data again.
+
+    Args:
+        axe: First member of the group
+        dim: 0 for the X axis, 1 for the Y axis
+
+    """
+
+    __slots__ = ["dim", "members", "bounds"]
+
+    def __init__(self, axe: ABaxe, dim: int):
+        self.dim = dim
+        self.members: T.List[ABaxe] = [axe]
+        self.bounds = BBounds()
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    @staticmethod
+    def union(a: "AxeLinkGroup", b: "AxeLinkGroup") -> "AxeLinkGroup":
+        """Links two groups. The explicit limits of the larger group are kept,
+        unless they are automatic
+
+        Args:
+            a: First group
+            b: Second group
+
+        Returns:
+            The resulting group
+
+        """
+        if a is b:
+            return a
+        if a.dim != b.dim:
+            raise AssertionError("Cannot link a X axis with a Y axis")
+
+        if len(a) < len(b):
+            a, b = b, a
+
+        if a.bounds.vmin is None:
+            a.bounds.vmin = b.bounds.vmin
+        if a.bounds.vmax is None:
+            a.bounds.vmax = b.bounds.vmax
+
+        for axe in b.members:
+            if a.dim == 0:
+                axe.xlink = a
+            else:
+                axe.ylink = a
+        a.members.extend(b.members)
+
+        return a
+
+    def autoscale(self) -> T.Tuple[float, float]:
+        """Computes the data-driven limits of the group, from the cached statistics
+        of the plottables of all the members
+
+        Returns:
+            The lower and upper limits. None if no member has data
+
+        """
+        vmin = np.inf
+        vmax = -np.inf
+        for axe in self.members:
+            for plottable in axe.list_plottables:
+                db = plottable.getDataBounds(axe)
+                if db is None:
+                    continue
+                pmin, pmax = db[self.dim]
+                vmin = min(vmin, pmin)
+                vmax = max(vmax, pmax)
+
+        if vmin > vmax:
+            return None, None
+
+        return vmin, vmax
+
+    def get_lim(self) -> T.Tuple[float, float]:
+        """Returns the limits of the group: the explicit ones when set,
+        the data-driven ones otherwise
+
+        Returns:
+            The lower and upper limits
+
+        """
+        vmin, vmax = self.bounds.as_tuple()
+        if vmin is None or vmax is None:
+            amin, amax = self.autoscale()
+            if vmin is None:
+                vmin = amin
+            if vmax is None:
+                vmax = amax
+
+        return vmin, vmax
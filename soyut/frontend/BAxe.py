@@ -4,10 +4,15 @@ from abc import ABCMeta, abstractproperty
 
 import numpy as np
 from numpy import pi, sqrt, cos, sin
+import pandas as pd
 
 from ..constants import Req
 from .GraphicSpec import AxeProjection
 from .BLayout import BGridElement
+from .AxeLink import AxeLinkGroup
+from .GHistogram import GHistogram
+from .GMultiLine import GMultiLine
+from .GAnnotations import GAnnotationLayer
 from .Plottable import (
     APlottable,
     PlottableFactory,
@@ -37,14 +42,11 @@ class ABaxe(metaclass=ABCMeta):
         "figure",
         "title",
         "spec",
-        "parent_sharex",
-        "children_sharex",
-        "parent_sharey",
-        "children_sharey",
+        "xlink",
+        "ylink",
         "kwargs",
         "list_plottables",
-        "xbounds",
-        "ybounds",
+        "annotations",
     ]
 
     def __init__(
@@ -59,47 +61,48 @@ class ABaxe(metaclass=ABCMeta):
         self.figure: BFigure = figure
         self.title: str = title
         self.spec: BGridElement = spec
-        self.parent_sharex: "ABaxe" = sharex
-        self.children_sharex: T.List["ABaxe"] = []
-        self.parent_sharey: "ABaxe" = sharey
-        self.children_sharey: T.List["ABaxe"] = []
         self.kwargs: dict = kwargs
-
-        if sharex is None:
-            self.xbounds = None, None
-        else:
-            self.xbounds = sharex.xbounds
-            sharex._addChildSharex(self)
-
-        if sharey is None:
-            self.ybounds = None, None
-        else:
-            self.ybounds = sharey.xbounds
-            sharey._addChildSharey(self)
-
         self.list_plottables: T.List[APlottable] = []
+        self.annotations: T.List[GAnnotationLayer] = []
+
+        self.xlink = AxeLinkGroup(self, dim=0)
+        self.ylink = AxeLinkGroup(self, dim=1)
+        if sharex is not None:
+            self.sharex(sharex)
+        if sharey is not None:
+            self.sharey(sharey)
 
     @abstractproperty
     def projection(self) -> AxeProjection:
         pass
 
-    def _addChildSharex(self, sharex: "ABaxe"):
-        self.children_sharex.append(sharex)
+    @property
+    def xbounds(self) -> T.Tuple[float, float]:
+        """Explicit X limits, shared by all the axes linked with this one"""
+        return self.xlink.bounds.as_tuple()
 
-    def _addChildSharey(self, sharey: "ABaxe"):
-        self.children_sharey.append(sharey)
+    @property
+    def ybounds(self) -> T.Tuple[float, float]:
+        """Explicit Y limits, shared by all the axes linked with this one"""
+        return self.ylink.bounds.as_tuple()
 
-    def _findRootSharex(self) -> "ABaxe":
-        if self.parent_sharex is None:
-            return self
-        else:
-            return self.parent_sharex._findRootSharex()
+    def sharex(self, other: "ABaxe"):
+        """Shares the X limits with another axe (and all the axes already linked with it)
 
-    def _findRootSharey(self) -> "ABaxe":
-        if self.parent_sharey is None:
-            return self
-        else:
-            return self.parent_sharey._findRootSharey()
+        Args:
+            other: The axe to share X limits with
+
+        """
+        AxeLinkGroup.union(other.xlink, self.xlink)
+
+    def sharey(self, other: "ABaxe"):
+        """Shares the Y limits with another axe (and all the axes already linked with it)
+
+        Args:
+            other: The axe to share Y limits with
+
+        """
+        AxeLinkGroup.union(other.ylink, self.ylink)
 
     def registerPlottable(self, plottable: APlottable):
         """Registers the APlottable in the list of objects handled by the axe
@@ -114,8 +117,8 @@ class ABaxe(metaclass=ABCMeta):
 
         self.list_plottables.append(plottable)
 
-    def set_xlim(self, xmin: float = None, xmax: float = None, _from_root: bool = True):
-        """Set X limits
+    def set_xlim(self, xmin: float = None, xmax: float = None):
+        """Set X limits, for this axe and all the axes sharing X limits with it
         The values are given in S.I. units (without scaling)
 
         Args:
@@ -123,17 +126,14 @@ class ABaxe(metaclass=ABCMeta):
             xmax: The right xlim in data coordinates. Passing None leaves the limit unchanged.
 
         """
-        if _from_root:
-            rootx = self._findRootSharex()
-        else:
-            rootx = self
-
-        rootx.xbounds = xmin, xmax
-        for axe in rootx.children_sharex:
-            axe.set_xlim(xmin, xmax, _from_root=False)
-
-    def set_ylim(self, ymin: float = None, ymax: float = None, _from_root: bool = True):
-        """Set Y limits
+        bounds = self.xlink.bounds
+        if xmin is not None:
+            bounds.vmin = xmin
+        if xmax is not None:
+            bounds.vmax = xmax
+
+    def set_ylim(self, ymin: float = None, ymax: float = None):
+        """Set Y limits, for this axe and all the axes sharing Y limits with it
         The values are given in S.I. units (without scaling)
 
         Args:
@@ -141,14 +141,44 @@ class ABaxe(metaclass=ABCMeta):
             ymax: The right ylim in data coordinates. Passing None leaves the limit unchanged.
 
         """
-        if _from_root:
-            rooty = self._findRootSharey()
-        else:
-            rooty = self
+        bounds = self.ylink.bounds
+        if ymin is not None:
+            bounds.vmin = ymin
+        if ymax is not None:
+            bounds.vmax = ymax
+
+    def autoscale(self, axis: str = "both"):
+        """Resets the limits to automatic, so that they are computed from the data
+        of all the linked axes
+
+        Args:
+            axis: 'x', 'y' or 'both'
+
+        """
+        if axis in ("x", "both"):
+            self.xlink.bounds.vmin = self.xlink.bounds.vmax = None
+        if axis in ("y", "both"):
+            self.ylink.bounds.vmin = self.ylink.bounds.vmax = None
 
-        rooty.ybounds = ymin, ymax
-        for axe in rooty.children_sharey:
-            axe.set_ylim(ymin, ymax, _from_root=False)
+    def get_xlim(self) -> T.Tuple[float, float]:
+        """Returns the X limits: the explicit ones if set, otherwise the data-driven ones,
+        computed from the cached statistics of the plottables of all the linked axes
+
+        Returns:
+            The left and right limits, in S.I. units
+
+        """
+        return self.xlink.get_lim()
+
+    def get_ylim(self) -> T.Tuple[float, float]:
+        """Returns the Y limits: the explicit ones if set, otherwise the data-driven ones,
+        computed from the cached statistics of the plottables of all the linked axes
+
+        Returns:
+            The bottom and top limits, in S.I. units
+
+        """
+        return self.ylink.get_lim()
 
     def plot(self, plottable, **kwargs) -> APlottable:
         """Records the plot command (without executing it) and does some checks
@@ -166,7 +196,8 @@ class ABaxe(metaclass=ABCMeta):
         if plottable is None:
             return
         name = kwargs.pop("name", "")
-        res = PlottableFactory.create(plottable, name=name, kwargs=kwargs)
+        registry = getattr(self.figure, "variables", None)
+        res = PlottableFactory.create(plottable, name=name, kwargs=kwargs, registry=registry)
         self.registerPlottable(res)
         return res
 
@@ -190,6 +221,115 @@ class ABaxe(metaclass=ABCMeta):
         kwargs["linestyle"] = ""
         return self.plot(plottable=plottable, **kwargs)
 
+    def hist(
+        self,
+        samples,
+        vmin: float = None,
+        vmax: float = None,
+        nbins: int = 100,
+        log: bool = False,
+        **kwargs,
+    ) -> APlottable:
+        """Records the histogram command (without executing it)
+        The bin counts are computed in one streaming pass over the samples
+
+        Args:
+            samples: Samples to bin. Can be:
+
+            * a `soyut.frontend.GHistogram.GHistogram`, which is plotted as is
+            * a numpy array or a pandas Series
+            * an iterable of chunks of samples (numpy arrays)
+            vmin: Lower edge of the first bin
+            vmax: Upper edge of the last bin
+            nbins: Number of bins
+            log: True to use logarithmically spaced bins
+            kwargs: The plotting options for the object
+
+        """
+        if samples is None:
+            return
+
+        if isinstance(samples, GHistogram):
+            hist = samples
+        else:
+            if vmin is None or vmax is None:
+                raise AssertionError("The range of a streaming histogram shall be given")
+            if isinstance(samples, (np.ndarray, pd.Series)):
+                samples = [samples]
+            hist = GHistogram.from_chunks(
+                samples,
+                vmin=vmin,
+                vmax=vmax,
+                nbins=nbins,
+                log=log,
+                name=kwargs.pop("name", ""),
+            )
+
+        return self.plot(plottable=hist, **kwargs)
+
+    def plot_lines(
+        self,
+        ydata,
+        x=None,
+        names: T.List[str] = None,
+        units: T.Union[str, T.List[str]] = "-",
+        **kwargs,
+    ) -> APlottable:
+        """Records the plot of a block of lines sharing the same X data (without executing it).
+        The block is a single plottable, drawn as a single artist or group of traces
+
+        Args:
+            ydata: The lines. Can be:
+
+            * a 2D numpy array of shape (nsamples, nlines). Stored without copy if column-major,
+              for example the transpose of a (nlines, nsamples) array
+            * a wide pandas DataFrame. x is then the name of the X column
+              (by default, the index is used), and the other columns are the lines
+            x: The X data, shared by all the lines. By default, the indices of the samples
+            names: Name of each line. By default, the names of the DataFrame columns
+            units: Unit of each line, or unit common to all the lines
+            kwargs: The plotting options for the object
+
+        Returns:
+            The created APlottable
+
+        """
+        name = kwargs.pop("name", "")
+        registry = getattr(self.figure, "variables", None)
+        if registry is not None and x is not None and not isinstance(ydata, pd.DataFrame):
+            # As in GMultiLine.from_array, an X array is used without copy
+            x = registry.get(x, abscissa=True, copy=False)
+
+        if isinstance(ydata, pd.DataFrame):
+            block = GMultiLine.from_dataframe(ydata, x=x, units=units, name=name)
+            if names is not None:
+                block.names = list(names)
+        else:
+            block = GMultiLine.from_array(ydata, x=x, names=names, units=units, name=name)
+
+        return self.plot(plottable=block, **kwargs)
+
+    def annotate_many(self, x, y, texts: T.List[str], priority=None, **kwargs) -> GAnnotationLayer:
+        """Records many annotations (without drawing them), like the names of all the points
+        of a scatter plot. They are stored as a `soyut.frontend.GAnnotations.GAnnotationLayer`,
+        drawn by the backends as a single artist or trace, whose overlapping labels are dropped
+
+        Args:
+            x: X coordinates of the annotated points (in rad for a PLATECARREE axe)
+            y: Y coordinates of the annotated points (in rad for a PLATECARREE axe)
+            texts: Text of each annotation
+            priority: Priority of each annotation. The labels of highest priority are placed
+                first. By default, the annotations are placed in their order
+            kwargs: The plotting options of the texts (fontsize, color, ...)
+
+        Returns:
+            The created layer
+
+        """
+        layer = GAnnotationLayer(x, y, texts, priority=priority, kwargs=kwargs)
+        self.annotations.append(layer)
+        return layer
+
 
 class BAxeGraph(ABaxe):
 
@@ -213,6 +353,7 @@ class BAxeSemiLogX(BAxeRectilinear):
 
     __slots__ = []
 
+    @property
     def projection(self) -> AxeProjection:
         return AxeProjection.LOGX
 
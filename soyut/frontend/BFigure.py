@@ -2,17 +2,106 @@ import typing as T
 
 from .. import logger
 from .BLayout import BGridSpec, BGridElement
-from .GraphicSpec import AxeProjection
+from .GraphicSpec import AxeProjection, FigureSpec
 from .BAxe import ABaxe, BAxeFactory
+from .GPlottable import GPlottable, GVariable, GVariableRegistry
+from .GTransferFunction import GTransferFunction
+from .Plottable import PlottableBode, PlottableGeneric
 
 __all__ = ["BFigure"]
 
+#: Projections that can be given by name in an `soyut.frontend.GraphicSpec.AxeSpec`
+SPEC_PROJECTIONS = {
+    "rectilinear": AxeProjection.RECTILINEAR,
+    "logx": AxeProjection.LOGX,
+    "logy": AxeProjection.LOGY,
+    "logxy": AxeProjection.LOGXY,
+    "polar": AxeProjection.POLAR,
+    "north_polar": AxeProjection.NORTH_POLAR,
+    "map": AxeProjection.PLATECARREE,
+    "platecarree": AxeProjection.PLATECARREE,
+}
+
 
 class BFigure(object):
     def __init__(self, title: str) -> None:
         self.title = title
         self.grid_spec = None
         self.list_axes: T.List[ABaxe] = []
+        #: The GVariable objects shared by the plottables of the figure
+        self.variables = GVariableRegistry()
+
+    @classmethod
+    def from_spec(cls, spec: FigureSpec, data, units: dict = None) -> "BFigure":
+        """Builds a BFigure from a FigureSpec and the data of its variables.
+        Each variable is turned into one GVariable, shared by all the lines that use it
+
+        Args:
+            spec: Description of the figure. The position of an axe is given by its 'coord' prop
+                (a tuple of slices or indices in the grid), or by its 'ind' prop
+                (1-based index in the grid, as for matplotlib subplots).
+                The 'sharex' prop of an axe is the index in spec.axes of the axe
+                to share X limits with
+            data: Mapping (dict, pandas.DataFrame, ...) of the variables' names
+                to their data or to GVariable objects
+            units: Mapping of the variables' names to their units
+
+        Returns:
+            The BFigure
+
+        """
+        if units is None:
+            units = {}
+
+        nrows = spec.props.get("nrows", max(a.props.get("nrows", 1) for a in spec.axes))
+        ncols = spec.props.get("ncols", max(a.props.get("ncols", 1) for a in spec.axes))
+
+        fig = cls(spec.props.get("title", ""))
+        gs = fig.add_gridspec(nrows=nrows, ncols=ncols)
+
+        variables = {}
+
+        def get_var(name: str, abscissa: bool = False) -> GVariable:
+            key = (name, abscissa)
+            if key not in variables:
+                value = data[name]
+                if not isinstance(value, GVariable):
+                    value = GVariable(
+                        data=value, name=name, unit=units.get(name, "-"), abscissa=abscissa
+                    )
+                elif abscissa:
+                    # The next data assigned to the variable are stored as given
+                    value.abscissa = True
+                variables[key] = value
+            return variables[key]
+
+        axes = []
+        for aSpec in spec.axes:
+            props = aSpec.props
+            if "coord" in props:
+                coord = props["coord"]
+            else:
+                coord = divmod(props.get("ind", len(axes) + 1) - 1, ncols)
+
+            sharex = props.get("sharex", None)
+            proj = props.get("projection", "rectilinear")
+            axe = fig.add_axe(
+                props.get("title", ""),
+                spec=gs[coord],
+                projection=SPEC_PROJECTIONS.get(proj, proj),
+                sharex=None if sharex is None else axes[sharex],
+            )
+            axes.append(axe)
+
+            for line in aSpec.lines:
+                kwargs = line.copy()
+                xvar = get_var(kwargs.pop("varx"), abscissa=True)
+                yvar = get_var(kwargs.pop("vary"))
+                name = kwargs.pop("label", yvar.name)
+                gp = GPlottable(name=name, xvar=xvar, yvar=yvar)
+                axe.registerPlottable(PlottableGeneric(gp, name, kwargs))
+
+        return fig
 
     def add_gridspec(self, nrows: int = 1, ncols: int = 1) -> BGridSpec:
         gs = BGridSpec(self, nrows=nrows, ncols=ncols)
@@ -47,6 +136,54 @@ class BFigure(object):
 
         return axe
 
+    def add_bode(
+        self,
+        tf: GTransferFunction,
+        spec_mag: BGridElement,
+        spec_phase: BGridElement,
+        fmin: float,
+        fmax: float,
+        nfreq: int = 500,
+        title: str = "Bode diagram",
+        **kwargs,
+    ) -> T.Tuple[ABaxe, ABaxe]:
+        """Creates the magnitude and phase axes of a Bode diagram,
+        the phase axe sharing its X axis with the magnitude axe.
+        All the systems of tf are evaluated at once, and share the same frequency variable
+
+        Args:
+            tf: The batch of transfer functions to plot
+            spec_mag: Position of the magnitude axe
+            spec_phase: Position of the phase axe
+            fmin: Lowest frequency (Hz)
+            fmax: Highest frequency (Hz)
+            nfreq: Number of frequencies
+            title: Title of the magnitude axe
+            kwargs: The plotting options for the lines
+
+        Returns:
+            The magnitude axe
+            The phase axe
+
+        """
+        freq, mag, phase = tf.bode(fmin=fmin, fmax=fmax, nfreq=nfreq)
+
+        axe_mag = self.add_axe(title, spec=spec_mag, projection=AxeProjection.LOGX)
+        axe_phase = self.add_axe("", spec=spec_phase, projection=AxeProjection.LOGX, sharex=axe_mag)
+
+        xvar = GVariable(data=freq, name="Frequency", unit="Hz", abscissa=True)
+        for i in range(tf.nsys):
+            name = tf.getSystemName(i)
+            for axe, data, yname, unit in (
+                (axe_mag, mag[i], "Magnitude", "dB"),
+                (axe_phase, phase[i], "Phase", "rad"),
+            ):
+                yvar = GVariable(data=data, name=yname, unit=unit)
+                gp = GPlottable(name=name, xvar=xvar, yvar=yvar)
+                axe.registerPlottable(PlottableBode(gp, name, kwargs.copy()))
+
+        return axe_mag, axe_phase
+
     def registerBAxe(self, baxe: ABaxe):
         """Registers a new ABaxe in the list of related ABaxe
 
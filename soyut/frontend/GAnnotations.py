@@ -0,0 +1,260 @@
+"""Layers of many annotations, with placement of the labels avoiding their overlaps
+
+"""
+import typing as T
+
+import numpy as np
+from numpy import pi
+
+from ..utils import FloatArr
+from .GraphicSpec import Annotation, AxeProjection
+
+if T.TYPE_CHECKING:
+    from .BAxe import ABaxe
+else:
+    ABaxe = "soyut.frontend.BAxe.ABaxe"
+
+__all__ = ["place_labels", "GAnnotationLayer"]
+
+#: Placements tried for each label, as the signs of the offset of its box from the point:
+#: above right, above left, below right, below left
+CORNERS = ((1, 1), (-1, 1), (1, -1), (-1, -1))
+
+
+def place_labels(
+    px: FloatArr,
+    py: FloatArr,
+    widths: FloatArr,
+    heights: FloatArr,
+    order: np.ndarray = None,
+    offset: float = 3.0,
+    bounds: T.Tuple[float, float, float, float] = None,
+) -> T.Tuple[np.ndarray, FloatArr, FloatArr]:
+    """Places labels next to their points, without overlap, in a greedy way.
+    Each label is put at the first of the 4 corners of its point (see `CORNERS`) where it
+    does not overlap a label already placed, or dropped. The placed boxes are stored in a
+    spatial hash whose cells are as large as the largest box, so that each test only reads
+    the few boxes of the cells covered: the placement is about O(N)
+
+    Args:
+        px: X coordinates of the points, in pixels
+        py: Y coordinates of the points, in pixels
+        widths: Width of each label, in pixels
+        heights: Height of each label, in pixels
+        order: Order in which the labels are placed (most important first).
+            By default, the order of the points
+        offset: Distance between a point and the corner of its label, in pixels
+        bounds: If given, (xmin, xmax, ymin, ymax) area of the points to label, in pixels
+
+    Returns:
+        The index in `CORNERS` of the corner of each label, -1 for the labels not placed
+        The left of each label, in pixels
+        The bottom of each label, in pixels
+
+    Examples:
+        >>> corner, left, bottom = place_labels([0, 1, 50], [0, 0, 0], [20] * 3, [10] * 3)
+        >>> corner.tolist()
+        [0, 1, 0]
+
+    """
+    px = np.asarray(px, dtype=np.float64)
+    py = np.asarray(py, dtype=np.float64)
+    widths = np.broadcast_to(np.asarray(widths, dtype=np.float64), px.shape)
+    heights = np.broadcast_to(np.asarray(heights, dtype=np.float64), px.shape)
+    n = len(px)
+
+    corner = np.full(n, -1, dtype=np.int8)
+    left = np.full(n, np.nan)
+    bottom = np.full(n, np.nan)
+    if n == 0:
+        return corner, left, bottom
+
+    valid = np.isfinite(px) & np.isfinite(py)
+    if bounds is not None:
+        xmin, xmax, ymin, ymax = bounds
+        valid &= (px >= xmin) & (px <= xmax) & (py >= ymin) & (py <= ymax)
+    if order is None:
+        order = np.arange(n)
+    order = [i for i in order if valid[i]]
+
+    # The boxes of all the placements, computed at once
+    lefts = np.column_stack([px + offset if sx > 0 else px - offset - widths for sx, _ in CORNERS])
+    bottoms = np.column_stack(
+        [py + offset if sy > 0 else py - offset - heights for _, sy in CORNERS]
+    )
+    cw = max(float(widths.max()), 1.0)
+    ch = max(float(heights.max()), 1.0)
+
+    # Spatial hash of the placed boxes: (column, row) of a cell -> indices of the boxes
+    cells: T.Dict[T.Tuple[int, int], T.List[int]] = {}
+    for i in order:
+        w = widths[i]
+        h = heights[i]
+        for k in range(len(CORNERS)):
+            x0 = lefts[i, k]
+            y0 = bottoms[i, k]
+            # As the cells are larger than the boxes, a box covers at most 2x2 cells
+            c0, c1 = int(x0 // cw), int((x0 + w) // cw)
+            r0, r1 = int(y0 // ch), int((y0 + h) // ch)
+            keys = [(c, r) for c in range(c0, c1 + 1) for r in range(r0, r1 + 1)]
+
+            free = True
+            for key in keys:
+                for j in cells.get(key, ()):
+                    if (
+                        x0 < left[j] + widths[j]
+                        and left[j] < x0 + w
+                        and y0 < bottom[j] + heights[j]
+                        and bottom[j] < y0 + h
+                    ):
+                        free = False
+                        break
+                if not free:
+                    break
+
+            if free:
+                corner[i] = k
+                left[i] = x0
+                bottom[i] = y0
+                for key in keys:
+                    cells.setdefault(key, []).append(i)
+                break
+
+    return corner, left, bottom
+
+
+class GAnnotationLayer(object):
+    """Many annotations of an axe, stored in columnar arrays, like the names of
+    all the ground stations of a map. The backends draw the layer as a single batched artist,
+    and place its labels so that they do not overlap (see `place_labels`).
+    The labels that cannot be placed are not drawn.
+
+    The coordinates are given like the ones of the plottables: in rad for a PLATECARREE axe.
+
+    Args:
+        x: X coordinates of the annotated points
+        y: Y coordinates of the annotated points
+        texts: Text of each annotation
+        priority: Priority of each annotation. The labels of highest priority are placed first.
+            By default, the annotations are placed in their order
+        kwargs: The plotting options of the texts. fontsize (in points) and color are
+            understood by all the backends
+
+    Examples:
+        >>> layer = GAnnotationLayer([0.0, 1.0], [0.0, 1.0], ["A", "BB"], kwargs={"fontsize": 10})
+        >>> layer.label_sizes()[0].tolist()
+        [6.0, 12.0]
+
+    """
+
+    __slots__ = ["x", "y", "texts", "priority", "kwargs"]
+
+    #: Width of a character, and height of a line, relative to the font size
+    CHAR_WIDTH = 0.6
+    LINE_HEIGHT = 1.2
+
+    def __init__(
+        self,
+        x: FloatArr,
+        y: FloatArr,
+        texts: T.List[str],
+        priority: FloatArr = None,
+        kwargs: dict = None,
+    ):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.texts = np.asarray(texts, dtype=object)
+        if not len(self.x) == len(self.y) == len(self.texts):
+            raise AssertionError(
+                f"Got {len(self.x)} X, {len(self.y)} Y and {len(self.texts)} texts"
+            )
+        self.priority = None if priority is None else np.asarray(priority, dtype=np.float64)
+        self.kwargs = {} if kwargs is None else kwargs
+
+    @classmethod
+    def from_annotations(cls, annotations: T.List[Annotation], **kwargs) -> "GAnnotationLayer":
+        """Creates a layer from a list of `soyut.frontend.GraphicSpec.Annotation`
+
+        Args:
+            annotations: The annotations
+            kwargs: The plotting options of the texts
+
+        Returns:
+            The layer
+
+        """
+        xy = np.array([a.coord for a in annotations], dtype=np.float64).reshape((-1, 2))
+        return cls(xy[:, 0], xy[:, 1], [a.text for a in annotations], kwargs=kwargs)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @property
+    def fontsize(self) -> float:
+        """Font size of the texts, in points"""
+        return float(self.kwargs.get("fontsize", 8))
+
+    def make_points(self, axe: ABaxe) -> T.Tuple[FloatArr, FloatArr]:
+        """Returns the coordinates of the points, in the units of the plottables' data
+        (`soyut.frontend.Plottable.APlottable._make_mline`)
+
+        Args:
+            axe: The axe where the layer is drawn
+
+        Returns:
+            The X coordinates
+            The Y coordinates
+
+        """
+        if axe.projection == AxeProjection.PLATECARREE:
+            return self.x * (180 / pi), self.y * (180 / pi)
+
+        return self.x, self.y
+
+    def label_sizes(self, pixels_per_point: float = 1.0) -> T.Tuple[FloatArr, FloatArr]:
+        """Estimates the size of the labels from their number of characters
+
+        Args:
+            pixels_per_point: Number of pixels per typographic point (dpi / 72)
+
+        Returns:
+            The width of each label, in pixels
+            The height of each label, in pixels
+
+        """
+        size = self.fontsize * pixels_per_point
+        nchars = np.fromiter((len(str(t)) for t in self.texts), dtype=np.float64, count=len(self))
+        return nchars * (self.CHAR_WIDTH * size), np.full(len(self), self.LINE_HEIGHT * size)
+
+    def place(
+        self,
+        px: FloatArr,
+        py: FloatArr,
+        pixels_per_point: float = 1.0,
+        bounds: T.Tuple[float, float, float, float] = None,
+    ) -> T.Tuple[np.ndarray, FloatArr, FloatArr]:
+        """Places the labels of the layer. See `place_labels`
+
+        Args:
+            px: X coordinates of the points, in pixels
+            py: Y coordinates of the points, in pixels
+            pixels_per_point: Number of pixels per typographic point (dpi / 72)
+            bounds: If given, (xmin, xmax, ymin, ymax) area of the points to label, in pixels
+
+        Returns:
+            The index in `CORNERS` of the corner of each label, -1 for the labels not placed
+            The left of each label, in pixels
+            The bottom of each label, in pixels
+
+        """
+        widths, heights = self.label_sizes(pixels_per_point)
+        order = None if self.priority is None else np.argsort(-self.priority, kind="stable")
+        return place_labels(
+            px,
+            py,
+            widths,
+            heights,
+            order=order,
+            offset=0.5 * self.fontsize * pixels_per_point,
+            bounds=bounds,
+        )
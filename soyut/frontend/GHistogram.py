@@ -0,0 +1,304 @@
+"""Streaming histograms
+
+"""
+import typing as T
+
+import numpy as np
+
+from ..utils import FloatArr, IntArr
+
+__all__ = ["GHistogram"]
+
+
+class GHistogram(object):
+    """Histogram accumulated in a single streaming pass over chunks of samples.
+
+    The bins are uniform, either in linear or in logarithmic (base 10) scale, so that the bin
+    index of a sample is obtained by a simple scaling before `numpy.bincount`.
+    Summary statistics (min, max, mean and variance) are updated in the same pass,
+    with the chunked version of Welford's algorithm.
+    Partial histograms built on different chunks (or by different processes) can be merged.
+
+    Samples that are not finite are ignored, and only counted in *nan_count*.
+    Samples outside [vmin, vmax] are counted in *underflow* and *overflow*,
+    but are still taken into account in the summary statistics.
+
+    Args:
+        vmin: Lower edge of the first bin
+        vmax: Upper edge of the last bin (included in the last bin)
+        nbins: Number of bins
+        log: True to use logarithmically spaced bins. vmin shall then be strictly positive
+        name: Name of the sampled variable
+        unit: Physical unit of the sampled variable
+
+    Examples:
+        >>> h = GHistogram(vmin=0, vmax=4, nbins=4)
+        >>> h.update(np.array([0.5, 1.5, 1.6, 4.0, 5.0, np.nan]))
+        >>> h.counts
+        array([1, 2, 0, 1])
+        >>> h.overflow, h.nan_count, h.count
+        (1, 1, 5)
+        >>> h.max
+        5.0
+
+    """
+
+    __slots__ = [
+        "vmin",
+        "vmax",
+        "nbins",
+        "log",
+        "name",
+        "unit",
+        "counts",
+        "underflow",
+        "overflow",
+        "nan_count",
+        "count",
+        "min",
+        "max",
+        "mean",
+        "m2",
+    ]
+
+    #: Number of samples processed at once by `GHistogram.update`
+    chunksize: int = 1 << 20
+
+    def __init__(
+        self,
+        vmin: float,
+        vmax: float,
+        nbins: int,
+        log: bool = False,
+        name: str = "",
+        unit: str = "-",
+    ):
+        if nbins < 1:
+            raise ValueError(f"Invalid number of bins: {nbins}")
+        if not vmin < vmax:
+            raise ValueError(f"Invalid histogram range: [{vmin}, {vmax}]")
+        if log and vmin <= 0:
+            raise ValueError(f"Logarithmic bins need a positive lower bound. Got {vmin}")
+
+        self.vmin = float(vmin)
+        self.vmax = float(vmax)
+        self.nbins = int(nbins)
+        self.log = log
+        self.name = name
+        self.unit = unit
+
+        self.counts: IntArr = np.zeros(self.nbins, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+        self.nan_count = 0
+        self.count = 0
+        self.min = np.nan
+        self.max = np.nan
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @classmethod
+    def from_chunks(
+        cls,
+        chunks: T.Iterable,
+        vmin: float,
+        vmax: float,
+        nbins: int,
+        log: bool = False,
+        name: str = "",
+        unit: str = "-",
+    ) -> "GHistogram":
+        """Builds a histogram from an iterable of chunks of samples,
+        for example blocks read from a measurement file
+
+        Args:
+            chunks: Iterable of array-like
+            vmin: Lower edge of the first bin
+            vmax: Upper edge of the last bin
+            nbins: Number of bins
+            log: True to use logarithmically spaced bins
+            name: Name of the sampled variable
+            unit: Physical unit of the sampled variable
+
+        Returns:
+            The filled histogram
+
+        """
+        ret = cls(vmin=vmin, vmax=vmax, nbins=nbins, log=log, name=name, unit=unit)
+        for chunk in chunks:
+            ret.update(chunk)
+
+        return ret
+
+    @property
+    def edges(self) -> FloatArr:
+        """Edges of the bins, as an array of nbins + 1 elements"""
+        if self.log:
+            return np.logspace(np.log10(self.vmin), np.log10(self.vmax), self.nbins + 1)
+        else:
+            return np.linspace(self.vmin, self.vmax, self.nbins + 1)
+
+    @property
+    def centers(self) -> FloatArr:
+        """Centers of the bins. Geometric centers if the bins are logarithmic"""
+        e = self.edges
+        if self.log:
+            return np.sqrt(e[:-1] * e[1:])
+        else:
+            return 0.5 * (e[:-1] + e[1:])
+
+    @property
+    def var(self) -> float:
+        """Variance of the finite samples"""
+        if self.count == 0:
+            return np.nan
+        return self.m2 / self.count
+
+    @property
+    def std(self) -> float:
+        """Standard deviation of the finite samples"""
+        return np.sqrt(self.var)
+
+    def _scaled_bounds(self) -> T.Tuple[float, float, float]:
+        if self.log:
+            lo = np.log10(self.vmin)
+            hi = np.log10(self.vmax)
+        else:
+            lo = self.vmin
+            hi = self.vmax
+
+        return lo, hi, self.nbins / (hi - lo)
+
+    def _update_chunk(self, c: FloatArr):
+        c = np.asarray(c, dtype=np.float64)
+        finite = np.isfinite(c)
+        n_b = int(np.count_nonzero(finite))
+        if n_b < len(c):
+            self.nan_count += len(c) - n_b
+            c = c[finite]
+        if n_b == 0:
+            return
+
+        # Summary statistics, merged with Chan's generalisation of Welford's algorithm
+        cmin = float(c.min())
+        cmax = float(c.max())
+        mean_b = c.mean()
+        d = c - mean_b
+        m2_b = float(np.dot(d, d))
+        n_a = self.count
+        n = n_a + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta**2 * n_a * n_b / n
+        self.count = n
+        self.min = cmin if n_a == 0 else min(self.min, cmin)
+        self.max = cmax if n_a == 0 else max(self.max, cmax)
+
+        # Bin counts
+        if self.log:
+            if cmin <= 0:
+                pos = c > 0
+                self.underflow += len(c) - int(np.count_nonzero(pos))
+                c = c[pos]
+            np.log10(c, out=d[: len(c)])
+            v = d[: len(c)]
+            vmin, vmax = (v.min(), v.max()) if len(v) > 0 else (0.0, 0.0)
+        else:
+            v = c
+            vmin, vmax = cmin, cmax
+
+        lo, hi, scale = self._scaled_bounds()
+        if vmin < lo or vmax > hi:
+            under = v < lo
+            over = v > hi
+            self.underflow += int(np.count_nonzero(under))
+            self.overflow += int(np.count_nonzero(over))
+            v = v[~(under | over)]
+
+        idx = ((v - lo) * scale).astype(np.intp)
+        # Samples equal to the upper edge belong to the last bin
+        np.minimum(idx, self.nbins - 1, out=idx)
+        self.counts += np.bincount(idx, minlength=self.nbins)
+
+    def update(self, samples):
+        """Adds samples to the histogram. Large arrays are processed by chunks of
+        `GHistogram.chunksize` elements, so that the temporaries stay small
+
+        Args:
+            samples: Array-like of samples
+
+        """
+        x = np.asarray(samples).ravel()
+        ns = len(x)
+        for start in range(0, ns, self.chunksize):
+            self._update_chunk(x[start : start + self.chunksize])
+
+    def _check_compatible(self, other: "GHistogram"):
+        if (self.vmin, self.vmax, self.nbins, self.log) != (
+            other.vmin,
+            other.vmax,
+            other.nbins,
+            other.log,
+        ):
+            raise ValueError("Cannot merge histograms with different bins")
+
+    def merge(self, other: "GHistogram") -> "GHistogram":
+        """Merges in place a partial histogram, for example computed by another process
+
+        Args:
+            other: Histogram with the same bins as self
+
+        Returns:
+            self, for chaining
+
+        """
+        self._check_compatible(other)
+
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        self.nan_count += other.nan_count
+
+        if other.count > 0:
+            n_a = self.count
+            n_b = other.count
+            n = n_a + n_b
+            delta = other.mean - self.mean
+            self.mean += delta * n_b / n
+            self.m2 += other.m2 + delta**2 * n_a * n_b / n
+            self.count = n
+            self.min = other.min if n_a == 0 else min(self.min, other.min)
+            self.max = other.max if n_a == 0 else max(self.max, other.max)
+
+        return self
+
+    def copy(self) -> "GHistogram":
+        ret = GHistogram(
+            vmin=self.vmin,
+            vmax=self.vmax,
+            nbins=self.nbins,
+            log=self.log,
+            name=self.name,
+            unit=self.unit,
+        )
+        return ret.merge(self)
+
+    def __add__(self, other: "GHistogram") -> "GHistogram":
+        return self.copy().merge(other)
+
+    def __iadd__(self, other: "GHistogram") -> "GHistogram":
+        return self.merge(other)
+
+    def make_line(self, transform: T.Callable = lambda x: x):
+        """Returns the bins centers and the (transformed) counts, with the same
+        signature as `soyut.frontend.GPlottable.GPlottable.make_line`
+
+        """
+        xd = self.centers
+        yd = transform(self.counts.astype(np.float64))
+
+        unit_of_x_var = self.unit
+        if unit_of_x_var == "":
+            unit_of_x_var = "-"
+
+        return xd, yd, self.name, unit_of_x_var, "Count", "-"
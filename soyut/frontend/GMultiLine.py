@@ -0,0 +1,205 @@
+"""Blocks of lines sharing the same X variable
+
+"""
+import typing as T
+
+import numpy as np
+import pandas as pd
+
+from ..utils import FloatArr
+from ..instrumentation import flag_copy
+from .GPlottable import GStats, GVariable
+
+__all__ = ["GMultiLine"]
+
+
+class GMultiLine(object):
+    """Block of lines sharing one X variable, like the channels of an acquisition.
+
+    The Y data are kept as a single 2D array of shape (nsamples, nlines), in column-major order,
+    so that the samples of each line are contiguous and a line is a view of the block.
+    A (nlines, nsamples) C-ordered array, or the values of a wide DataFrame of floats,
+    have this layout once transposed, and are therefore stored without copy.
+
+    Args:
+        xvar: The X variable, shared by all the lines
+        ydata: The Y data, of shape (nsamples, nlines). Copied if not column-major
+        names: Name of each line
+        units: Unit of each line, or unit common to all the lines
+        name: Name of the block
+
+    Examples:
+        >>> y = np.arange(6.0).reshape(2, 3)  # 2 lines of 3 samples
+        >>> ml = GMultiLine.from_array(y.T, names=["a", "b"], units="V")
+        >>> ml.nlines, ml.ydata.flags.f_contiguous, np.shares_memory(ml.ydata, y)
+        (2, True, True)
+
+    """
+
+    __slots__ = ["name", "xvar", "ydata", "names", "units", "version", "_stats"]
+
+    def __init__(
+        self,
+        xvar: GVariable,
+        ydata: FloatArr,
+        names: T.List[str] = None,
+        units: T.Union[str, T.List[str]] = "-",
+        name: str = "",
+    ):
+        ydata = np.asarray(ydata)
+        if ydata.ndim != 2:
+            raise AssertionError(f"Expected a 2D array, got shape {ydata.shape}")
+        if len(xvar.data) != ydata.shape[0]:
+            raise AssertionError(
+                f"X has {len(xvar.data)} samples, but the lines have {ydata.shape[0]}"
+            )
+
+        block = np.asfortranarray(ydata)
+        flag_copy("GMultiLine", ydata, block)
+
+        nlines = block.shape[1]
+        if names is None:
+            names = [f"{name}[{j}]" for j in range(nlines)]
+        if isinstance(units, str):
+            units = [units] * nlines
+
+        self.name = name
+        self.xvar = xvar
+        self.ydata = block
+        self.names = list(names)
+        self.units = list(units)
+        self.version = 0
+        self._stats: GStats = None
+
+    @classmethod
+    def from_array(
+        cls,
+        ydata: FloatArr,
+        x=None,
+        names: T.List[str] = None,
+        units: T.Union[str, T.List[str]] = "-",
+        name: str = "",
+    ) -> "GMultiLine":
+        """Creates a block of lines from a 2D array
+
+        Args:
+            ydata: The Y data, of shape (nsamples, nlines)
+            x: The X data: a GVariable, an array or a dictionary
+                (see `soyut.frontend.GPlottable.GVariable.from_desc`).
+                By default, the indices of the samples
+            names: Name of each line
+            units: Unit of each line, or unit common to all the lines
+            name: Name of the block
+
+        Returns:
+            The block of lines
+
+        """
+        if x is None:
+            xvar = GVariable(data=np.arange(np.shape(ydata)[0]), abscissa=True)
+        elif isinstance(x, GVariable):
+            xvar = x
+        elif isinstance(x, np.ndarray):
+            # Not copied, unlike GVariable.from_serie
+            xvar = GVariable(data=x, abscissa=True)
+        else:
+            xvar = GVariable.from_desc(x, abscissa=True)
+
+        return cls(xvar=xvar, ydata=ydata, names=names, units=units, name=name)
+
+    @classmethod
+    def from_dataframe(
+        cls,
+        df: pd.DataFrame,
+        x: str = None,
+        columns: T.List[str] = None,
+        units: T.Union[str, T.List[str]] = "-",
+        xunit: str = "-",
+        name: str = "",
+    ) -> "GMultiLine":
+        """Creates a block of lines from the columns of a wide DataFrame
+
+        Args:
+            df: The DataFrame
+            x: Name of the X column. By default, the index of df
+            columns: Names of the Y columns. By default, all the columns but x
+            units: Unit of each line, or unit common to all the lines
+            xunit: Unit of the X column
+            name: Name of the block
+
+        Returns:
+            The block of lines
+
+        """
+        if columns is None:
+            columns = [c for c in df.columns if c != x]
+
+        if x is None:
+            xvar = GVariable(
+                data=np.asarray(df.index), name=df.index.name or "", unit=xunit, abscissa=True
+            )
+        else:
+            xvar = GVariable(data=np.asarray(df[x]), name=x, unit=xunit, abscissa=True)
+
+        # For a DataFrame of floats, the values are a transposed view of its 2D block
+        ydata = df[columns].to_numpy()
+
+        return cls(xvar=xvar, ydata=ydata, names=[str(c) for c in columns], units=units, name=name)
+
+    @property
+    def nlines(self) -> int:
+        """Number of lines"""
+        return self.ydata.shape[1]
+
+    @property
+    def unit(self) -> str:
+        """Unit common to all the lines, or '-' if they differ"""
+        units = set(self.units)
+        return units.pop() if len(units) == 1 else "-"
+
+    def invalidate(self):
+        """Discards the cached statistics.
+        To be called when the Y block has been modified in place
+
+        """
+        self._stats = None
+        self.version += 1
+
+    @property
+    def stats(self) -> GStats:
+        """The cached statistics of the whole Y block"""
+        if self._stats is None:
+            self._stats = GStats.from_array(self.ydata)
+
+        return self._stats
+
+    def make_line(self, transform: T.Callable = lambda x: x, xbounds: T.Tuple[float, float] = None):
+        """Returns the data to draw
+
+        Args:
+            transform: Function applied to the Y block
+            xbounds: If given, (xmin, xmax) limits of the visible window.
+                If the X variable is sorted, only the samples of the window are kept.
+                See `soyut.frontend.GPlottable.GVariable.window`
+
+        Returns:
+            The X data, of shape (nsamples,)
+            The Y data, of shape (nsamples, nlines)
+            The name of the X variable
+            The unit of the X variable
+            The name of the block
+            The unit common to all the lines
+
+        """
+        if xbounds is None:
+            xd = self.xvar.float_data
+            block = self.ydata
+        else:
+            sl = self.xvar.window(*xbounds)
+            xd = self.xvar.float_window(sl)
+            # Rows of a column-major block: still a view
+            block = self.ydata[sl]
+        yd = transform(block)
+        flag_copy("GMultiLine.make_line", block, yd)
+
+        return xd, yd, self.xvar.name, self.xvar.unit or "-", self.name, self.unit
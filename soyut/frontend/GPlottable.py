@@ -4,10 +4,14 @@ from datetime import timedelta
 
 from numpy.polynomial import Polynomial
 import numpy as np
+import numpy.typing as npt
 import pandas as pd
 from pandas import DataFrame, Timestamp
 
 from .. import logger
+from ..utils import FloatArr, trig_cache, insert_gaps, decimate_minmax
+from ..instrumentation import flag_copy
+from .GStorage import CompactArray, StoragePolicy
 
 if T.TYPE_CHECKING:
     from .GPlottable import GPlottable
@@ -17,23 +21,329 @@ else:
     GVariable = "blocksim.graphics.GPlottable.GVariable"
 
 
-class GVariable(object):
-    """Generic plottable"""
+@dataclass(init=True)
+class GStats:
+    """Summary statistics of an array, used for autoscaling and unit selection"""
+
+    #: Smallest value, ignoring NaN
+    min: float
+    #: Largest value, ignoring NaN
+    max: float
+    #: Largest absolute value, ignoring NaN
+    absmax: float
+    #: Number of NaN values
+    nan_count: int
+    #: Total number of values
+    size: int
+
+    #: Number of elements reduced at once by `GStats.from_array`
+    chunksize: T.ClassVar[int] = 1 << 16
 
-    __slots__ = ["name", "data", "unit", "path"]
+    @classmethod
+    def from_array(cls, a) -> "GStats":
+        """Computes the statistics in a single pass over the array. The array is processed
+        by chunks small enough to stay in cache, and the NaN-ignoring reductions
+        `numpy.fmin` and `numpy.fmax` avoid any full-size temporary
+
+        Args:
+            a: The array to analyse
+
+        Returns:
+            The statistics of the array
+
+        Examples:
+            >>> GStats.from_array(np.array([1.0, np.nan, -3.0]))
+            GStats(min=-3.0, max=1.0, absmax=3.0, nan_count=1, size=3)
+
+        """
+        # In memory order, so that a column-major block is not copied
+        a = np.asarray(a).ravel(order="K")
+        ns = len(a)
+        is_float = a.dtype.kind in "fc"
+        vmin = np.inf
+        vmax = -np.inf
+        nan_count = 0
+        for start in range(0, ns, cls.chunksize):
+            chunk = a[start : start + cls.chunksize]
+            vmin = np.fmin(vmin, np.fmin.reduce(chunk))
+            vmax = np.fmax(vmax, np.fmax.reduce(chunk))
+            if is_float:
+                nan_count += len(chunk) - int(np.count_nonzero(chunk == chunk))
+
+        if vmin > vmax:
+            vmin = vmax = np.nan
+
+        vmin = float(vmin)
+        vmax = float(vmax)
+        return cls(
+            min=vmin,
+            max=vmax,
+            absmax=max(abs(vmin), abs(vmax)),
+            nan_count=nan_count,
+            size=ns,
+        )
 
-    def __init__(self, data: list = [], name: str = "", unit: str = "-", path: str = ""):
-        self.data = data
+    def scaled(self, factor: float) -> "GStats":
+        """Returns the statistics of the array multiplied by factor
+
+        Args:
+            factor: Multiplication factor
+
+        Returns:
+            The scaled statistics
+
+        """
+        vmin, vmax = self.min * factor, self.max * factor
+        if factor < 0:
+            vmin, vmax = vmax, vmin
+        return GStats(
+            min=vmin,
+            max=vmax,
+            absmax=self.absmax * abs(factor),
+            nan_count=self.nan_count,
+            size=self.size,
+        )
+
+
+def _is_time(data) -> bool:
+    return len(data) > 0 and isinstance(data[0], (np.timedelta64, timedelta, Timestamp))
+
+
+def _to_float(data) -> FloatArr:
+    # Converts the data in a numerical array. Durations are converted in seconds
+    if _is_time(data):
+        s = pd.Series(data=data)
+        return np.array(s).astype("timedelta64[s]").astype(np.float64)
+    return np.asarray(data)
+
+
+def _monotonic(a: np.ndarray) -> int:
+    # 1 if a is increasing, -1 if decreasing, 0 otherwise. NaN compares false, and gives 0
+    if a.dtype.kind not in "fiu":
+        return 0
+    if len(a) < 2:
+        return 1
+    d = np.diff(a)
+    if (d >= 0).all():
+        return 1
+    if (d <= 0).all():
+        return -1
+    return 0
+
+
+def _search_key(a: np.ndarray, v: float, side: str):
+    # Converts v to the type of a, so that np.searchsorted does not convert the whole array.
+    # For an integer array, rounding v towards the outside of the window keeps its samples
+    if a.dtype.kind in "iu":
+        info = np.iinfo(a.dtype)
+        v = np.floor(v) if side == "left" else np.ceil(v)
+        return a.dtype.type(np.clip(v, info.min, info.max))
+    return a.dtype.type(v)
+
+
+class GVariable(object):
+    """Generic plottable
+
+    The statistics of the data and their conversion to float are computed once, and cached.
+    If the data array is modified in place, `GVariable.invalidate` shall be called.
+
+    Whether the data are sorted is also detected once (`GVariable.monotonic`). The samples
+    of a sorted variable within an interval are then found by bisection (`GVariable.window`),
+    so that a zoomed view of a long recording only converts and draws the visible samples.
+
+    With a `soyut.frontend.GStorage.StoragePolicy` (given at creation, or set for all the
+    variables with `GVariable.default_storage`), the numerical data are stored in a compact
+    `soyut.frontend.GStorage.CompactArray` when assigned. They are decoded by
+    `GVariable.float_data` at each call, or by `GVariable.float_window` for a window only:
+    the decoded array is not kept, so that the variable only holds the compact data.
+    A variable is stored as a time axis if its data are durations or dates, or if its unit is 's'.
+    The abscissas (X variables) are never quantized by the integer storages, as a quantized
+    X axis merges the samples and shifts them (see `soyut.frontend.GStorage.StoragePolicy`).
+
+    Args:
+        data: The data
+        name: Name of the variable
+        unit: Unit of the variable
+        path: Path of the variable in its source
+        storage: Storage policy of the variable. By default, `GVariable.default_storage`
+        abscissa: True if the variable is an X axis. Its data are then stored as given,
+            or relative to their first value in float32
+
+    """
+
+    __slots__ = [
+        "_data",
+        "name",
+        "unit",
+        "path",
+        "storage",
+        "abscissa",
+        "version",
+        "_float_data",
+        "_stats",
+        "_monotonic",
+    ]
+
+    #: Storage policy of the variables created without one. None to keep the data as given
+    default_storage: StoragePolicy = None
+
+    def __init__(
+        self,
+        data: list = [],
+        name: str = "",
+        unit: str = "-",
+        path: str = "",
+        storage: StoragePolicy = None,
+        abscissa: bool = False,
+    ):
+        self.version = 0
         self.name = name
         self.unit = unit
         self.path = path
+        self.storage = storage
+        self.abscissa = abscissa
+        self.data = data
+
+    @property
+    def data(self):
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self.invalidate()
+        policy = self.storage if self.storage is not None else GVariable.default_storage
+        if policy is not None and not isinstance(data, CompactArray) and len(data) > 0:
+            fd = _to_float(data)
+            if fd.dtype.kind in "fiu":
+                is_time = self.unit == "s" or _is_time(data)
+                data = policy.encode(fd, is_time=is_time, abscissa=self.abscissa)
+        self._data = data
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the stored data"""
+        return int(getattr(self._data, "nbytes", np.asarray(self._data).nbytes))
+
+    def invalidate(self):
+        """Discards the cached values computed from the data.
+        To be called when the data array has been modified in place
+
+        """
+        if self.version > 0:
+            trig_cache.discard(self)
+        self._float_data = None
+        self._stats = None
+        self._monotonic = None
+        self.version += 1
+
+    @property
+    def float_data(self) -> FloatArr:
+        """The data as a numerical array. Durations are converted in seconds.
+        Computed once, and cached, except for a compact storage, decoded at each call"""
+        if isinstance(self._data, CompactArray):
+            return self._data.decode()
+
+        if self._float_data is None:
+            xd = _to_float(self._data)
+            flag_copy("GVariable.float_data", self._data, xd)
+            self._float_data = xd
+
+        return self._float_data
+
+    @property
+    def stats(self) -> GStats:
+        """The cached statistics of the data"""
+        if self._stats is None:
+            self._stats = GStats.from_array(self.float_data)
+
+        return self._stats
+
+    @property
+    def monotonic(self) -> int:
+        """1 if the data are increasing, -1 if they are decreasing, 0 otherwise
+        (unsorted, with NaN, or not numerical). Computed once, and cached"""
+        if self._monotonic is None:
+            if isinstance(self._data, CompactArray) and self._data.nan_code is None:
+                # The stored values are sorted like the decoded ones: no need to decode them
+                self._monotonic = _monotonic(self._data.q)
+            else:
+                self._monotonic = _monotonic(np.asarray(self.float_data))
+
+        return self._monotonic
+
+    def window(self, vmin: float = None, vmax: float = None) -> slice:
+        """Returns the indices of the samples between vmin and vmax, with one sample of margin
+        on each side, so that a line drawn from them crosses the bounds of the window.
+        The search is a bisection, for sorted data (see `GVariable.monotonic`).
+        For unsorted data, all the samples are kept
+
+        Args:
+            vmin: Lower bound. None for no lower bound
+            vmax: Upper bound. None for no upper bound. The bounds are swapped
+                if vmax < vmin, as given by the limits of an inverted axis
+
+        Returns:
+            The slice of the samples
+
+        Examples:
+            >>> x = GVariable(data=np.arange(10.0))
+            >>> x.window(2.5, 5)
+            slice(2, 7, None)
+            >>> GVariable(data=np.arange(10.0)[::-1]).window(2.5, 5)
+            slice(3, 8, None)
+
+        """
+        n = len(self._data)
+        mono = self.monotonic
+        if mono == 0 or (vmin is None and vmax is None):
+            return slice(0, n)
+        if vmin is not None and vmax is not None and vmax < vmin:
+            vmin, vmax = vmax, vmin
+
+        if isinstance(self._data, CompactArray):
+            a = self._data.q
+            encode = self._data.encode_value
+        else:
+            a = self.float_data
+            encode = float
+        if mono < 0:
+            a = a[::-1]
+
+        lo = 0
+        hi = n
+        if vmin is not None:
+            lo = max(int(np.searchsorted(a, _search_key(a, encode(vmin), "left"), "left")) - 1, 0)
+        if vmax is not None:
+            hi = min(int(np.searchsorted(a, _search_key(a, encode(vmax), "right"), "right")) + 1, n)
+        if mono < 0:
+            lo, hi = n - hi, n - lo
+
+        return slice(lo, max(lo, hi))
+
+    def float_window(self, sl: slice) -> FloatArr:
+        """The data of a window as a numerical array, like `GVariable.float_data`.
+        With a compact storage, only the window is decoded
+
+        Args:
+            sl: The window, given by `GVariable.window`
+
+        Returns:
+            The data of the window
+
+        """
+        if isinstance(self._data, CompactArray):
+            return self._data.decode(sl)
+
+        return self.float_data[sl]
 
     @classmethod
-    def from_desc(cls, desc) -> "GVariable":
-        if isinstance(desc, dict):
-            ret = GVariable.from_dict(desc)
+    def from_desc(cls, desc, abscissa: bool = False) -> "GVariable":
+        if isinstance(desc, GVariable):
+            ret = desc
+        elif isinstance(desc, dict):
+            ret = GVariable.from_dict(desc, abscissa=abscissa)
         elif isinstance(desc, (np.ndarray, pd.Series, tuple, list)):
-            ret = GVariable.from_serie(desc)
+            ret = GVariable.from_serie(desc, abscissa=abscissa)
         else:
             logger.error(f"Don't know how to build GVariable from type '{type(desc)}'")
             raise TypeError(f"{type(desc)}")
@@ -41,9 +351,10 @@ class GVariable(object):
         return ret
 
     @classmethod
-    def from_serie(cls, s: pd.Series) -> "GVariable":
-        ret = cls()
+    def from_serie(cls, s: pd.Series, abscissa: bool = False) -> "GVariable":
+        ret = cls(abscissa=abscissa)
         ret.data = np.array(s)
+        flag_copy("GVariable.from_serie", s, ret.data)
         ret.name = ""
         ret.unit = "-"
         ret.path = ""
@@ -51,19 +362,20 @@ class GVariable(object):
         return ret
 
     @classmethod
-    def from_dict(cls, d: dict) -> "GVariable":
-        ret = cls()
-        ret.data = d.get("data", np.array([]))
+    def from_dict(cls, d: dict, abscissa: bool = False) -> "GVariable":
+        ret = cls(abscissa=abscissa)
         ret.name = d.get("name", "")
         ret.unit = d.get("unit", "-")
         ret.path = d.get("path", "")
+        ret.data = d.get("data", np.array([]))
 
         return ret
 
     @classmethod
-    def from_dataframe(cls, df: DataFrame, name: str) -> "GVariable":
-        ret = cls()
+    def from_dataframe(cls, df: DataFrame, name: str, abscissa: bool = False) -> "GVariable":
+        ret = cls(abscissa=abscissa)
         ret.data = np.array(df[name])
+        flag_copy("GVariable.from_dataframe", None, ret.data)
         ret.name = name
         ret.unit = "-"
         ret.path = "/" + name
@@ -76,7 +388,7 @@ class GVariable(object):
         x = np.arange(ns)
 
         p = Polynomial.fit(x, y, deg=deg)
-        ret = np.array(y) - p(x)
+        ret = np.asarray(y) - p(x)
 
         rdesc = GVariable(data=ret, name=self.name + " (detrended)", unit=self.unit, path=self.path)
 
@@ -84,7 +396,7 @@ class GVariable(object):
 
     def __add__(self, y: GVariable) -> GVariable:
         rdesc = GVariable(
-            data=np.array(self.data) + np.array(y.data),
+            data=np.asarray(self.data) + np.asarray(y.data),
             name=self.name,
             unit=self.unit,
             path=self.path,
@@ -93,7 +405,9 @@ class GVariable(object):
         return rdesc
 
     def __neg__(self) -> GVariable:
-        rdesc = GVariable(data=-np.array(self.data), name=self.name, unit=self.unit, path=self.path)
+        rdesc = GVariable(
+            data=-np.asarray(self.data), name=self.name, unit=self.unit, path=self.path
+        )
 
         return rdesc
 
@@ -103,7 +417,7 @@ class GVariable(object):
 
     def __mul__(self, y: GVariable) -> GVariable:
         rdesc = GVariable(
-            data=np.array(self.data) * np.array(y.data),
+            data=np.asarray(self.data) * np.asarray(y.data),
             name=self.name,
             unit=self.unit,
             path=self.path,
@@ -113,7 +427,7 @@ class GVariable(object):
 
     def __div__(self, y: GVariable) -> GVariable:
         rdesc = GVariable(
-            data=np.array(self.data) / np.array(y.data),
+            data=np.asarray(self.data) / np.asarray(y.data),
             name=self.name,
             unit=self.unit,
             path=self.path,
@@ -122,6 +436,123 @@ class GVariable(object):
         return rdesc
 
 
+class GVariableRegistry(object):
+    """Interns the GVariable objects of a figure, so that plottables built from the same source
+    (array, Series, dictionary or DataFrame column) share a single GVariable.
+    The data are then copied, converted to float and analysed once,
+    and the backends receive the same buffer for all the plottables.
+
+    The sources are identified by identity, not by value, so that looking a source up
+    costs the same whatever its size: the registry keeps a reference to each source,
+    so that its id cannot be reused by another object.
+    A source modified in place after its first use is not copied again, unless its variable
+    was invalidated since (see `GVariable.invalidate`): the variable is then built again.
+
+    Examples:
+        >>> reg = GVariableRegistry()
+        >>> t = np.arange(10.0)
+        >>> reg.get(t) is reg.get(t)
+        True
+        >>> reg.get({"data": t, "name": "t", "unit": "s"}) is reg.get(t)
+        False
+        >>> x = reg.get(t)
+        >>> t[0] = -1.0
+        >>> x.invalidate()
+        >>> reg.get(t) is x
+        False
+
+    """
+
+    __slots__ = ["_vars"]
+
+    def __init__(self):
+        # key -> (source, variable, version of the variable when built, or None)
+        self._vars: T.Dict[tuple, T.Tuple[object, GVariable, T.Optional[int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._vars)
+
+    def _intern(
+        self,
+        source,
+        key: tuple,
+        factory: T.Callable[[], GVariable],
+        check_version: bool = True,
+    ) -> GVariable:
+        entry = self._vars.get(key, None)
+        if (
+            entry is None
+            or entry[0] is not source
+            or (entry[2] is not None and entry[1].version != entry[2])
+        ):
+            var = factory()
+            entry = (source, var, var.version if check_version else None)
+            self._vars[key] = entry
+        return entry[1]
+
+    def get(self, desc, abscissa: bool = False, copy: bool = True) -> GVariable:
+        """Returns the GVariable of a source, creating it on first use.
+        See `GVariable.from_desc`
+
+        Args:
+            desc: A GVariable (returned as is), an array, a Series, a list, or a dictionary
+            abscissa: True if the variable is an X axis (see `GVariable`)
+            copy: False to use a numpy array as the data of the variable, without copy.
+                As the variable then reads the array, it is kept after an invalidation
+
+        Returns:
+            The interned GVariable
+
+        """
+        if isinstance(desc, GVariable):
+            return desc
+
+        if isinstance(desc, dict):
+            data = desc.get("data", None)
+            key = (
+                "dict",
+                id(data),
+                desc.get("name", ""),
+                desc.get("unit", "-"),
+                desc.get("path", ""),
+                abscissa,
+            )
+            return self._intern(data, key, lambda: GVariable.from_dict(desc, abscissa=abscissa))
+
+        if not copy and isinstance(desc, np.ndarray):
+            return self._intern(
+                desc,
+                ("view", id(desc), abscissa),
+                lambda: GVariable(data=desc, abscissa=abscissa),
+                check_version=False,
+            )
+
+        return self._intern(
+            desc,
+            ("serie", id(desc), abscissa),
+            lambda: GVariable.from_desc(desc, abscissa=abscissa),
+        )
+
+    def get_column(self, df: DataFrame, name: str, abscissa: bool = False) -> GVariable:
+        """Returns the GVariable of a DataFrame column, creating it on first use.
+        See `GVariable.from_dataframe`
+
+        Args:
+            df: The DataFrame
+            name: Name of the column
+            abscissa: True if the variable is an X axis (see `GVariable`)
+
+        Returns:
+            The interned GVariable
+
+        """
+        return self._intern(
+            df,
+            ("column", id(df), name, abscissa),
+            lambda: GVariable.from_dataframe(df, name, abscissa=abscissa),
+        )
+
+
 @dataclass(init=True)
 class GPlottable:
     name: str
@@ -139,9 +570,9 @@ class GPlottable:
 
         if sx is None:
             ns = len(yvar.data)
-            xvar = GVariable(data=np.arange(ns))
+            xvar = GVariable(data=np.arange(ns), abscissa=True)
         else:
-            xvar = GVariable.from_serie(sx)
+            xvar = GVariable.from_serie(sx, abscissa=True)
 
         ret = cls(xvar=xvar, yvar=yvar, name=name)
 
@@ -153,56 +584,97 @@ class GPlottable:
 
         if dx is None:
             ns = len(yvar.data)
-            xvar = GVariable(data=np.arange(ns))
+            xvar = GVariable(data=np.arange(ns), abscissa=True)
         else:
-            xvar = GVariable.from_dict(dx)
+            xvar = GVariable.from_dict(dx, abscissa=True)
 
         ret = cls(xvar=xvar, yvar=yvar, name=name)
 
         return ret
 
     @classmethod
-    def from_dataframe(cls, df: DataFrame, yname: str, xname: str) -> "GPlottable":
-        yvar = GVariable.from_dataframe(df, yname)
+    def from_dataframe(
+        cls, df: DataFrame, yname: str, xname: str, registry: GVariableRegistry = None
+    ) -> "GPlottable":
+        column = GVariable.from_dataframe if registry is None else registry.get_column
+        yvar = column(df, yname)
 
         if xname is None or xname == "":
             ns = len(yvar.data)
-            xvar = GVariable(data=np.arange(ns))
+            xvar = GVariable(data=np.arange(ns), abscissa=True)
         else:
-            xvar = GVariable.from_dataframe(df, xname)
+            xvar = column(df, xname, abscissa=True)
 
         ret = cls(xvar=xvar, yvar=yvar, name=yname)
 
         return ret
 
     @classmethod
-    def from_tuple(cls, mline: tuple, name: str = "") -> "GPlottable":
+    def from_tuple(
+        cls, mline: tuple, name: str = "", registry: GVariableRegistry = None
+    ) -> "GPlottable":
         if len(mline) == 3:
             if isinstance(mline[0], pd.DataFrame):
                 df, xdesc, ydesc = mline
-                ret = cls.from_dataframe(df, ydesc, xdesc)
+                ret = cls.from_dataframe(df, ydesc, xdesc, registry=registry)
 
         elif len(mline) == 2:
             xdesc, ydesc = mline
-            xvar = GVariable.from_desc(xdesc)
-            yvar = GVariable.from_desc(ydesc)
+            from_desc = GVariable.from_desc if registry is None else registry.get
+            xvar = from_desc(xdesc, abscissa=True)
+            yvar = from_desc(ydesc)
             ret = cls(xvar=xvar, yvar=yvar, name=name)
 
         return ret
 
-    def make_line(self, transform: T.Callable = lambda x: x):
-        xd = self.xvar.data
-        yd = self.yvar.data
-
-        if isinstance(xd[0], (np.timedelta64, timedelta, Timestamp)):
-            s = pd.Series(data=xd)
-            xd = np.array(s).astype("timedelta64[s]").astype(np.float64)
-
-        if isinstance(yd[0], (np.timedelta64, timedelta, Timestamp)):
-            s = pd.Series(data=yd)
-            yd = np.array(s).astype("timedelta64[s]").astype(np.float64)
-
-        yd = transform(yd)
+    def make_line(
+        self,
+        transform: T.Callable = lambda x: x,
+        max_dt: float = None,
+        mask: npt.NDArray[np.bool_] = None,
+        max_points: int = None,
+        xbounds: T.Tuple[float, float] = None,
+    ):
+        """Returns the data to draw, converted to float
+
+        Args:
+            transform: Function applied to the Y data
+            max_dt: If given, the line is broken where the step between two X values
+                is larger than max_dt. See `soyut.utils.insert_gaps`
+            mask: If given, validity of the samples. The line is broken at the invalid samples
+            max_points: If given, the line is decimated down to about max_points points,
+                keeping its envelope and its breaks. See `soyut.utils.decimate_minmax`
+            xbounds: If given, (xmin, xmax) limits of the visible window (None for no limit).
+                If the X variable is sorted, only the samples of the window are kept,
+                before any conversion, transform or decimation. See `GVariable.window`
+
+        Returns:
+            The X data
+            The Y data
+            The name of the X variable
+            The unit of the X variable
+            The name of the Y variable
+            The unit of the Y variable
+
+        """
+        if xbounds is None:
+            xd = self.xvar.float_data
+            fyd = self.yvar.float_data
+        else:
+            sl = self.xvar.window(*xbounds)
+            xd = self.xvar.float_window(sl)
+            fyd = self.yvar.float_window(sl)
+            if mask is not None:
+                mask = np.asarray(mask)[sl]
+        yd = transform(fyd)
+        flag_copy("GPlottable.make_line", fyd, yd)
+
+        if max_dt is not None or mask is not None:
+            xd, yd = insert_gaps(xd, yd, max_dt=max_dt, mask=mask)
+            flag_copy("GPlottable.make_line", None, yd)
+
+        if max_points is not None and len(yd) > max_points:
+            xd, yd = decimate_minmax(xd, yd, nbins=max(max_points // 2, 1))
 
         name_of_x_var = self.xvar.name
         unit_of_x_var = self.xvar.unit
@@ -0,0 +1,275 @@
+"""Spatial indexes of the points of a plottable, for hover, picking and selection
+
+"""
+import typing as T
+from abc import ABCMeta, abstractmethod
+
+import numpy as np
+
+from ..utils import FloatArr
+
+__all__ = ["ASpatialIndex", "SortedXIndex", "GridIndex"]
+
+
+class ASpatialIndex(metaclass=ABCMeta):
+    """Index of a set of points, answering nearest point and box queries
+    without scanning all the points. The points with a NaN coordinate are not indexed.
+    The queries return indices in the arrays given at creation
+
+    Args:
+        x: X coordinates of the points
+        y: Y coordinates of the points
+
+    """
+
+    __slots__ = ["x", "y"]
+
+    def __init__(self, x: FloatArr, y: FloatArr):
+        self.x = np.asarray(x)
+        self.y = np.asarray(y)
+
+    @abstractmethod
+    def nearest(self, x: float, y: float) -> int:
+        """Returns the point nearest to (x, y)
+
+        Args:
+            x: X coordinate of the query
+            y: Y coordinate of the query
+
+        Returns:
+            The index of the point, or -1 if no point is indexed
+
+        """
+        pass
+
+    @abstractmethod
+    def in_box(self, xmin: float, xmax: float, ymin: float, ymax: float) -> np.ndarray:
+        """Returns the points within a box, bounds included
+
+        Args:
+            xmin: Left bound
+            xmax: Right bound
+            ymin: Bottom bound
+            ymax: Top bound
+
+        Returns:
+            The sorted indices of the points
+
+        """
+        pass
+
+
+class SortedXIndex(ASpatialIndex):
+    """Index of the points of a line, sorted along X, queried by bisection.
+    The nearest point is the one whose abscissa is the closest to the query,
+    like the hover of a time series. If the X coordinates are sorted and valid,
+    no array is copied
+
+    Args:
+        x: X coordinates of the points
+        y: Y coordinates of the points
+
+    Examples:
+        >>> idx = SortedXIndex(np.arange(10.0), np.arange(10.0) ** 2)
+        >>> idx.nearest(3.4, 0.0)
+        3
+        >>> idx.in_box(2, 6, 10, 30).tolist()
+        [4, 5]
+
+    """
+
+    __slots__ = ["order", "xs"]
+
+    def __init__(self, x: FloatArr, y: FloatArr):
+        super().__init__(x, y)
+        valid = np.isfinite(self.x) & np.isfinite(self.y)
+        if valid.all() and (len(self.x) < 2 or (np.diff(self.x) >= 0).all()):
+            self.order = None
+            self.xs = self.x
+        else:
+            (ivalid,) = np.nonzero(valid)
+            self.order = ivalid[np.argsort(self.x[ivalid], kind="stable")]
+            self.xs = self.x[self.order]
+
+    def _original(self, i):
+        return i if self.order is None else self.order[i]
+
+    def nearest(self, x: float, y: float) -> int:
+        n = len(self.xs)
+        if n == 0:
+            return -1
+
+        i = int(np.searchsorted(self.xs, x))
+        if i == n or (i > 0 and x - self.xs[i - 1] <= self.xs[i] - x):
+            i -= 1
+        return int(self._original(i))
+
+    def in_box(self, xmin: float, xmax: float, ymin: float, ymax: float) -> np.ndarray:
+        lo = np.searchsorted(self.xs, xmin, side="left")
+        hi = np.searchsorted(self.xs, xmax, side="right")
+        cand = np.arange(lo, hi) if self.order is None else self.order[lo:hi]
+        yc = self.y[cand]
+        return np.sort(cand[(yc >= ymin) & (yc <= ymax)])
+
+
+def _ranges(lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    # Concatenation of the ranges lo[k]:hi[k], without a Python loop
+    lens = hi - lo
+    total = int(lens.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    shift = np.repeat(lo - np.concatenate([[0], np.cumsum(lens)[:-1]]), lens)
+    return shift + np.arange(total)
+
+
+class GridIndex(ASpatialIndex):
+    """Index of a cloud of points, like a scatter plot, binned in a uniform grid.
+
+    The distances are measured with the X and Y coordinates normalized by their range,
+    which is close to the distance on the screen. The grid has about *points_per_cell* points
+    per cell, and the points are sorted by cell, so that the points of a row of cells are
+    contiguous. A query only reads the cells around the query point, or the rows of the box.
+    When no close enough point is found there, like in an empty corner of the grid,
+    the nearest point is searched in the blocks of *block* x *block* cells that can hold it,
+    selected with one vectorized pass over the list of the non-empty blocks
+
+    Args:
+        x: X coordinates of the points
+        y: Y coordinates of the points
+        points_per_cell: Mean number of points per cell
+        block: Size of the blocks of cells, in cells
+
+    Examples:
+        >>> rng = np.random.default_rng(seed=1)
+        >>> x, y = rng.uniform(size=(2, 1000))
+        >>> idx = GridIndex(x, y)
+        >>> i = idx.nearest(0.5, 0.5)
+        >>> bool(i == np.argmin((x - 0.5) ** 2 + (y - 0.5) ** 2))
+        True
+
+    """
+
+    __slots__ = ["order", "xs", "ys", "origin", "span", "ncells", "starts", "block", "blocks"]
+
+    #: Number of rings of cells around the query read before the search among all the cells
+    search_rings = 2
+
+    def __init__(self, x: FloatArr, y: FloatArr, points_per_cell: float = 4, block: int = 16):
+        super().__init__(x, y)
+        (ivalid,) = np.nonzero(np.isfinite(self.x) & np.isfinite(self.y))
+        xv = self.x[ivalid]
+        yv = self.y[ivalid]
+
+        if len(ivalid) > 0:
+            self.origin = np.array([xv.min(), yv.min()])
+            span = np.array([xv.max(), yv.max()]) - self.origin
+        else:
+            self.origin = np.zeros(2)
+            span = np.ones(2)
+        self.span = np.where(span > 0, span, 1.0)
+        self.ncells = max(int(np.ceil(np.sqrt(len(ivalid) / points_per_cell))), 1)
+
+        cell = self._cell(xv, 0) * self.ncells + self._cell(yv, 1)
+        iorder = np.argsort(cell, kind="stable")
+        self.order = ivalid[iorder]
+        self.xs = xv[iorder]
+        self.ys = yv[iorder]
+        counts = np.bincount(cell, minlength=self.ncells * self.ncells)
+        self.starts = np.concatenate([[0], np.cumsum(counts)])
+
+        # Coordinates of the non-empty blocks
+        n = self.ncells
+        nb = -(-n // block)
+        counts = np.pad(counts.reshape(n, n), (0, nb * block - n))
+        counts = counts.reshape(nb, block, nb, block).sum(axis=(1, 3))
+        self.block = block
+        self.blocks = np.nonzero(counts)
+
+    def _grid(self, v, axis: int):
+        # Coordinates in cell widths
+        return (np.asarray(v, dtype=np.float64) - self.origin[axis]) / self.span[axis] * self.ncells
+
+    def _cell(self, v, axis: int):
+        return np.clip(np.floor(self._grid(v, axis)), 0, self.ncells - 1).astype(np.int64)
+
+    def _closest(self, isorted: np.ndarray, gx: float, gy: float) -> T.Tuple[int, float]:
+        # Closest of the sorted points isorted, and its squared distance in cell widths
+        if len(isorted) == 0:
+            return -1, np.inf
+        dx = self._grid(self.xs[isorted], 0) - gx
+        dy = self._grid(self.ys[isorted], 1) - gy
+        d2 = dx * dx + dy * dy
+        k = int(np.argmin(d2))
+        return int(isorted[k]), float(d2[k])
+
+    def nearest(self, x: float, y: float) -> int:
+        if len(self.order) == 0:
+            return -1
+
+        n = self.ncells
+        gx = float(self._grid(x, 0))
+        gy = float(self._grid(y, 1))
+        cx = int(self._cell(x, 0))
+        cy = int(self._cell(y, 1))
+
+        # Cells within search_rings of (cx, cy): the cells of a row are contiguous
+        r = self.search_rings
+        ix = np.arange(max(cx - r, 0), min(cx + r, n - 1) + 1)
+        iy0, iy1 = max(cy - r, 0), min(cy + r, n - 1)
+        best, best_d2 = self._closest(
+            _ranges(self.starts[ix * n + iy0], self.starts[ix * n + iy1 + 1]), gx, gy
+        )
+        # The points beyond the rings are at least r cell widths away.
+        # This also holds for a query outside the grid, projected on its border
+        if best_d2 <= r * r:
+            return int(self.order[best])
+
+        # Distance from the query to each non-empty block, a lower bound of the distances
+        # to its points
+        b = self.block
+        bx, by = self.blocks
+        ex = np.maximum(np.maximum(bx * b - gx, gx - (bx + 1) * b), 0.0)
+        ey = np.maximum(np.maximum(by * b - gy, gy - (by + 1) * b), 0.0)
+        lb = ex * ex + ey * ey
+        if best < 0:
+            # Upper bound given by the points of the closest non-empty block
+            k = np.argmin(lb)
+            best, best_d2 = self._closest(self._block_points(bx[k : k + 1], by[k : k + 1]), gx, gy)
+
+        cand = lb < best_d2
+        i, d2 = self._closest(self._block_points(bx[cand], by[cand]), gx, gy)
+        if d2 < best_d2:
+            best = i
+
+        return int(self.order[best])
+
+    def _block_points(self, bx: np.ndarray, by: np.ndarray) -> np.ndarray:
+        # Sorted points of the blocks (bx, by): the cells of a row of a block are contiguous
+        n = self.ncells
+        b = self.block
+        ix = bx[:, None] * b + np.arange(b)
+        iy0 = np.broadcast_to((by * b)[:, None], ix.shape)
+        iy1 = np.minimum(iy0 + b, n) - 1
+        inside = ix < n
+        ix, iy0, iy1 = ix[inside], iy0[inside], iy1[inside]
+        return _ranges(self.starts[ix * n + iy0], self.starts[ix * n + iy1 + 1])
+
+    def in_box(self, xmin: float, xmax: float, ymin: float, ymax: float) -> np.ndarray:
+        n = self.ncells
+        ix0, ix1 = int(self._cell(xmin, 0)), int(self._cell(xmax, 0))
+        iy0, iy1 = int(self._cell(ymin, 1)), int(self._cell(ymax, 1))
+
+        # The cells iy0 to iy1 of a row are contiguous in the sorted points
+        sel = []
+        for ix in range(ix0, ix1 + 1):
+            lo = self.starts[ix * n + iy0]
+            hi = self.starts[ix * n + iy1 + 1]
+            xc = self.xs[lo:hi]
+            yc = self.ys[lo:hi]
+            inside = (xc >= xmin) & (xc <= xmax) & (yc >= ymin) & (yc <= ymax)
+            sel.append(self.order[lo:hi][inside])
+
+        if len(sel) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        return np.sort(np.concatenate(sel))
@@ -0,0 +1,208 @@
+"""Compact storage of the data of GVariable objects
+
+"""
+import typing as T
+from dataclasses import dataclass
+
+import numpy as np
+
+from ..utils import FloatArr
+
+__all__ = ["CompactArray", "StoragePolicy"]
+
+#: Code of NaN, and range of the codes of the finite values, for the integer storages
+_INT_CODES = {
+    "int16": (-32768, -32767, 32767),
+    "uint16": (65535, 0, 65534),
+}
+
+
+class CompactArray(object):
+    """Array of floats stored as offset + scale * q, q being a float32, int16 or uint16 array.
+    With the integer storages, NaN is stored as a reserved code
+
+    Args:
+        q: The stored array
+        offset: Offset, in float64 precision
+        scale: Scale factor
+        nan_code: Code of NaN for the integer storages, None otherwise
+        decode_dtype: Type of the decoded array
+
+    """
+
+    __slots__ = ["q", "offset", "scale", "nan_code", "decode_dtype"]
+
+    def __init__(
+        self,
+        q: np.ndarray,
+        offset: float = 0.0,
+        scale: float = 1.0,
+        nan_code: int = None,
+        decode_dtype=np.float32,
+    ):
+        self.q = q
+        self.offset = offset
+        self.scale = scale
+        self.nan_code = nan_code
+        self.decode_dtype = decode_dtype
+
+    @classmethod
+    def encode(
+        cls, a: FloatArr, dtype: str = "float32", relative: bool = False, decode_dtype=np.float32
+    ) -> "CompactArray":
+        """Encodes a float array
+
+        Args:
+            a: The array to encode
+            dtype: 'float32', 'int16' or 'uint16'. With the integer storages, the range of the
+                finite values is linearly mapped on the codes (65535 levels)
+            relative: With the float32 storage, True to store the values relative to the first
+                finite one (offset), which keeps the resolution of large values like timestamps
+            decode_dtype: Type of the decoded array
+
+        Returns:
+            The encoded array
+
+        Examples:
+            >>> c = CompactArray.encode(np.array([0.0, 0.5, np.nan, 1.0]), dtype="int16")
+            >>> c.q.dtype, c.nbytes
+            (dtype('int16'), 8)
+            >>> np.round(c.decode(), 4).tolist()
+            [0.0, 0.5, nan, 1.0]
+
+        """
+        a = np.asarray(a, dtype=np.float64)
+        finite = np.isfinite(a)
+
+        if dtype == "float32":
+            offset = 0.0
+            if relative and finite.any():
+                offset = float(a[np.argmax(finite)])
+            # The difference is computed in float64, before the rounding to float32
+            q = (a - offset).astype(np.float32) if offset != 0.0 else a.astype(np.float32)
+            return cls(q, offset=offset, decode_dtype=decode_dtype)
+
+        if dtype not in _INT_CODES:
+            raise ValueError(f"Unknown storage type '{dtype}'")
+
+        nan_code, lo, hi = _INT_CODES[dtype]
+        if finite.any():
+            vmin = float(a[finite].min())
+            vmax = float(a[finite].max())
+        else:
+            vmin = vmax = 0.0
+        scale = (vmax - vmin) / (hi - lo) if vmax > vmin else 1.0
+        offset = vmin - lo * scale
+
+        q = np.full(len(a), nan_code, dtype=dtype)
+        q[finite] = np.rint((a[finite] - offset) / scale)
+        return cls(q, offset=offset, scale=scale, nan_code=nan_code, decode_dtype=decode_dtype)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the stored array"""
+        return self.q.nbytes
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Type of the decoded array"""
+        return np.dtype(self.decode_dtype)
+
+    def __len__(self) -> int:
+        return len(self.q)
+
+    def decode(self, item: slice = None) -> FloatArr:
+        """Returns the decoded array
+
+        Args:
+            item: If given, only the stored values q[item] are decoded
+
+        Returns:
+            A new array of type decode_dtype
+
+        """
+        q = self.q if item is None else self.q[item]
+        res = np.multiply(q, self.scale, dtype=self.decode_dtype)
+        if self.offset != 0.0:
+            res += self.decode_dtype(self.offset)
+        if self.nan_code is not None:
+            res[q == self.nan_code] = np.nan
+        return res
+
+    def encode_value(self, v: float) -> float:
+        """Returns the stored value matching a float value, not rounded. As the scale is positive,
+        the stored values are sorted like the decoded ones
+
+        Args:
+            v: The float value
+
+        Returns:
+            The matching stored value
+
+        """
+        return (v - self.offset) / self.scale
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return self.decode(item)
+        return self.decode()[item]
+
+    def __array__(self, dtype=None, copy=None):
+        res = self.decode()
+        return res if dtype is None else res.astype(dtype)
+
+
+@dataclass(init=True)
+class StoragePolicy:
+    """How the data of GVariable objects are stored.
+    See `soyut.frontend.GPlottable.GVariable.default_storage`
+
+    The time variables (durations, dates, or variables in s) are stored with the type
+    *time_dtype*, relative to their first value, and decoded in float64. In float32, the
+    resolution degrades with the time span: 0.24 ms over an hour, but 7.8 ms over a day.
+    The other variables are stored with the type *dtype*, and decoded in float32,
+    which halves the size of the buffers sent to the backends.
+    The other abscissas (X variables) are only stored in float32, relative to their first
+    value, and decoded in float64: the integer storages would merge their samples and
+    shift them, so with 'int16' or 'uint16' they are stored as given
+
+    Examples:
+        >>> policy = StoragePolicy(dtype="uint16")
+        >>> policy.encode(np.linspace(0, 1, 1000), is_time=False).nbytes
+        2000
+
+    """
+
+    #: Storage of the values: 'float64' (no compaction), 'float32', 'int16' or 'uint16'
+    dtype: str = "float32"
+    #: Storage of the time axes: 'float64' (no compaction) or 'float32'
+    time_dtype: str = "float32"
+
+    def encode(
+        self, a: FloatArr, is_time: bool, abscissa: bool = False
+    ) -> T.Union[FloatArr, CompactArray]:
+        """Encodes an array according to the policy
+
+        Args:
+            a: The array to encode
+            is_time: True if the array is a time axis
+            abscissa: True if the array is an X axis
+
+        Returns:
+            The encoded array, or a if the storage is float64
+
+        """
+        if is_time:
+            if self.time_dtype == "float64":
+                return a
+            return CompactArray.encode(
+                a, dtype=self.time_dtype, relative=True, decode_dtype=np.float64
+            )
+
+        if self.dtype == "float64":
+            return a
+        if abscissa:
+            if self.dtype != "float32":
+                return a
+            return CompactArray.encode(a, dtype="float32", relative=True, decode_dtype=np.float64)
+        return CompactArray.encode(a, dtype=self.dtype, decode_dtype=np.float32)
@@ -0,0 +1,152 @@
+"""Frequency responses of batches of linear systems
+
+"""
+import typing as T
+
+import numpy as np
+from numpy import pi
+
+from ..utils import ComplexArr, FloatArr
+
+__all__ = ["GTransferFunction"]
+
+
+class GTransferFunction(object):
+    """Batch of continuous-time transfer functions H(s), all evaluated
+    in one broadcasted numpy computation
+
+    The systems are described either by the coefficients of their numerator and denominator
+    polynomials (decreasing powers of s, as in scipy.signal), or by their zeros, poles and gain.
+    When the systems of a batch do not have the same number of zeros or poles,
+    the missing ones are padded with NaN.
+
+    Args:
+        num: Numerator coefficients, of shape (nsys, nnum) or (nnum,)
+        den: Denominator coefficients, of shape (nsys, nden) or (nden,)
+        names: Name of each system
+
+    Examples:
+        >>> tf = GTransferFunction(num=[1.0], den=[1.0, 1.0])
+        >>> freq, mag, phase = tf.bode(fmin=1e-3, fmax=1e3, nfreq=7)
+        >>> mag.shape
+        (1, 7)
+        >>> float(np.round(mag[0, -1]))
+        -76.0
+
+    """
+
+    __slots__ = ["num", "den", "zeros", "poles", "gain", "names", "_cache"]
+
+    def __init__(self, num=None, den=None, names: T.List[str] = None):
+        self.num: FloatArr = None if num is None else np.atleast_2d(np.asarray(num))
+        self.den: FloatArr = None if den is None else np.atleast_2d(np.asarray(den))
+        self.zeros: ComplexArr = None
+        self.poles: ComplexArr = None
+        self.gain: FloatArr = None
+        self.names = names
+        self._cache = {}
+
+    @classmethod
+    def from_zpk(cls, zeros, poles, gain, names: T.List[str] = None) -> "GTransferFunction":
+        """Creates a batch of systems from their zeros, poles and gain
+
+        Args:
+            zeros: Zeros, of shape (nsys, nz) or (nz,). Padded with NaN if needed
+            poles: Poles, of shape (nsys, np) or (np,). Padded with NaN if needed
+            gain: Gain, scalar or of shape (nsys,)
+            names: Name of each system
+
+        Returns:
+            The batch of transfer functions
+
+        """
+        ret = cls(names=names)
+        ret.zeros = np.atleast_2d(np.asarray(zeros, dtype=np.complex128))
+        ret.poles = np.atleast_2d(np.asarray(poles, dtype=np.complex128))
+        ret.gain = np.atleast_1d(np.asarray(gain, dtype=np.float64))
+        return ret
+
+    @property
+    def nsys(self) -> int:
+        """Number of systems in the batch"""
+        if self.num is not None:
+            return max(self.num.shape[0], self.den.shape[0])
+        else:
+            return max(self.zeros.shape[0], self.poles.shape[0], self.gain.shape[0])
+
+    def getSystemName(self, index: int) -> str:
+        """Returns the name of a system of the batch
+
+        Args:
+            index: Index of the system
+
+        Returns:
+            The name given at creation, or a default one
+
+        """
+        if self.names is None:
+            return f"H{index}"
+        return self.names[index]
+
+    @staticmethod
+    def _polyval(coeffs: FloatArr, s: ComplexArr) -> ComplexArr:
+        # Horner scheme, vectorized over the systems and the frequencies
+        acc = np.zeros((coeffs.shape[0], len(s)), dtype=np.complex128)
+        for k in range(coeffs.shape[1]):
+            acc *= s
+            acc += coeffs[:, k, None]
+        return acc
+
+    @staticmethod
+    def _rootsval(roots: ComplexArr, s: ComplexArr) -> ComplexArr:
+        # Product of the (s - r) factors, the NaN padded roots being skipped
+        acc = np.ones((roots.shape[0], len(s)), dtype=np.complex128)
+        for k in range(roots.shape[1]):
+            r = roots[:, k, None]
+            acc *= np.where(np.isnan(r), 1.0, s - r)
+        return acc
+
+    def evaluate(self, freq: FloatArr) -> ComplexArr:
+        """Evaluates all the systems at the given frequencies
+
+        Args:
+            freq: Frequencies (Hz)
+
+        Returns:
+            The complex responses, of shape (nsys, nfreq)
+
+        """
+        s = 2j * pi * np.asarray(freq, dtype=np.float64)
+        if self.num is not None:
+            h = self._polyval(self.num, s) / self._polyval(self.den, s)
+        else:
+            h = self._rootsval(self.zeros, s) / self._rootsval(self.poles, s) * self.gain[:, None]
+
+        return h
+
+    def bode(
+        self, fmin: float, fmax: float, nfreq: int = 500
+    ) -> T.Tuple[FloatArr, FloatArr, FloatArr]:
+        """Computes the Bode diagram of all the systems over a log frequency grid.
+        The result is cached, so that the magnitude and phase plots share the same evaluation
+
+        Args:
+            fmin: Lowest frequency (Hz)
+            fmax: Highest frequency (Hz)
+            nfreq: Number of frequencies
+
+        Returns:
+            The frequencies (Hz), of shape (nfreq,)
+            The magnitudes (dB), of shape (nsys, nfreq)
+            The unwrapped phases (rad), of shape (nsys, nfreq)
+
+        """
+        key = (fmin, fmax, nfreq)
+        if key not in self._cache:
+            freq = np.logspace(np.log10(fmin), np.log10(fmax), nfreq)
+            h = self.evaluate(freq)
+            mag = 20 * np.log10(np.abs(h))
+            phase = np.unwrap(np.angle(h), axis=-1)
+            self._cache[key] = freq, mag, phase
+
+        return self._cache[key]
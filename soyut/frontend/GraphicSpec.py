@@ -24,6 +24,7 @@ class DSPLineType(Enum):
     POLAR = 2
     NORTH_POLAR = 3
     BODE_DIAG = 4
+    MULTI = 5
 
 
 class DSPMapType(Enum):
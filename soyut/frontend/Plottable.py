@@ -1,5 +1,6 @@
 from abc import ABCMeta, abstractmethod, abstractproperty
 import typing as T
+from dataclasses import dataclass
 from pathlib import Path
 
 from networkx.classes.graph import Graph
@@ -7,9 +8,14 @@ import numpy as np
 from numpy import pi
 import pandas as pd
 
-from .GPlottable import GPlottable
-from ..utils import FloatArr
-from .GraphicSpec import AxeProjection
+from .GPlottable import GPlottable, GStats, GVariable, GVariableRegistry
+from .GHistogram import GHistogram
+from .GMultiLine import GMultiLine
+from .GSpatialIndex import ASpatialIndex, GridIndex, SortedXIndex
+from .GStorage import CompactArray
+from ..utils import FloatArr, trig_cache
+from ..instrumentation import flag_copy
+from .GraphicSpec import AxeProjection, DSPLineType
 
 if T.TYPE_CHECKING:
     from .BAxe import ABaxe
@@ -24,10 +30,63 @@ __all__ = [
     "APlottable",
     "PlottableGraph",
     "PlottableGeneric",
+    "PlottableHistogram",
+    "PlottableMultiLine",
+    "PlottableBode",
     "APlottableDSPMap",
     "PlottableImage",
+    "SOYUT_OPTIONS",
+    "ViewWindow",
 ]
 
+#: Plotting options interpreted by soyut, that shall not be passed to the backends
+SOYUT_OPTIONS = (
+    "transform",
+    "angle_unit",
+    "radial_offset",
+    "radial_scale",
+    "max_dt",
+    "mask",
+    "max_points",
+)
+
+
+def _is_sorted(a: FloatArr) -> bool:
+    # True if the finite values of a are increasing
+    a = np.asarray(a)
+    a = a[np.isfinite(a)]
+    return bool((np.diff(a) >= 0).all())
+
+
+@dataclass(init=True)
+class ViewWindow:
+    """Part of the data to draw, overriding the X limits of the axe and the max_points option.
+    Used by the interactive backends to resample the lines when the view is panned or zoomed
+
+    """
+
+    #: (xmin, xmax) limits of the window, in S.I. units (None for no limit)
+    xbounds: T.Tuple[float, float] = (None, None)
+    #: If given, number of points the lines are decimated down to
+    max_points: int = None
+
+
+def _visible_xbounds(axe: ABaxe, view: ViewWindow = None) -> T.Tuple[float, float]:
+    # Explicit X limits of an axe whose X coordinate is the one of the data, None otherwise
+    if axe.projection not in (
+        AxeProjection.RECTILINEAR,
+        AxeProjection.LOGX,
+        AxeProjection.LOGY,
+        AxeProjection.LOGXY,
+    ):
+        return None
+
+    xbounds = axe.xbounds if view is None else view.xbounds
+    if xbounds == (None, None):
+        return None
+
+    return xbounds
+
 
 class APlottable(metaclass=ABCMeta):
     """This base abstract class describes all the entities able to be plotted:
@@ -48,7 +107,7 @@ class APlottable(metaclass=ABCMeta):
 
     """
 
-    __slots__ = ["name", "data_source", "kwargs", "twinx", "twiny"]
+    __slots__ = ["name", "data_source", "kwargs", "twinx", "twiny", "_stats", "_index"]
 
     def __init__(self, data_source, name: str, kwargs: dict) -> None:
         self.name = name
@@ -56,11 +115,20 @@ class APlottable(metaclass=ABCMeta):
         self.twinx = kwargs.pop("twinx", None)
         self.twiny = kwargs.pop("twiny", None)
         self.kwargs = kwargs
+        self._stats = {}
+        self._index = {}
 
     @abstractmethod
-    def _make_mline(self, axe: ABaxe) -> T.Tuple[FloatArr, FloatArr, str, str, str, str]:
+    def _make_mline(
+        self, axe: ABaxe, view: ViewWindow = None
+    ) -> T.Tuple[FloatArr, FloatArr, str, str, str, str]:
         """This makes the job of turning a generic data_source into a tuple of useful values
 
+        Args:
+            axe: The axe where the plottable is drawn
+            view: If given, part of the data to draw. Ignored by the plottables
+                that cannot be windowed
+
         Returns:
             An numpy array of X coordinates
             An numpy array of Y coordinates
@@ -76,6 +144,99 @@ class APlottable(metaclass=ABCMeta):
     def compatible_baxe(self) -> T.List[AxeProjection]:
         pass
 
+    @property
+    def line_type(self) -> DSPLineType:
+        """Kind of line the backends shall draw"""
+        return DSPLineType.RECTILINEAR
+
+    def _dataVersion(self) -> tuple:
+        """Returns a key that changes whenever the data of the plottable change"""
+        return ()
+
+    def _sourceArrays(self) -> tuple:
+        """Returns the arrays holding the data of the plottable.
+        Used by `soyut.instrumentation` to detect copies
+
+        """
+        return ()
+
+    def getStats(self, axe: ABaxe) -> T.Tuple[GStats, GStats]:
+        """Returns the statistics of the data, in the units of `APlottable._make_mline`.
+        They cover all the data, whatever the X limits of the axe, so that they are computed
+        once per projection and version of the data, and cached
+
+        Args:
+            axe: The axe where the plottable is drawn
+
+        Returns:
+            The statistics of the X coordinates
+            The statistics of the Y coordinates
+            or None if the plottable has no numerical data
+
+        """
+        key = (axe.projection,) + self._dataVersion()
+        if key not in self._stats:
+            # All the data, whatever the X limits of the axe
+            mline = self._make_mline(axe, ViewWindow())
+            if mline is None:
+                stats = None
+            else:
+                stats = GStats.from_array(mline[0]), GStats.from_array(mline[1])
+            self._stats[key] = stats
+
+        return self._stats[key]
+
+    def spatialIndex(self, axe: ABaxe) -> ASpatialIndex:
+        """Returns the index of the drawn points, for hover, picking and selection.
+        It is built at the first call, and cached per projection and version of the data.
+        The lines with sorted X coordinates are indexed along X (`SortedXIndex`),
+        the scatter plots and the other lines with a uniform grid (`GridIndex`).
+        The coordinates are the ones of `APlottable._make_mline`
+
+        Args:
+            axe: The axe where the plottable is drawn
+
+        Returns:
+            The index, or None if the plottable is not made of points
+
+        """
+        key = (axe.projection,) + self._dataVersion()
+        if key not in self._index:
+            mline = self._make_mline(axe, ViewWindow())
+            if mline is None or np.ndim(mline[1]) != 1:
+                index = None
+            elif self.kwargs.get("linestyle", None) != "" and _is_sorted(mline[0]):
+                index = SortedXIndex(mline[0], mline[1])
+            else:
+                index = GridIndex(mline[0], mline[1])
+            # Only the index of the current data is kept
+            self._index = {key: index}
+
+        return self._index[key]
+
+    def getDataBounds(self, axe: ABaxe) -> T.Tuple[T.Tuple[float, float], T.Tuple[float, float]]:
+        """Returns the limits of the data, in the units of `APlottable._make_mline`,
+        from the cached statistics
+
+        Args:
+            axe: The axe where the plottable is drawn
+
+        Returns:
+            The X limits (min, max)
+            The Y limits (min, max)
+            or None if the plottable has no numerical data
+
+        """
+        stats = self.getStats(axe)
+        if stats is None:
+            return None
+
+        xs, ys = stats
+        if np.isnan(xs.min) or np.isnan(ys.min):
+            return None
+
+        return (xs.min, xs.max), (ys.min, ys.max)
+
 
 class PlottableGraph(APlottable):
     """Allows plotting a networkx MultiDiGraph
@@ -97,6 +258,21 @@ class PlottableGraph(APlottable):
 
 
 class PlottableGeneric(APlottable):
+    """Specialisation of `APlottable` for `soyut.frontend.GPlottable.GPlottable`
+
+    Supported plotting options, besides the ones of the backends:
+
+    * transform: function applied to the Y data
+    * max_dt: the line is broken where the step between two X values is larger than max_dt
+    * mask: boolean array of the valid samples. The line is broken at the invalid ones
+    * max_points: the line is decimated down to about max_points points (min/max envelope)
+    * angle_unit, radial_offset, radial_scale: see `PlottableGeneric._polar_to_cartesian`
+
+    Args:
+        data_source: a `soyut.frontend.GPlottable.GPlottable` instance
+        kwargs: The dictionary of options for plotting (color, width,etc)
+
+    """
 
     __slots__ = []
 
@@ -112,8 +288,13 @@ class PlottableGeneric(APlottable):
             AxeProjection.POLAR,
         ]
 
-    def _make_mline(self, axe: ABaxe) -> T.Tuple[FloatArr, FloatArr, str, str, str, str]:
+    def _make_mline(
+        self, axe: ABaxe, view: ViewWindow = None
+    ) -> T.Tuple[FloatArr, FloatArr, str, str, str, str]:
         transform = self.kwargs.get("transform", lambda x: x)
+        max_points = self.kwargs.get("max_points", None)
+        if view is not None and view.max_points is not None:
+            max_points = view.max_points
 
         (
             xd,
@@ -122,16 +303,218 @@ class PlottableGeneric(APlottable):
             unit_of_x_var,
             name_of_y_var,
             unit_of_y_var,
-        ) = self.data_source.make_line(transform=transform)
+        ) = self.data_source.make_line(
+            transform=transform,
+            max_dt=self.kwargs.get("max_dt", None),
+            mask=self.kwargs.get("mask", None),
+            max_points=max_points,
+            xbounds=_visible_xbounds(axe, view),
+        )
 
         if axe.projection == AxeProjection.PLATECARREE:
-            xd *= 180 / pi
-            yd *= 180 / pi
+            # Not in place, as xd and yd may be the data of the GVariable
+            xd = np.multiply(xd, 180 / pi)
+            yd = np.multiply(yd, 180 / pi)
+            flag_copy("PlottableGeneric._make_mline", None, xd)
+            flag_copy("PlottableGeneric._make_mline", None, yd)
             unit_of_x_var = "deg"
             unit_of_y_var = "deg"
 
+        elif axe.projection in (AxeProjection.POLAR, AxeProjection.NORTH_POLAR):
+            xd, yd = self._polar_to_cartesian(
+                xd, yd, unit_of_x_var, north=axe.projection == AxeProjection.NORTH_POLAR
+            )
+            flag_copy("PlottableGeneric._polar_to_cartesian", None, xd)
+            flag_copy("PlottableGeneric._polar_to_cartesian", None, yd)
+            unit_of_x_var = unit_of_y_var
+
         return xd, yd, name_of_x_var, unit_of_x_var, name_of_y_var, unit_of_y_var
 
+    def _dataVersion(self) -> tuple:
+        return self.data_source.xvar.version, self.data_source.yvar.version
+
+    def _sourceArrays(self) -> tuple:
+        return self.data_source.xvar.data, self.data_source.yvar.data
+
+    def getStats(self, axe: ABaxe) -> T.Tuple[GStats, GStats]:
+        # Without transformation, or with a linear one, the statistics
+        # cached by the GVariable are used directly.
+        # The NaN breaks inserted by max_dt do not change the extrema, unlike a mask
+        if (
+            "transform" in self.kwargs
+            or "mask" in self.kwargs
+            or axe.projection
+            in (
+                AxeProjection.POLAR,
+                AxeProjection.NORTH_POLAR,
+            )
+        ):
+            return super().getStats(axe)
+
+        xs = self.data_source.xvar.stats
+        ys = self.data_source.yvar.stats
+        if axe.projection == AxeProjection.PLATECARREE:
+            xs = xs.scaled(180 / pi)
+            ys = ys.scaled(180 / pi)
+
+        return xs, ys
+
+    def _polar_to_cartesian(
+        self, angle: FloatArr, radius: FloatArr, angle_unit: str, north: bool
+    ) -> T.Tuple[FloatArr, FloatArr]:
+        """Converts polar data into cartesian coordinates of the drawing plane.
+        When angle is the data of the X variable, the cosine and sine tables are cached
+        in `soyut.utils.trig_cache`. They are computed at each call for the angles derived
+        from it (breaks inserted by max_dt, decimation) and for a compact storage
+
+        Supported plotting options:
+
+        * angle_unit: 'rad' or 'deg'. By default, the unit of the X variable if it is 'deg',
+            'rad' otherwise
+        * radial_offset: value of the radius drawn at the center (default 0).
+            For example, 90 deg for an elevation
+        * radial_scale: factor applied to the radius once the offset is removed (default 1).
+            For example, -1 for an elevation
+
+        Args:
+            angle: Trigonometric angle for a `AxeProjection.POLAR` axe,
+                or azimuth (clockwise from North) for a `AxeProjection.NORTH_POLAR` axe
+            radius: Radius
+            angle_unit: Unit of the X variable
+            north: True for the north-clockwise convention
+
+        Returns:
+            The X cartesian coordinate
+            The Y cartesian coordinate
+
+        """
+        angle_unit = self.kwargs.get("angle_unit", angle_unit)
+        factor = pi / 180 if angle_unit == "deg" else 1.0
+        xvar = self.data_source.xvar
+        if not isinstance(xvar.data, CompactArray) and angle is xvar.float_data:
+            cos_a, sin_a = trig_cache.get(xvar, factor=factor)
+        else:
+            cos_a, sin_a = trig_cache.tables(angle, factor=factor)
+
+        r = np.subtract(radius, self.kwargs.get("radial_offset", 0.0), dtype=np.float64)
+        scale = self.kwargs.get("radial_scale", 1.0)
+        if scale != 1.0:
+            r *= scale
+
+        if north:
+            # Azimuth: 0 towards +Y, pi/2 towards +X
+            xd = np.multiply(r, sin_a)
+            yd = np.multiply(r, cos_a, out=r)
+        else:
+            xd = np.multiply(r, cos_a)
+            yd = np.multiply(r, sin_a, out=r)
+
+        return xd, yd
+
+
+class PlottableBode(PlottableGeneric):
+    """Magnitude or phase line of a Bode diagram.
+    See `soyut.frontend.BFigure.BFigure.add_bode`
+
+    Args:
+        data_source: a `soyut.frontend.GPlottable.GPlottable` whose X variable is the frequency
+        kwargs: The dictionary of options for plotting (color, width,etc)
+
+    """
+
+    __slots__ = []
+
+    @property
+    def compatible_baxe(self) -> T.List[AxeProjection]:
+        return [
+            AxeProjection.RECTILINEAR,
+            AxeProjection.LOGX,
+        ]
+
+    @property
+    def line_type(self) -> DSPLineType:
+        return DSPLineType.BODE_DIAG
+
+
+class PlottableHistogram(APlottable):
+    """Allows plotting a `soyut.frontend.GHistogram.GHistogram`
+
+    Args:
+        data_source: a GHistogram instance
+        kwargs: The dictionary of options for plotting (color, width,etc)
+
+    """
+
+    __slots__ = []
+
+    @property
+    def compatible_baxe(self) -> T.List[AxeProjection]:
+        return [
+            AxeProjection.RECTILINEAR,
+            AxeProjection.LOGX,
+            AxeProjection.LOGY,
+            AxeProjection.LOGXY,
+        ]
+
+    @property
+    def line_type(self) -> DSPLineType:
+        return DSPLineType.HISTOGRAM
+
+    def _make_mline(
+        self, axe: ABaxe, view: ViewWindow = None
+    ) -> T.Tuple[FloatArr, FloatArr, str, str, str, str]:
+        transform = self.kwargs.get("transform", lambda x: x)
+
+        return self.data_source.make_line(transform=transform)
+
+    def _dataVersion(self) -> tuple:
+        return self.data_source.count, self.data_source.nan_count
+
+
+class PlottableMultiLine(APlottable):
+    """Allows plotting a `soyut.frontend.GMultiLine.GMultiLine`: a block of lines,
+    drawn by the backends as a single batched artist, or a group of traces
+
+    Args:
+        data_source: a GMultiLine instance
+        kwargs: The dictionary of options for plotting (color, width,etc)
+
+    """
+
+    __slots__ = []
+
+    @property
+    def compatible_baxe(self) -> T.List[AxeProjection]:
+        return [
+            AxeProjection.RECTILINEAR,
+            AxeProjection.LOGX,
+            AxeProjection.LOGY,
+            AxeProjection.LOGXY,
+        ]
+
+    @property
+    def line_type(self) -> DSPLineType:
+        return DSPLineType.MULTI
+
+    def _make_mline(
+        self, axe: ABaxe, view: ViewWindow = None
+    ) -> T.Tuple[FloatArr, FloatArr, str, str, str, str]:
+        transform = self.kwargs.get("transform", lambda x: x)
+
+        return self.data_source.make_line(transform=transform, xbounds=_visible_xbounds(axe, view))
+
+    def _dataVersion(self) -> tuple:
+        return self.data_source.xvar.version, self.data_source.version
+
+    def _sourceArrays(self) -> tuple:
+        return self.data_source.xvar.data, self.data_source.ydata
+
+    def getStats(self, axe: ABaxe) -> T.Tuple[GStats, GStats]:
+        if "transform" in self.kwargs:
+            return super().getStats(axe)
+
+        return self.data_source.xvar.stats, self.data_source.stats
+
 
 class APlottableDSPMap(APlottable):
     """Specialisation of `APlottable` for `blocksim.dsp.DSPMap.ADSPMap`
@@ -162,7 +545,9 @@ class PlottableImage(APlottableDSPMap):
             AxeProjection.RECTILINEAR,
         ]
 
-    def _make_mline(self, axe: ABaxe) -> T.Tuple[FloatArr, FloatArr, str, str, str, str]:
+    def _make_mline(
+        self, axe: ABaxe, view: ViewWindow = None
+    ) -> T.Tuple[FloatArr, FloatArr, str, str, str, str]:
         pass
 
 
@@ -173,7 +558,9 @@ class PlottableFactory(object):
     __slots__ = []
 
     @classmethod
-    def create(cls, mline, name: str = "", kwargs: dict = {}) -> APlottable:
+    def create(
+        cls, mline, name: str = "", kwargs: dict = {}, registry: GVariableRegistry = None
+    ) -> APlottable:
         """Creates the adapted daughter class of `APlottable` to handle the object to plot
 
         Args:
@@ -184,6 +571,9 @@ class PlottableFactory(object):
             * a 2 elements tuple of numpy arrays
             * a simple numpy arrays
             * a networkx DiGraph
+            * a `soyut.frontend.GHistogram.GHistogram`
+            * a `soyut.frontend.GMultiLine.GMultiLine`, or a 2D numpy array
+              whose columns are the lines
             * a 2 elements tuple of dictionaries, with keys:
 
                 * data
@@ -192,6 +582,8 @@ class PlottableFactory(object):
 
             name: Name of the data_source for identification
             kwargs: The plotting options for the object
+            registry: If given, the GVariable objects are interned in this registry,
+                so that the plottables built from the same arrays share them
 
         Returns:
             The APlottable instance suited to the object
@@ -207,18 +599,35 @@ class PlottableFactory(object):
             if np.isscalar(mline[0]):
                 gp = GPlottable.from_serie(sy=mline)
             else:
-                gp = GPlottable.from_tuple(mline)
+                gp = GPlottable.from_tuple(mline, registry=registry)
             ret = PlottableGeneric(gp, name, kwargs)
 
+        elif isinstance(mline, np.ndarray) and mline.ndim == 2:
+            ret = PlottableMultiLine(GMultiLine.from_array(mline, name=name), name, kwargs)
+
         elif isinstance(mline, (pd.Series, np.ndarray, list)):
-            gp = GPlottable.from_serie(sy=mline)
+            if registry is None:
+                gp = GPlottable.from_serie(sy=mline)
+            else:
+                yvar = registry.get(mline)
+                xvar = GVariable(data=np.arange(len(yvar.data)), abscissa=True)
+                gp = GPlottable(name="", xvar=xvar, yvar=yvar)
             ret = PlottableGeneric(gp, name, kwargs)
 
+        elif isinstance(mline, GMultiLine):
+            if name == "" or name is None:
+                name = mline.name
+            ret = PlottableMultiLine(mline, name, kwargs)
+
         elif isinstance(mline, GPlottable):
             if name == "" or name is None:
                 name = mline.name
-            gp = GPlottable.from_serie(sy=mline)
-            ret = PlottableGeneric(gp, name, kwargs)
+            ret = PlottableGeneric(mline, name, kwargs)
+
+        elif isinstance(mline, GHistogram):
+            if name == "" or name is None:
+                name = mline.name
+            ret = PlottableHistogram(mline, name, kwargs)
 
         elif isinstance(mline, Path):
             ret = PlottableImage(mline, name, kwargs)
@@ -0,0 +1,452 @@
+"""Opt-in instrumentation of the rendering pipeline
+
+Tracing is enabled either with the `trace` context manager:
+
+    with trace(json_path="trace.json", chrome_path="trace_chrome.json"):
+        simple_mpl_renderer(fig, show=False)
+
+or for the whole process by setting the SOYUT_TRACE environment variable to the path of the
+JSON trace to write at exit. A Chrome trace-event file (to be opened with chrome://tracing or
+https://ui.perfetto.dev) is written next to it, with the suffix _chrome.json.
+
+Each stage records its nested timing, the axe and plottable it works on, and the size
+of the arrays it produced, with the number of bytes that were copied instead of viewed.
+When tracing is disabled, `stage` returns a shared no-op context manager.
+
+In memory mode (`trace(memory=True)`, or SOYUT_TRACE_MEMORY=1 in addition to SOYUT_TRACE),
+tracemalloc is also started, and each stage records the high-water mark of the memory
+allocated while it ran (numpy reports its buffers to tracemalloc). The peak of the render
+stage is thus the peak memory of the figure. Every place where the data of a plottable is
+copied instead of viewed is flagged (see `flag_copy`), and listed in the trace.
+
+"""
+import os
+import json
+import time
+import atexit
+import threading
+import tracemalloc
+import typing as T
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+import numpy as np
+
+from . import logger
+
+__all__ = [
+    "Tracer",
+    "trace",
+    "stage",
+    "annotate",
+    "annotate_arrays",
+    "flag_copy",
+    "get_tracer",
+]
+
+_NULL_CONTEXT = nullcontext()
+
+# tracemalloc.reset_peak is not available before python 3.9.
+# The peaks are then cumulative since the start of the trace
+_reset_peak = getattr(tracemalloc, "reset_peak", lambda: None)
+
+
+class Tracer(object):
+    """Collects the timings of nested stages, from all threads
+
+    In memory mode, the memory high-water marks are measured with tracemalloc,
+    which is process-wide: the peak of a stage includes the allocations of the other threads
+    running at the same time.
+
+    Args:
+        name: Name of the trace
+        memory: True to record the memory high-water mark of each stage, and the copies
+
+    """
+
+    __slots__ = ["name", "memory", "records", "copies", "_t0", "_lock", "_local"]
+
+    def __init__(self, name: str = "soyut", memory: bool = False):
+        self.name = name
+        self.memory = memory
+        self.records: T.List[dict] = []
+        self.copies: T.List[dict] = []
+        self._t0 = time.perf_counter_ns()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> T.List[dict]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = []
+            self._local.stack = stack
+        return stack
+
+    @contextmanager
+    def stage(self, name: str, category: str = "soyut", **args):
+        """Times a stage. Stages opened inside this one are recorded as its children
+
+        Args:
+            name: Name of the stage
+            category: Category of the stage, used to filter the Chrome trace
+            args: Information on the stage, like the axe or the plottable
+
+        """
+        stack = self._stack()
+        rec = {
+            "name": name,
+            "cat": category,
+            "tid": threading.get_ident(),
+            "depth": len(stack),
+            "parent": stack[-1]["name"] if stack else None,
+            "args": args,
+        }
+        if self.memory:
+            self._enterMemory(rec, stack)
+        stack.append(rec)
+        start = time.perf_counter_ns()
+        try:
+            yield rec
+        finally:
+            rec["ts"] = start - self._t0
+            rec["dur"] = time.perf_counter_ns() - start
+            stack.pop()
+            if self.memory:
+                self._exitMemory(rec, stack)
+            with self._lock:
+                self.records.append(rec)
+
+    @staticmethod
+    def _enterMemory(rec: dict, stack: T.List[dict]):
+        # The peak reached so far belongs to the parent stage, before it is reset for this one
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1]["_peak"] = max(stack[-1]["_peak"], peak)
+        _reset_peak()
+        rec["_start_mem"] = current
+        rec["_peak"] = current
+
+    @staticmethod
+    def _exitMemory(rec: dict, stack: T.List[dict]):
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(rec.pop("_peak"), peak)
+        start_mem = rec.pop("_start_mem")
+        rec["args"]["mem_peak_bytes"] = peak - start_mem
+        rec["args"]["mem_delta_bytes"] = current - start_mem
+        if stack:
+            stack[-1]["_peak"] = max(stack[-1]["_peak"], peak)
+        _reset_peak()
+
+    def flagCopy(self, where: str, nbytes: int):
+        """Records that the data of a plottable was copied instead of viewed
+
+        Args:
+            where: Name of the function that made the copy
+            nbytes: Size of the copy
+
+        """
+        stack = self._stack()
+        ev = {
+            "where": where,
+            "nbytes": nbytes,
+            "stage": stack[-1]["name"] if stack else None,
+            "ts": time.perf_counter_ns() - self._t0,
+            "tid": threading.get_ident(),
+        }
+        with self._lock:
+            self.copies.append(ev)
+
+    def annotate(self, **args):
+        """Adds information to the innermost stage of the current thread.
+        Numerical values are accumulated
+
+        """
+        stack = self._stack()
+        if not stack:
+            return
+        rargs = stack[-1]["args"]
+        for k, v in args.items():
+            if isinstance(v, (int, float)) and isinstance(rargs.get(k, None), (int, float)):
+                rargs[k] += v
+            else:
+                rargs[k] = v
+
+    def to_chrome_trace(self) -> dict:
+        """Returns the trace in the Chrome trace-event format (complete events)"""
+        pid = os.getpid()
+        events = [
+            {
+                "name": rec["name"],
+                "cat": rec["cat"],
+                "ph": "X",
+                "ts": rec["ts"] / 1000,
+                "dur": rec["dur"] / 1000,
+                "pid": pid,
+                "tid": rec["tid"],
+                "args": _jsonable(rec["args"]),
+            }
+            for rec in self.records
+        ]
+        for ev in self.copies:
+            events.append(
+                {
+                    "name": f"copy in {ev['where']}",
+                    "cat": "copy",
+                    "ph": "i",
+                    "s": "t",
+                    "ts": ev["ts"] / 1000,
+                    "pid": pid,
+                    "tid": ev["tid"],
+                    "args": {"nbytes": ev["nbytes"], "stage": ev["stage"]},
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def summary(self) -> T.List[dict]:
+        """Aggregates the records by stage name
+
+        Returns:
+            A list of dictionaries with keys name, calls, total_ms, mean_ms, max_ms,
+            nbytes, copied_bytes and mem_peak_bytes (largest high-water mark of the stage),
+            sorted by decreasing total time
+
+        """
+        agg = {}
+        for rec in self.records:
+            a = agg.setdefault(
+                rec["name"],
+                {
+                    "name": rec["name"],
+                    "calls": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "nbytes": 0,
+                    "copied_bytes": 0,
+                    "mem_peak_bytes": 0,
+                },
+            )
+            dur = rec["dur"] / 1e6
+            a["calls"] += 1
+            a["total_ms"] += dur
+            a["max_ms"] = max(a["max_ms"], dur)
+            a["nbytes"] += rec["args"].get("nbytes", 0)
+            a["copied_bytes"] += rec["args"].get("copied_bytes", 0)
+            a["mem_peak_bytes"] = max(a["mem_peak_bytes"], rec["args"].get("mem_peak_bytes", 0))
+
+        res = sorted(agg.values(), key=lambda a: -a["total_ms"])
+        for a in res:
+            a["mean_ms"] = a["total_ms"] / a["calls"]
+
+        return res
+
+    def to_json(self) -> dict:
+        """Returns the structured trace: the list of stages and the summary"""
+        stages = []
+        for rec in sorted(self.records, key=lambda r: r["ts"]):
+            r = dict(rec)
+            r["args"] = _jsonable(rec["args"])
+            r["ts_ms"] = r.pop("ts") / 1e6
+            r["dur_ms"] = r.pop("dur") / 1e6
+            stages.append(r)
+
+        copies = []
+        for ev in self.copies:
+            c = dict(ev)
+            c["ts_ms"] = c.pop("ts") / 1e6
+            copies.append(c)
+
+        res = {"name": self.name, "stages": stages, "summary": self.summary(), "copies": copies}
+        if self.memory:
+            res["figures_peak_bytes"] = {
+                rec["args"].get("figure", ""): rec["args"]["mem_peak_bytes"]
+                for rec in self.records
+                if rec["name"] == "render"
+            }
+
+        return res
+
+    def write(self, json_path: Path = None, chrome_path: Path = None):
+        """Writes the trace files
+
+        Args:
+            json_path: Path of the structured JSON trace
+            chrome_path: Path of the Chrome trace-event file
+
+        """
+        if json_path is not None:
+            with open(json_path, "w") as f:
+                json.dump(self.to_json(), f, indent=1)
+
+        if chrome_path is not None:
+            with open(chrome_path, "w") as f:
+                json.dump(self.to_chrome_trace(), f)
+
+    def log_summary(self):
+        """Logs a summary table of the stages with soyut_logger"""
+        lines = [
+            f"{'stage':<24}{'calls':>8}{'total (ms)':>12}{'mean (ms)':>12}"
+            f"{'max (ms)':>12}{'MB':>10}{'copied MB':>11}{'peak MB':>10}"
+        ]
+        for a in self.summary():
+            lines.append(
+                f"{a['name']:<24}{a['calls']:>8}{a['total_ms']:>12.3f}{a['mean_ms']:>12.3f}"
+                f"{a['max_ms']:>12.3f}{a['nbytes'] / 2**20:>10.2f}"
+                f"{a['copied_bytes'] / 2**20:>11.2f}{a['mem_peak_bytes'] / 2**20:>10.2f}"
+            )
+        if self.copies:
+            lines.append(
+                f"{len(self.copies)} copies of plottable data, "
+                f"{sum(ev['nbytes'] for ev in self.copies) / 2**20:.2f} MB:"
+            )
+            where = {}
+            for ev in self.copies:
+                where[ev["where"]] = where.get(ev["where"], 0) + ev["nbytes"]
+            for w, nbytes in where.items():
+                lines.append(f"  {w}: {nbytes / 2**20:.2f} MB")
+        logger.info(f"Trace '{self.name}':\n" + "\n".join(lines))
+
+
+def _jsonable(args: dict) -> dict:
+    res = {}
+    for k, v in args.items():
+        if isinstance(v, (str, int, float, bool)) or v is None:
+            res[k] = v
+        elif isinstance(v, np.generic):
+            res[k] = v.item()
+        else:
+            res[k] = str(v)
+    return res
+
+
+_active_tracer: Tracer = None
+
+
+def get_tracer() -> Tracer:
+    """Returns the active tracer, or None if tracing is disabled"""
+    return _active_tracer
+
+
+@contextmanager
+def trace(
+    name: str = "soyut",
+    json_path: Path = None,
+    chrome_path: Path = None,
+    log: bool = True,
+    memory: bool = False,
+):
+    """Enables tracing within the block
+
+    Args:
+        name: Name of the trace
+        json_path: Path of the structured JSON trace to write at the end of the block
+        chrome_path: Path of the Chrome trace-event file to write at the end of the block
+        log: True to log a summary table with soyut_logger
+        memory: True to record the memory high-water marks and the copies of data
+
+    Yields:
+        The `Tracer` instance
+
+    """
+    global _active_tracer
+
+    previous = _active_tracer
+    tracer = Tracer(name, memory=memory)
+    started = memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    _active_tracer = tracer
+    try:
+        yield tracer
+    finally:
+        _active_tracer = previous
+        if started:
+            tracemalloc.stop()
+        tracer.write(json_path=json_path, chrome_path=chrome_path)
+        if log:
+            tracer.log_summary()
+
+
+def stage(name: str, category: str = "soyut", **args):
+    """Times a stage if tracing is enabled. See `Tracer.stage`
+
+    Args:
+        name: Name of the stage
+        category: Category of the stage
+        args: Information on the stage, like the axe or the plottable
+
+    """
+    tracer = _active_tracer
+    if tracer is None:
+        return _NULL_CONTEXT
+    return tracer.stage(name, category, **args)
+
+
+def annotate(**args):
+    """Adds information to the current stage if tracing is enabled. See `Tracer.annotate`"""
+    tracer = _active_tracer
+    if tracer is not None:
+        tracer.annotate(**args)
+
+
+def annotate_arrays(*arrays, sources: T.Iterable = ()):
+    """Records in the current stage the size of the produced arrays,
+    and the number of bytes that were copied, i.e. that do not share memory with the sources
+
+    Args:
+        arrays: Arrays produced by the stage
+        sources: Arrays the stage received
+
+    """
+    tracer = _active_tracer
+    if tracer is None:
+        return
+
+    sources = [s for s in sources if isinstance(s, np.ndarray)]
+    size = 0
+    nbytes = 0
+    copied = 0
+    for a in arrays:
+        if not isinstance(a, np.ndarray):
+            continue
+        size += a.size
+        nbytes += a.nbytes
+        if not any(np.may_share_memory(a, s) for s in sources):
+            copied += a.nbytes
+
+    tracer.annotate(size=size, nbytes=nbytes, copied_bytes=copied)
+
+
+def flag_copy(where: str, src, dst):
+    """In memory mode, flags dst if it is a copy of src instead of a view
+
+    Args:
+        where: Name of the function that produced dst
+        src: Original data
+        dst: Data derived from src
+
+    """
+    tracer = _active_tracer
+    if tracer is None or not tracer.memory or not isinstance(dst, np.ndarray):
+        return
+
+    if isinstance(src, np.ndarray) and np.may_share_memory(src, dst):
+        return
+
+    tracer.flagCopy(where, dst.nbytes)
+
+
+def _enable_from_env(json_path: str, memory: bool = False):
+    global _active_tracer
+
+    tracer = Tracer(name="SOYUT_TRACE", memory=memory)
+    if memory:
+        tracemalloc.start()
+    _active_tracer = tracer
+    json_path = Path(json_path)
+    chrome_path = json_path.with_name(json_path.stem + "_chrome.json")
+
+    def _dump():
+        tracer.write(json_path=json_path, chrome_path=chrome_path)
+        tracer.log_summary()
+
+    atexit.register(_dump)
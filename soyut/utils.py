@@ -2,6 +2,8 @@
 
 """
 import typing as T
+import threading
+from collections import OrderedDict
 
 import numpy as np
 import numpy.typing as npt
@@ -16,7 +18,18 @@ else:
     ABFigure = "soyut.frontend.BFigure.ABFigure"
     FigureSpec = "soyut.frontend.GraphicSpec.FigureSpec"
 
-__all__ = ["ComplexArr", "FloatArr", "IntArr", "getUnitAbbrev", "format_parameter"]
+__all__ = [
+    "ComplexArr",
+    "FloatArr",
+    "IntArr",
+    "getUnitAbbrev",
+    "format_parameter",
+    "insert_gaps",
+    "decimate_minmax",
+    "simplify_rdp",
+    "TrigCache",
+    "trig_cache",
+]
 
 ComplexArr = npt.NDArray[np.complex128]
 FloatArr = npt.NDArray[np.float64]
@@ -26,7 +39,8 @@ IntArr = npt.NDArray[np.int64]
 def getUnitAbbrev(
     samp: float, unit: str, force_mult: int = None
 ) -> T.Tuple[float, float, str, str]:
-    """Given a scale factor, gives the prefix for the unit to display
+    """Given a scale factor, gives the prefix for the unit to display.
+    The logarithmic units (dB, dBm, ...) are never prefixed
 
     Args:
         samp: Sample
@@ -52,6 +66,8 @@ def getUnitAbbrev(
         (1.5, 0.001, 'm', 's')
         >>> getUnitAbbrev(90, 's')
         (1.5, 60, '', 'min')
+        >>> getUnitAbbrev(-1200.0, 'dB')
+        (-1200.0, 1, '', 'dB')
 
     """
     d = {
@@ -77,6 +93,9 @@ def getUnitAbbrev(
         86400 * 30: "month",
         860400 * 30 * 12: "yr",
     }
+    if force_mult is None and unit.startswith("dB"):
+        force_mult = 1
+
     if unit == "s" and samp >= 1:
         if force_mult is None:
             for mult in reversed(d_time.keys()):
@@ -137,3 +156,303 @@ def format_parameter(
     scaled_samp, mult, lbl, unit = getUnitAbbrev(samp, unit)
     txt = f"{scaled_samp:.3g}{space}{lbl}{unit}"
     return txt, mult
+
+
+def insert_gaps(
+    x: FloatArr, y: FloatArr, max_dt: float = None, mask: npt.NDArray[np.bool_] = None
+) -> T.Tuple[FloatArr, FloatArr]:
+    """Breaks a line where the data are missing, by inserting NaN values.
+    A single line can then represent many segments, as the backends do not draw across NaN
+
+    Args:
+        x: X coordinates, increasing (typically time)
+        y: Y coordinates
+        max_dt: Largest step between two consecutive X values of a same segment.
+            A point (x=mid step, y=NaN) is inserted in each larger step
+        mask: Validity of the samples. The invalid samples are replaced by NaN
+
+    Returns:
+        The X coordinates, with the inserted points
+        The Y coordinates, with NaN at the breaks
+
+    Examples:
+        >>> x, y = insert_gaps(np.array([0.0, 1.0, 5.0, 6.0]), np.arange(4.0), max_dt=2)
+        >>> x.tolist()
+        [0.0, 1.0, 3.0, 5.0, 6.0]
+        >>> y.tolist()
+        [0.0, 1.0, nan, 2.0, 3.0]
+
+    """
+    if mask is not None:
+        y = np.where(mask, y, np.nan)
+
+    if max_dt is not None and len(x) > 1:
+        dx = np.diff(x)
+        breaks = np.flatnonzero(dx > max_dt) + 1
+        if len(breaks) > 0:
+            x = np.insert(x, breaks, x[breaks - 1] + 0.5 * dx[breaks - 1])
+            y = np.insert(np.asarray(y, dtype=np.float64), breaks, np.nan)
+
+    return x, y
+
+
+def decimate_minmax(x: FloatArr, y: FloatArr, nbins: int) -> T.Tuple[FloatArr, FloatArr]:
+    """Reduces the number of points of a line, keeping its visual envelope:
+    the X range is split into nbins bins (typically, one per pixel column),
+    and only the first minimum and the first maximum of each bin are kept, in their original order.
+
+    The NaN values of Y are breaks in the line: a bin never spans a break,
+    and the breaks are kept in the result, so that the segments are not joined
+
+    Args:
+        x: X coordinates
+        y: Y coordinates
+        nbins: Number of bins. The result has at most 2 * nbins points, plus the breaks
+
+    Returns:
+        The decimated X coordinates
+        The decimated Y coordinates
+
+    Examples:
+        >>> x = np.arange(8.0)
+        >>> y = np.array([0.0, 3.0, 1.0, 2.0, np.nan, 5.0, 4.0, 6.0])
+        >>> xd, yd = decimate_minmax(x, y, nbins=1)
+        >>> yd.tolist()
+        [0.0, 3.0, nan, 4.0, 6.0]
+
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(y) <= 2 * nbins:
+        return x, y
+
+    valid = np.isfinite(x) & np.isfinite(y)
+    vi = np.flatnonzero(valid)
+    if len(vi) == 0:
+        return x[:0], y[:0]
+
+    # Each invalid point starts a new segment
+    seg = np.cumsum(~valid)[vi]
+    xv = x[vi]
+    yv = y[vi]
+
+    xmin = xv.min()
+    xmax = xv.max()
+    if xmax > xmin:
+        bins = ((xv - xmin) * (nbins / (xmax - xmin))).astype(np.int64)
+        np.minimum(bins, nbins - 1, out=bins)
+    else:
+        bins = np.zeros(len(xv), dtype=np.int64)
+
+    # Groups of consecutive points in the same bin and the same segment
+    new = np.empty(len(vi), dtype=bool)
+    new[0] = True
+    new[1:] = (bins[1:] != bins[:-1]) | (seg[1:] != seg[:-1])
+    starts = np.flatnonzero(new)
+    gid = np.cumsum(new) - 1
+
+    pos = np.arange(len(yv))
+    gmin = np.minimum.reduceat(yv, starts)
+    gmax = np.maximum.reduceat(yv, starts)
+    imin = np.minimum.reduceat(np.where(yv == gmin[gid], pos, len(yv)), starts)
+    imax = np.minimum.reduceat(np.where(yv == gmax[gid], pos, len(yv)), starts)
+
+    keep = np.sort(np.stack([imin, imax], axis=1), axis=1).ravel()
+    dup = np.zeros(len(keep), dtype=bool)
+    dup[1::2] = keep[1::2] == keep[0::2]
+    keep = keep[~dup]
+
+    xo = xv[keep]
+    yo = yv[keep]
+    segk = seg[keep]
+    breaks = np.flatnonzero(segk[1:] != segk[:-1]) + 1
+    if len(breaks) > 0:
+        xo = np.insert(xo, breaks, 0.5 * (xo[breaks - 1] + xo[breaks]))
+        yo = np.insert(yo, breaks, np.nan)
+
+    return xo, yo
+
+
+def simplify_rdp(x: FloatArr, y: FloatArr, tolerance: float) -> IntArr:
+    """Simplifies a line with the Ramer-Douglas-Peucker algorithm: a point is dropped if
+    it is closer than tolerance to the chord joining the points kept around it.
+    The pending chords are handled with an explicit stack, and the distances of all the points
+    of a chord are computed at once with numpy.
+
+    The NaN values are breaks in the line: they are kept, and each segment between two breaks
+    is simplified separately
+
+    Args:
+        x: X coordinates, typically in pixels
+        y: Y coordinates, in the same unit as x
+        tolerance: Largest distance between the line and its simplification
+
+    Returns:
+        The sorted indices of the points kept
+
+    Examples:
+        >>> x = np.arange(6.0)
+        >>> y = np.array([0.0, 0.1, 0.0, 2.0, np.nan, 1.0])
+        >>> simplify_rdp(x, y, tolerance=0.5).tolist()
+        [0, 2, 3, 4, 5]
+
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    valid = np.isfinite(x) & np.isfinite(y)
+    keep = ~valid
+
+    # First and last point of each segment between breaks
+    edges = np.diff(np.concatenate([[False], valid, [False]]).astype(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    stops = np.flatnonzero(edges == -1) - 1
+    keep[starts] = True
+    keep[stops] = True
+
+    stack = [(i0, i1) for i0, i1 in zip(starts, stops) if i1 - i0 > 1]
+    while stack:
+        i0, i1 = stack.pop()
+        dx = x[i1] - x[i0]
+        dy = y[i1] - y[i0]
+        xi = x[i0 + 1 : i1] - x[i0]
+        yi = y[i0 + 1 : i1] - y[i0]
+        norm = np.hypot(dx, dy)
+        if norm > 0:
+            dist = np.abs(dx * yi - dy * xi) / norm
+        else:
+            dist = np.hypot(xi, yi)
+
+        k = int(np.argmax(dist))
+        if dist[k] > tolerance:
+            ik = i0 + 1 + k
+            keep[ik] = True
+            if ik - i0 > 1:
+                stack.append((i0, ik))
+            if i1 - ik > 1:
+                stack.append((ik, i1))
+
+    return np.flatnonzero(keep)
+
+
+class TrigCache(object):
+    """LRU cache of the cosine and sine tables of the angle variables.
+    Useful when the same angle grid is re-plotted many times, like an antenna pattern.
+
+    An entry is identified by the variable (a `soyut.frontend.GPlottable.GVariable`) and
+    the unit conversion factor, and is valid as long as the version of the variable is unchanged.
+    Only the stable data of a variable shall be cached: the arrays derived at each rendering
+    (windows, lines with breaks, decimated lines) get their tables from `TrigCache.tables`.
+    The cache keeps the variables alive: the size of its tables is bounded by *maxbytes*.
+    The least recently used entries are evicted first, and the tables too large for the cache
+    are not cached.
+
+    Args:
+        maxsize: Maximum number of entries kept in the cache
+        maxbytes: Maximum size of the cached tables, in bytes
+
+    Examples:
+        >>> from soyut.frontend.GPlottable import GVariable
+        >>> cache = TrigCache()
+        >>> az = GVariable(data=np.array([0.0, 90.0, 180.0]), unit="deg")
+        >>> c, s = cache.get(az, factor=np.pi / 180)
+        >>> np.round(s, 3).tolist()
+        [0.0, 1.0, 0.0]
+        >>> cache.get(az, factor=np.pi / 180)[0] is c
+        True
+        >>> cache.hits, cache.misses, cache.nbytes
+        (1, 1, 48)
+
+    """
+
+    __slots__ = ["maxsize", "maxbytes", "nbytes", "hits", "misses", "_tables", "_lock"]
+
+    def __init__(self, maxsize: int = 16, maxbytes: int = 64 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        #: Size of the cached tables, in bytes
+        self.nbytes = 0
+        #: Number of calls to `TrigCache.get` that found their tables in the cache
+        self.hits = 0
+        #: Number of calls to `TrigCache.get` that computed their tables
+        self.misses = 0
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def tables(angle: FloatArr, factor: float = 1.0) -> T.Tuple[FloatArr, FloatArr]:
+        """Computes the cosine and sine of factor * angle, without cache
+
+        Args:
+            angle: Array of angles
+            factor: Conversion factor from the unit of angle to radians
+
+        Returns:
+            The cosine table
+            The sine table
+
+        """
+        buf = np.multiply(angle, factor, dtype=np.float64)
+        c = np.cos(buf)
+        s = np.sin(buf, out=buf)
+        return c, s
+
+    def _pop(self, key):
+        _, _, c, s = self._tables.pop(key)
+        self.nbytes -= c.nbytes + s.nbytes
+
+    def get(self, var, factor: float = 1.0) -> T.Tuple[FloatArr, FloatArr]:
+        """Returns the cosine and sine of factor * var.float_data
+
+        Args:
+            var: The angle variable, a `soyut.frontend.GPlottable.GVariable`
+            factor: Conversion factor from the unit of the variable to radians
+
+        Returns:
+            The cosine table
+            The sine table
+
+        """
+        key = (id(var), factor)
+        with self._lock:
+            entry = self._tables.get(key, None)
+            if entry is not None and entry[0] is var and entry[1] == var.version:
+                self._tables.move_to_end(key)
+                self.hits += 1
+                return entry[2], entry[3]
+            self.misses += 1
+
+        version = var.version
+        c, s = self.tables(var.float_data, factor)
+
+        size = c.nbytes + s.nbytes
+        with self._lock:
+            if key in self._tables:
+                self._pop(key)
+            if size <= self.maxbytes:
+                self._tables[key] = (var, version, c, s)
+                self.nbytes += size
+            while len(self._tables) > self.maxsize or self.nbytes > self.maxbytes:
+                self._pop(next(iter(self._tables)))
+
+        return c, s
+
+    def discard(self, var):
+        """Removes the tables of a variable from the cache
+
+        Args:
+            var: The angle variable
+
+        """
+        with self._lock:
+            for key in [k for k, v in self._tables.items() if v[0] is var]:
+                self._pop(key)
+
+    def clear(self):
+        """Empties the cache"""
+        with self._lock:
+            self._tables.clear()
+            self.nbytes = 0
+
+
+#: Cache shared by all the polar plottables
+trig_cache = TrigCache()
@@ -0,0 +1,52 @@
+import shutil
+
+import numpy as np
+import pytest
+from matplotlib.image import imread
+
+from soyut.frontend.BFigure import BFigure
+from soyut.backend.MplAnimation import MplAnimation, _FrameRenderer
+
+
+T = np.linspace(0, 2 * np.pi, 200)
+
+
+def make_figure():
+    fig = BFigure("Track")
+    gs = fig.add_gridspec(nrows=1, ncols=1)
+    axe = fig.add_axe("Track", spec=gs[0, 0])
+    axe.plot(({"data": T, "name": "Lon", "unit": "rad"}, {"data": np.sin(T), "name": "Lat"}))
+    axe.set_ylim(-1.5, 1.5)
+    return fig
+
+
+def update(fig, frame):
+    axe = fig.list_axes[0]
+    axe.list_plottables[0].data_source.yvar.data = np.sin(T + 0.1 * frame)
+    if frame == 5:
+        axe.set_ylim(-2, 2)
+
+
+def test_blit_matches_full_redraw():
+    blit = _FrameRenderer(MplAnimation(make_figure(), update, nframes=8, blit=True))
+    full = _FrameRenderer(MplAnimation(make_figure(), update, nframes=8, blit=False))
+    for frame in range(8):
+        assert np.array_equal(blit.render(frame), full.render(frame))
+
+
+def test_image_sequence(tmp_path):
+    pattern = str(tmp_path / "seq" / "frame_{:03d}.png")
+    MplAnimation(make_figure(), update, nframes=6).save(pattern)
+    pattern2 = str(tmp_path / "par" / "frame_{:03d}.png")
+    MplAnimation(make_figure(), update, nframes=6).save(pattern2, workers=2)
+
+    for frame in range(6):
+        img = imread(pattern.format(frame))
+        assert np.array_equal(img, imread(pattern2.format(frame)))
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_video(tmp_path):
+    path = tmp_path / "anim.mp4"
+    MplAnimation(make_figure(), update, nframes=10).save(path, workers=2)
+    assert path.stat().st_size > 0
@@ -0,0 +1,96 @@
+import io
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from numpy import pi
+
+from soyut.frontend.BFigure import BFigure
+from soyut.frontend.GAnnotations import GAnnotationLayer, place_labels
+from soyut.frontend.GraphicSpec import Annotation, AxeProjection
+from soyut.backend.MplRenderer import TextCollection, simple_mpl_renderer
+from soyut.backend.PlotlyRenderer import simple_plotly_renderer
+
+
+def _overlaps(left, bottom, widths, heights):
+    i, j = np.triu_indices(len(left), k=1)
+    return (
+        (left[i] < left[j] + widths[j])
+        & (left[j] < left[i] + widths[i])
+        & (bottom[i] < bottom[j] + heights[j])
+        & (bottom[j] < bottom[i] + heights[i])
+    )
+
+
+def test_place_labels():
+    rng = np.random.default_rng(seed=3)
+    px, py = rng.uniform(0, 500, size=(2, 2000))
+    widths = rng.uniform(10, 40, size=2000)
+    priority = rng.uniform(size=2000)
+
+    corner, left, bottom = place_labels(
+        px, py, widths, 10.0, order=np.argsort(-priority), bounds=(0, 400, 0, 500)
+    )
+    placed = corner >= 0
+    assert 50 < placed.sum() < 2000
+    assert not placed[px > 400].any()
+    assert not _overlaps(
+        left[placed], bottom[placed], widths[placed], np.full(2000, 10.0)[placed]
+    ).any()
+    # The label of highest priority is always placed
+    inside = np.flatnonzero(px <= 400)
+    assert placed[inside[np.argmax(priority[inside])]]
+
+
+def test_annotation_layer():
+    lon = np.linspace(-pi, pi, 500)
+    lat = np.zeros(500)
+    fig = BFigure("Stations")
+    gs = fig.add_gridspec(nrows=2, ncols=1)
+    axe = fig.add_axe("Map", spec=gs[0, 0], projection=AxeProjection.PLATECARREE)
+    layer = axe.annotate_many(lon, lat, [f"GS{i}" for i in range(500)], fontsize=6)
+    xd, yd = layer.make_points(axe)
+    assert xd[0] == -180.0
+
+    axe = fig.add_axe("Plot", spec=gs[1, 0])
+    axe.plot((np.arange(10.0), np.arange(10.0)))
+    axe.annotations.append(
+        GAnnotationLayer.from_annotations(
+            [Annotation((1.0, 1.0), "a"), Annotation((2.0, 2.0), "b")]
+        )
+    )
+
+    mfig = simple_mpl_renderer(fig, show=False)
+    (coll,) = [a for a in mfig.axes[0].artists if isinstance(a, TextCollection)]
+    mfig.savefig(io.BytesIO(), format="png")
+    # Stations along a line: many labels overlap, and are dropped
+    assert 10 < (coll.corner >= 0).sum() < 500
+
+    pfig = simple_plotly_renderer(fig, show=False)
+    texts = [t for t in pfig.data if t.mode == "text"]
+    assert len(texts) == 2
+    assert 10 < len(texts[0].text) < 500
+    assert list(texts[1].text) == ["a", "b"]
+
+
+def test_label_position():
+    fig = BFigure("Label")
+    gs = fig.add_gridspec(nrows=1, ncols=1)
+    axe = fig.add_axe("Axe", spec=gs[0, 0])
+    axe.plot((np.arange(10.0), np.arange(10.0)))
+    axe.annotate_many([2.0], [7.0], ["WWW"], fontsize=12, color="red")
+
+    mfig = simple_mpl_renderer(fig, show=False)
+    canvas = FigureCanvasAgg(mfig)
+    canvas.draw()
+    maxe = mfig.axes[0]
+    px, py = maxe.transData.transform((2.0, 7.0))
+
+    img = np.asarray(canvas.buffer_rgba())
+    red = (img[:, :, 0] > 200) & (img[:, :, 1] < 100) & (img[:, :, 2] < 100)
+    rows, cols = np.nonzero(red)
+    assert len(rows) > 0
+    # The label is above and right of its point, and rows go downwards
+    row = img.shape[0] - py
+    fontsize = 12 * mfig.dpi / 72
+    assert np.all(rows < row) and np.all(rows > row - 2 * fontsize)
+    assert np.all(cols > px) and np.all(cols < px + 4 * fontsize)
@@ -0,0 +1,75 @@
+import time
+import asyncio
+
+import numpy as np
+import pytest
+
+from soyut.frontend.BFigure import BFigure
+from soyut.backend.AsyncRenderer import AsyncRenderer, RenderQueueFull
+
+
+def _make_figure(title: str) -> BFigure:
+    x = np.linspace(0, 1, 1000)
+    fig = BFigure(title)
+    gs = fig.add_gridspec(nrows=1, ncols=1)
+    axe = fig.add_axe("Axe", spec=gs[0, 0])
+    axe.plot((x, np.sin(x)))
+    return fig
+
+
+def test_async_render(tmp_path):
+    async def main():
+        async with AsyncRenderer(max_workers=2) as renderer:
+            figs = [_make_figure(f"Figure {k}") for k in range(4)]
+            images = await asyncio.gather(*[renderer.render(fig, format="png") for fig in figs])
+            path = await renderer.export(figs[0], tmp_path / "fig.svg")
+        return images, path
+
+    images, path = asyncio.run(main())
+    assert all(img.startswith(b"\x89PNG") for img in images)
+    assert path.read_text().startswith("<?xml")
+
+
+def test_async_backpressure():
+    async def main():
+        renderer = AsyncRenderer(max_workers=1, max_pending=1, max_waiting=1)
+        slow = asyncio.ensure_future(renderer._submit(time.sleep, 0.3))
+        await asyncio.sleep(0.05)
+
+        # A request times out before getting a slot
+        with pytest.raises(asyncio.TimeoutError):
+            await renderer._submit(time.sleep, 0.0, timeout=0.01)
+        assert renderer.waiting == 0
+
+        waiting = asyncio.ensure_future(renderer._submit(time.sleep, 0.0))
+        await asyncio.sleep(0.05)
+        assert renderer.waiting == 1
+
+        with pytest.raises(RenderQueueFull):
+            await renderer._submit(time.sleep, 0.0)
+
+        await slow
+        await waiting
+        renderer.close()
+
+    asyncio.run(main())
+
+
+def test_async_burst_timeout():
+    async def main():
+        async with AsyncRenderer(max_workers=1, max_pending=1, max_waiting=2) as renderer:
+            res = await asyncio.gather(
+                *[renderer._submit(time.sleep, 0.05, timeout=10) for _ in range(10)],
+                return_exceptions=True,
+            )
+            assert renderer.waiting == 0
+        return res
+
+    res = asyncio.run(main())
+    # One request runs, two wait for the slot, and the other ones are rejected
+    assert sum(isinstance(r, RenderQueueFull) for r in res) == 7
+    assert res[:3] == [None] * 3
+
+
+if __name__ == "__main__":
+    test_async_backpressure()
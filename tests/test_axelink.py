@@ -0,0 +1,44 @@
+import numpy as np
+
+from soyut.frontend.BFigure import BFigure
+
+
+def test_axe_link():
+    fig = BFigure("Dashboard")
+    gs = fig.add_gridspec(nrows=4, ncols=2)
+
+    root = fig.add_axe("Root", spec=gs[0, 0])
+    root.set_ylim(-1, 1)
+    chain = [root]
+    for k in range(1, 4):
+        chain.append(fig.add_axe(f"Axe {k}", spec=gs[k, 0], sharex=chain[-1], sharey=root))
+
+    other = fig.add_axe("Other", spec=gs[0, 1])
+    other2 = fig.add_axe("Other 2", spec=gs[1, 1], sharex=other)
+    other.plot((np.array([-5.0, 2.0]), np.array([0.0, 1.0])))
+
+    # The Y limits are the one of the shared axe (not its X limits)
+    assert chain[-1].ybounds == (-1, 1)
+    assert chain[-1].xbounds == (None, None)
+
+    chain[2].set_xlim(0, 10)
+    assert all(axe.xbounds == (0, 10) for axe in chain)
+    assert len({id(axe.xlink.bounds) for axe in chain}) == 1
+
+    # Linking two groups
+    other2.sharex(chain[-1])
+    assert other.xbounds == (0, 10)
+    other.set_xlim(xmax=20)
+    assert root.xbounds == (0, 20)
+
+    # Data-driven limits of the whole group
+    chain[1].plot((np.array([1.0, 3.0]), np.array([0.0, 1.0])))
+    root.autoscale(axis="x")
+    assert root.get_xlim() == (-5.0, 3.0)
+    assert root.get_ylim() == (-1, 1)
+    chain[3].plot((np.array([7.0, 8.0]), np.array([0.0, 1.0])))
+    assert other2.get_xlim() == (-5.0, 8.0)
+
+
+if __name__ == "__main__":
+    test_axe_link()
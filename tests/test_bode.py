@@ -0,0 +1,75 @@
+import numpy as np
+from numpy import pi
+
+from soyut.frontend.BFigure import BFigure
+from soyut.backend.FigurePreparation import prepare_plottable
+from soyut.frontend.GraphicSpec import DSPLineType
+from soyut.frontend.GTransferFunction import GTransferFunction
+
+
+def test_bode():
+    # Batch of second order low-pass filters, with various damping ratios
+    w0 = 2 * pi * 10.0
+    zeta = np.array([0.1, 0.5, 1.0])
+    nsys = len(zeta)
+    num = np.zeros((nsys, 3))
+    num[:, 2] = w0**2
+    den = np.column_stack((np.ones(nsys), 2 * zeta * w0, np.full(nsys, w0**2)))
+    tf = GTransferFunction(num=num, den=den)
+
+    # Same systems, described by their poles
+    poles = np.column_stack(
+        (
+            -zeta * w0 + 1j * w0 * np.sqrt(1 - zeta**2 + 0j),
+            -zeta * w0 - 1j * w0 * np.sqrt(1 - zeta**2 + 0j),
+        )
+    )
+    tf_zpk = GTransferFunction.from_zpk(zeros=np.full((nsys, 1), np.nan), poles=poles, gain=w0**2)
+
+    freq, mag, phase = tf.bode(fmin=0.1, fmax=1e4, nfreq=200)
+    _, mag_zpk, phase_zpk = tf_zpk.bode(fmin=0.1, fmax=1e4, nfreq=200)
+    assert mag.shape == (nsys, 200)
+    assert np.allclose(mag, mag_zpk)
+    assert np.allclose(phase, phase_zpk)
+    # Unwrapped phase tends to -pi, without any jump
+    assert np.allclose(phase[:, -1], -pi, atol=1e-2)
+    assert np.all(np.abs(np.diff(phase, axis=-1)) < pi)
+
+    fig = BFigure("Bode")
+    gs = fig.add_gridspec(nrows=2, ncols=1)
+    axe_mag, axe_phase = fig.add_bode(tf, gs[0, 0], gs[1, 0], fmin=0.1, fmax=1e4, nfreq=200)
+    assert len(axe_mag.list_plottables) == len(axe_phase.list_plottables) == nsys
+
+    axe_mag.set_xlim(1, 100)
+    assert axe_phase.xbounds == (1, 100)
+
+    plottable = axe_phase.list_plottables[1]
+    assert plottable.line_type == DSPLineType.BODE_DIAG
+    xd, yd, _, xunit, _, yunit = plottable._make_mline(axe_phase)
+    # Only the samples within the X limits are kept, as a view of the frequencies
+    assert np.shares_memory(xd, freq)
+    assert xd[0] < 1 <= xd[1] and xd[-2] <= 100 < xd[-1]
+    assert (xunit, yunit) == ("Hz", "rad")
+    sl = slice(np.argmax(freq == xd[0]), np.argmax(freq == xd[-1]) + 1)
+    assert np.allclose(yd, phase[1][sl])
+
+
+def test_bode_db_unit():
+    # Fourth order low-pass filter: -160 dB at 1 kHz
+    w0 = 2 * pi * 10.0
+    poles = np.full((1, 4), -w0 + 0j)
+    tf = GTransferFunction.from_zpk(zeros=np.full((1, 1), np.nan), poles=poles, gain=w0**4)
+
+    fig = BFigure("Bode")
+    gs = fig.add_gridspec(nrows=2, ncols=1)
+    axe_mag, _ = fig.add_bode(tf, gs[0, 0], gs[1, 0], fmin=0.1, fmax=1e5, nfreq=200)
+    pline = prepare_plottable(axe_mag, axe_mag.list_plottables[0])
+    assert np.min(pline.yd) < -200
+    # Decibels are never prefixed, as kdB would be
+    assert pline.ymult == 1
+    assert pline.ylabel == "Magnitude\u00A0(dB)"
+
+
+if __name__ == "__main__":
+    test_bode()
+    test_bode_db_unit()
@@ -0,0 +1,43 @@
+import numpy as np
+
+from soyut.frontend.BFigure import BFigure
+from soyut.utils import decimate_minmax
+
+
+def test_gaps_and_mask():
+    t = np.concatenate([np.arange(0.0, 10.0), np.arange(20.0, 30.0), np.arange(35.0, 40.0)])
+    y = np.sin(t)
+    mask = np.ones(len(t), dtype=bool)
+    mask[3] = False
+    y[3] = 1e6
+
+    fig = BFigure("Gaps")
+    gs = fig.add_gridspec(nrows=1, ncols=1)
+    axe = fig.add_axe("Axe", spec=gs[0, 0])
+    p = axe.plot((t, y), max_dt=2.0, mask=mask)
+
+    xd, yd, *_ = p._make_mline(axe)
+    # 2 inserted breaks + 1 masked sample
+    assert len(xd) == len(t) + 2
+    assert np.isnan(yd).sum() == 3
+    assert np.all(np.diff(xd) > 0)
+
+    # The masked outlier is excluded from the statistics
+    xs, ys = p.getStats(axe)
+    assert ys.max <= 1.0
+
+
+def test_decimate_minmax():
+    rng = np.random.default_rng(seed=45)
+    x = np.arange(100_000.0)
+    y = rng.normal(size=len(x))
+    y[50_000:50_010] = np.nan
+
+    xd, yd = decimate_minmax(x, y, nbins=500)
+    assert len(xd) <= 2 * 500 + 2
+    assert np.nanmax(yd) == np.nanmax(y)
+    assert np.nanmin(yd) == np.nanmin(y)
+    assert np.all(np.diff(xd) > 0)
+    # The break is kept, and no bin joins the two segments
+    (ibreak,) = np.flatnonzero(np.isnan(yd))
+    assert xd[ibreak - 1] < 50_000 and xd[ibreak + 1] >= 50_010
@@ -0,0 +1,54 @@
+import pickle
+
+import numpy as np
+
+from soyut.frontend.BFigure import BFigure
+from soyut.frontend.GHistogram import GHistogram
+from soyut.frontend.GraphicSpec import DSPLineType
+
+
+def test_streaming_histogram():
+    rng = np.random.default_rng(seed=45)
+    x = rng.normal(loc=3.0, scale=2.0, size=100_000)
+    chunks = np.array_split(x, 7)
+
+    # Two workers, each with its own partial histogram
+    h1 = GHistogram.from_chunks(chunks[:3], vmin=-5, vmax=11, nbins=64)
+    h2 = GHistogram.from_chunks(chunks[3:], vmin=-5, vmax=11, nbins=64)
+    h = h1 + pickle.loads(pickle.dumps(h2))
+
+    ref, edges = np.histogram(x, bins=64, range=(-5, 11))
+    assert np.all(h.counts == ref)
+    assert np.allclose(h.edges, edges)
+    assert h.underflow == np.sum(x < -5)
+    assert h.overflow == np.sum(x > 11)
+    assert h.count == len(x)
+    assert h.min == x.min()
+    assert h.max == x.max()
+    assert np.isclose(h.mean, np.mean(x))
+    assert np.isclose(h.var, np.var(x))
+
+
+def test_log_histogram():
+    rng = np.random.default_rng(seed=45)
+    x = 10 ** rng.uniform(low=-1, high=4, size=10_000)
+
+    h = GHistogram(vmin=1, vmax=1000, nbins=30, log=True)
+    h.update(x)
+
+    ref, _ = np.histogram(x, bins=np.logspace(0, 3, 31))
+    assert np.sum(np.abs(h.counts - ref)) <= 2
+    assert h.underflow + h.overflow + h.counts.sum() == len(x)
+
+    fig = BFigure("Histogram")
+    gs = fig.add_gridspec(nrows=1, ncols=1)
+    axe = fig.add_axe("Samples", spec=gs[0, 0])
+    plottable = axe.hist(h, name="samples")
+
+    assert plottable.line_type == DSPLineType.HISTOGRAM
+    xd, yd, _, _, _, _ = plottable._make_mline(axe)
+    assert len(xd) == len(yd) == 30
+
+
+if __name__ == "__main__":
+    test_streaming_histogram()
@@ -0,0 +1,74 @@
+import json
+
+import numpy as np
+
+from soyut.frontend.BFigure import BFigure
+from soyut.backend.MplRenderer import simple_mpl_renderer
+from soyut.instrumentation import trace
+
+
+def test_trace(tmp_path):
+    x = np.arange(1000.0)
+
+    fig = BFigure("Traced")
+    gs = fig.add_gridspec(nrows=2, ncols=1)
+    axe = fig.add_axe("Axe 1", spec=gs[0, 0])
+    axe.plot((x, np.sin(x)), name="sin")
+    axe = fig.add_axe("Axe 2", spec=gs[1, 0])
+    axe.plot((x, np.cos(x)), name="cos")
+
+    json_path = tmp_path / "trace.json"
+    chrome_path = tmp_path / "trace_chrome.json"
+    with trace(json_path=json_path, chrome_path=chrome_path) as tracer:
+        simple_mpl_renderer(fig, show=False, path=tmp_path / "fig.png", workers=1)
+
+    names = [rec["name"] for rec in tracer.records]
+    for name in ("render", "prepare", "axe", "make_mline", "unit_scaling", "artist", "write"):
+        assert name in names
+
+    data = json.loads(json_path.read_text())
+    mline = [s for s in data["stages"] if s["name"] == "make_mline"]
+    assert [s["args"]["plottable"] for s in mline] == ["sin", "cos"]
+    assert mline[0]["parent"] == "prepare"
+    # make_mline returns views of the GVariable data
+    assert mline[0]["args"]["copied_bytes"] == 0
+    # Only X needs a multiplier (k), and X is shared by both plottables,
+    # so it is copied once by the unit scaling
+    scaling = [s for s in data["summary"] if s["name"] == "unit_scaling"][0]
+    assert scaling["copied_bytes"] == x.nbytes
+
+    events = json.loads(chrome_path.read_text())["traceEvents"]
+    assert all(ev["ph"] == "X" for ev in events)
+    assert len(events) == len(tracer.records)
+
+
+def test_memory_trace(tmp_path):
+    t = np.arange(100_000.0)
+    y = np.sin(t) * 1e-3
+
+    fig = BFigure("Memory")
+    gs = fig.add_gridspec(nrows=1, ncols=1)
+    axe = fig.add_axe("Axe", spec=gs[0, 0])
+
+    json_path = tmp_path / "trace.json"
+    with trace(json_path=json_path, memory=True) as tracer:
+        axe.plot((t, y))
+        simple_mpl_renderer(fig, show=False)
+
+    data = json.loads(json_path.read_text())
+    # The tuple of arrays is copied in GVariable.from_serie
+    wheres = [c["where"] for c in data["copies"]]
+    assert wheres.count("GVariable.from_serie") == 2
+    # The Y values need a multiplier, hence a copy
+    assert "unit_scaling" in wheres
+    assert "GPlottable.make_line" not in wheres
+    # Peak memory of the figure, at least the scaled copy of y
+    assert data["figures_peak_bytes"]["Memory"] >= y.nbytes
+    assert tracer.records[-1]["args"]["mem_peak_bytes"] >= y.nbytes
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+
+    test_trace(pathlib.Path(tempfile.mkdtemp()))
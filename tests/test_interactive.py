@@ -0,0 +1,44 @@
+import numpy as np
+
+from soyut.frontend.BFigure import BFigure
+from soyut.backend.MplInteractive import interactive_mpl_renderer
+
+
+def test_resampling():
+    t = np.linspace(0, 100, 1_000_001)
+    fig = BFigure("Interactive")
+    gs = fig.add_gridspec(nrows=1, ncols=1)
+    axe = fig.add_axe("Axe", spec=gs[0, 0])
+    axe.plot(({"data": t, "name": "x", "unit": "m"}, np.sin(t)))
+
+    res = interactive_mpl_renderer(fig, show=False, points_per_pixel=2)
+    maxe = res.maxes[0]
+    (line,) = res.artists[0]
+    npoints = 2 * int(maxe.bbox.width)
+    # The first drawing is decimated at the resolution of the axe
+    assert len(line.get_xdata()) <= npoints + 2
+    assert maxe.get_xlim()[1] >= 100
+
+    # Zoom: the window is resampled once the pending updates are flushed
+    maxe.set_xlim(10, 11)
+    assert len(res._pending) == 1
+    res.flush()
+    xd = line.get_xdata()
+    assert xd[0] < 10 and xd[-1] > 11
+    assert np.nanmax(np.diff(xd)) < 1 / npoints * 4
+    assert len(res._futures) == 0
+
+    # A failed resampling is dropped, and the previous data stay displayed
+    plottable = fig.list_axes[0].list_plottables[0]
+    plottable.kwargs["transform"] = lambda y: 1 / 0
+    maxe.set_xlim(20, 21)
+    res.flush()
+    assert len(res._futures) == 0
+    assert np.array_equal(line.get_xdata(), xd)
+
+    del plottable.kwargs["transform"]
+    maxe.set_xlim(30, 31)
+    res.flush()
+    assert line.get_xdata()[0] > 29
+
+    res.close()
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from soyut.frontend.BFigure import BFigure
+from soyut.frontend.GPlottable import GPlottable, GVariable
+from soyut.backend.FigurePreparation import prepare_figure
+
+
+def test_interning():
+    t = np.arange(10_000.0)
+    df = pd.DataFrame({"t": t, "a": np.sin(t), "b": np.cos(t)})
+    tdesc = {"data": t, "name": "Time", "unit": "s"}
+
+    fig = BFigure("Shared")
+    gs = fig.add_gridspec(nrows=3, ncols=1)
+    axe0 = fig.add_axe("Arrays", spec=gs[0, 0])
+    p1 = axe0.plot((tdesc, np.sin(t)))
+    p2 = axe0.plot((tdesc, np.cos(t)))
+    axe1 = fig.add_axe("DataFrame", spec=gs[1, 0])
+    q1 = axe1.plot((df, "t", "a"))
+    q2 = axe1.plot((df, "t", "b"))
+    axe2 = fig.add_axe("GPlottable", spec=gs[2, 0])
+    gp = GPlottable(name="gp", xvar=p1.data_source.xvar, yvar=GVariable(data=t))
+    r = axe2.plot(gp)
+
+    assert p1.data_source.xvar is p2.data_source.xvar
+    assert q1.data_source.xvar is q2.data_source.xvar
+    assert r.data_source is gp and r.name == "gp"
+    # 2 descriptions of t, 2 Y arrays, 3 DataFrame columns
+    assert len(fig.variables) == 6
+
+    # The shared X axis is scaled once for all the plottables (1e4 s -> ks)
+    (l1, l2), (m1, m2), (n1,) = prepare_figure(fig, workers=1)
+    assert l1.xd is l2.xd is n1.xd
+    assert m1.xd is m2.xd
+
+
+def test_modified_in_place():
+    t = np.arange(100.0)
+    y = np.zeros(100)
+
+    fig = BFigure("In place")
+    gs = fig.add_gridspec(nrows=1, ncols=1)
+    axe = fig.add_axe("Axe", spec=gs[0, 0])
+    p1 = axe.plot((t, y))
+    y[:] = 1
+    # The variable built from y is invalidated, so that y is copied again
+    p1.data_source.yvar.invalidate()
+    p2 = axe.plot((t, y))
+
+    assert p1.data_source.xvar is p2.data_source.xvar
+    assert p1.data_source.yvar is not p2.data_source.yvar
+    ((l1, l2),) = prepare_figure(fig, workers=1)
+    assert np.all(l1.yd == 0)
+    assert np.all(l2.yd == 1)
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from matplotlib.collections import LineCollection
+
+from soyut.frontend.BFigure import BFigure
+from soyut.frontend.GraphicSpec import DSPLineType
+from soyut.backend.MplRenderer import simple_mpl_renderer
+from soyut.backend.PlotlyRenderer import simple_plotly_renderer
+
+
+def test_multiline():
+    t = np.linspace(0, 1, 1000)
+    channels = np.sin(np.arange(50)[:, None] * 2 * np.pi * t) * 1e-3  # (nlines, nsamples)
+    df = pd.DataFrame({"t": t, "a": np.cos(t), "b": np.sin(t)})
+
+    fig = BFigure("Channels")
+    gs = fig.add_gridspec(nrows=2, ncols=1)
+    axe = fig.add_axe("Array", spec=gs[0, 0])
+    p = axe.plot_lines(channels.T, x=t, units="V", name="ch")
+    axe = fig.add_axe("DataFrame", spec=gs[1, 0])
+    q = axe.plot_lines(df, x="t", units=["m", "s"])
+    # Same X array: same GVariable
+    assert axe.plot_lines(channels[:2].T, x=t).data_source.xvar is p.data_source.xvar
+
+    assert p.line_type == DSPLineType.MULTI
+    block = p.data_source
+    assert np.shares_memory(block.ydata, channels)
+    assert block.xvar.data is t
+    assert block.names[3] == "ch[3]"
+    assert q.data_source.names == ["a", "b"]
+    assert q.data_source.unit == "-"
+    assert np.shares_memory(q.data_source.ydata, df["a"].to_numpy())
+
+    xs, ys = p.getStats(axe)
+    assert ys.absmax == np.abs(channels).max()
+
+    mfig = simple_mpl_renderer(fig, show=False)
+    maxe = mfig.axes[0]
+    assert len(maxe.collections) == 1 and len(maxe.lines) == 0
+    lc = maxe.collections[0]
+    assert isinstance(lc, LineCollection)
+    assert len(lc.get_segments()) == 50
+    assert maxe.get_ylabel() == "ch (mV)"
+
+    pfig = simple_plotly_renderer(fig, show=False)
+    assert len(pfig.data) == 54
+    assert pfig.data[50].name == "a (m)"
+    assert pfig.data[0].legendgroup == "ch"
@@ -1,127 +1,54 @@
-import typing as T
-
 import numpy as np
-from matplotlib.figure import Figure as MFigure
-import plotly.graph_objects as go
 
-from soyut.utils import getUnitAbbrev
-from soyut.frontend.BAxe import ABaxe
 from soyut.frontend.BFigure import BFigure
-from soyut.frontend.BLayout import BGridSpec
-
-
-def simple_mpl_renderer(fig: BFigure) -> MFigure:
-    from matplotlib import pyplot as plt
-
-    mfig = plt.figure()
-    mfig.suptitle(fig.title)
-    mgs = mfig.add_gridspec(nrows=fig.grid_spec.nrows, ncols=fig.grid_spec.ncols)
-
-    for axe in fig.list_axes:
-        mge = mgs[axe.spec.coord]
-        maxe = mfig.add_subplot(mge)
-        maxe.set_title(axe.title)
-        maxe.grid(True)
-
-        for plottable in axe.list_plottables:
-            (
-                xd,
-                yd,
-                name_of_x_var,
-                unit_of_x_var,
-                name_of_y_var,
-                unit_of_y_var,
-            ) = plottable._make_mline(axe)
-
-            _, xmult, xlbl, xunit = getUnitAbbrev(np.max(np.abs(xd)), unit_of_x_var)
-            _, ymult, ylbl, yunit = getUnitAbbrev(np.max(np.abs(yd)), unit_of_y_var)
-            xlabel = f"{name_of_x_var}\u00A0({xlbl}{xunit})"
-            ylabel = f"{name_of_y_var}\u00A0({ylbl}{yunit})"
-
-            maxe.plot(xd / xmult, yd / ymult)
-
-            maxe.set_xlabel(xlabel)
-            maxe.set_ylabel(ylabel)
-
-    plt.show()
-
-
-def get_axe_coord(axe: ABaxe) -> T.Tuple[T.Tuple[int, int], T.Tuple[int, int]]:
-    ge = axe.spec
-    gs = axe.figure.grid_spec
-    sr, sc = ge.coord
-
-    if isinstance(sr, int):
-        start_r, stop_r = sr, sr
-    else:
-        start_r, stop_r, _ = sr.indices(gs.nrows)
-
-    if isinstance(sc, int):
-        start_c, stop_c = sc, sc
-    else:
-        start_c, stop_c, _ = sc.indices(gs.ncols)
-
-    return (start_r, stop_r), (start_c, stop_c)
+from soyut.backend.MplRenderer import simple_mpl_renderer
+from soyut.backend.PlotlyRenderer import simple_plotly_renderer
+from soyut.backend.FigurePreparation import prepare_figure
 
 
-def gridspec_to_plotly_specs(gs: BGridSpec):
-    # https://plotly.com/python/subplots/#multiple-custom-sized-subplots
-    axe: ABaxe
-    specs = [[None for _ in range(gs.ncols)] for _ in range(gs.nrows)]
-    for axe in gs.figure.list_axes:
-        (start_r, stop_r), (start_c, stop_c) = get_axe_coord(axe)
+def test_cached_stats():
+    x = np.arange(10.0)
+    y = np.sin(x)
+    y[3] = np.nan
 
-        if start_r == stop_r and start_c == stop_c:
-            axe_spec = {}
-        elif start_r < stop_r and start_c == stop_c:
-            axe_spec = {"rowspan": stop_r - start_r}
-        elif start_r == stop_r and start_c < stop_c:
-            axe_spec = {"colspan": stop_c - start_c}
-        elif start_r < stop_r and start_c < stop_c:
-            axe_spec = {"rowspan": stop_r - start_r, "colspan": stop_c - start_c}
+    fig = BFigure("Stats")
+    gs = fig.add_gridspec(nrows=1, ncols=1)
+    axe = fig.add_axe("Axe", spec=gs[0, 0])
+    plottable = axe.plot((x, y))
 
-        specs[start_r][start_c] = axe_spec
+    xstats, ystats = plottable.getStats(axe)
+    assert (xstats.min, xstats.max, xstats.absmax, xstats.nan_count) == (0.0, 9.0, 9.0, 0)
+    assert ystats.nan_count == 1
+    assert ystats.absmax == np.nanmax(np.abs(y))
+    assert plottable.getStats(axe)[1] is ystats
 
-    return specs
+    # In place modification
+    yvar = plottable.data_source.yvar
+    yvar.data *= 10
+    yvar.invalidate()
+    assert plottable.getStats(axe)[1].absmax == np.nanmax(np.abs(yvar.data))
+    assert axe.get_ylim() == (np.nanmin(yvar.data), np.nanmax(yvar.data))
 
 
-def simple_plotly_renderer(fig: BFigure) -> go.Figure:
-    from plotly.subplots import make_subplots
+def test_parallel_preparation():
+    rng = np.random.default_rng(seed=45)
 
-    specs = gridspec_to_plotly_specs(fig.grid_spec)
-    axes_titles = [axe.title for axe in fig.list_axes]
-    pfig = make_subplots(
-        rows=fig.grid_spec.nrows, cols=fig.grid_spec.ncols, specs=specs, subplot_titles=axes_titles
-    )
-    pfig.update_layout(title_text=fig.title)
+    fig = BFigure("Parallel")
+    gs = fig.add_gridspec(nrows=4, ncols=4)
+    for k in range(16):
+        axe = fig.add_axe(f"Axe {k}", spec=gs[k // 4, k % 4])
+        for _ in range(3):
+            axe.plot((np.arange(10_000.0), rng.normal(size=10_000) * 10.0**-k))
 
-    for i, axe in enumerate(fig.list_axes):
-        (start_r, stop_r), (start_c, stop_c) = get_axe_coord(axe)
-        for plottable in axe.list_plottables:
-            (
-                xd,
-                yd,
-                name_of_x_var,
-                unit_of_x_var,
-                name_of_y_var,
-                unit_of_y_var,
-            ) = plottable._make_mline(axe)
+    sequential = prepare_figure(fig, workers=1)
+    parallel = prepare_figure(fig, workers=8)
 
-            _, xmult, xlbl, xunit = getUnitAbbrev(np.max(np.abs(xd)), unit_of_x_var)
-            _, ymult, ylbl, yunit = getUnitAbbrev(np.max(np.abs(yd)), unit_of_y_var)
-            xlabel = f"{name_of_x_var}\u00A0({xlbl}{xunit})"
-            ylabel = f"{name_of_y_var}\u00A0({ylbl}{yunit})"
-
-            pfig.add_trace(
-                go.Scatter(x=xd / xmult, y=yd / ymult, name=plottable.name),
-                row=start_r + 1,
-                col=start_c + 1,
-            )
-
-        pfig["layout"][f"xaxis{i+1}"]["title"] = xlabel
-        pfig["layout"][f"yaxis{i+1}"]["title"] = ylabel
-
-    pfig.show()
+    assert len(parallel) == 16
+    for lines_s, lines_p, axe in zip(sequential, parallel, fig.list_axes):
+        assert [line.plottable for line in lines_p] == axe.list_plottables
+        for ls, lp in zip(lines_s, lines_p):
+            assert np.array_equal(ls.yd, lp.yd)
+            assert (ls.ymult, ls.ylabel) == (lp.ymult, lp.ylabel)
 
 
 def test_generic_plot():
@@ -149,10 +76,11 @@ def test_generic_plot():
     axe = fig.add_axe("Titre axe 6", spec=gs[4, 1])
     axe.plot((x, y))
 
-    mfig = simple_mpl_renderer(fig)
-    # mfig = simple_plotly_renderer(fig)
+    mfig = simple_mpl_renderer(fig, show=False)
+    pfig = simple_plotly_renderer(fig, show=False)
 
-    return mfig
+    assert len(mfig.axes) == 6
+    assert len(pfig.data) == 6
 
 
 if __name__ == "__main__":
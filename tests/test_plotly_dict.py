@@ -0,0 +1,114 @@
+import json
+import base64
+
+import numpy as np
+import pytest
+
+from soyut.frontend.BFigure import BFigure
+from soyut.backend.AsyncRenderer import render_to_bytes
+from soyut.backend.PlotlyRenderer import simple_plotly_renderer
+from soyut.backend import PlotlyDictRenderer
+from soyut.backend.PlotlyDictRenderer import dict_plotly_renderer, encode_array, figure_html
+
+
+def _make_figure() -> BFigure:
+    t = np.linspace(0, 10, 500)
+    fig = BFigure("Dict")
+    gs = fig.add_gridspec(nrows=2, ncols=3)
+    axe = fig.add_axe("Line", spec=gs[:, 0])
+    axe.plot(({"data": t, "name": "Time", "unit": "s"}, {"data": np.sin(t), "name": "Y"}))
+    axe.annotate_many([1.0, 5.0], [0.0, 0.5], ["A", "B"])
+    axe = fig.add_axe("Block", spec=gs[0, 1:])
+    axe.plot_lines(np.column_stack([np.cos(t), np.sin(2 * t)]), x=t)
+    axe = fig.add_axe("Histogram", spec=gs[1, 2])
+    axe.hist(np.sin(t), vmin=-1, vmax=1, nbins=20)
+    return fig
+
+
+def _decode(v):
+    if isinstance(v, dict):
+        return np.frombuffer(base64.b64decode(v["bdata"]), dtype=np.dtype("<" + v["dtype"]))
+    return np.asarray(v)
+
+
+def test_same_figure_as_graph_objects():
+    fig = _make_figure()
+    ref = simple_plotly_renderer(fig, show=False).to_plotly_json()
+    fdict = dict_plotly_renderer(fig)
+
+    for key in ["xaxis", "xaxis2", "xaxis3", "yaxis", "yaxis2", "yaxis3"]:
+        assert fdict["layout"][key]["domain"] == pytest.approx(list(ref["layout"][key]["domain"]))
+        assert fdict["layout"][key]["anchor"] == ref["layout"][key]["anchor"]
+    assert [a["text"] for a in fdict["layout"]["annotations"]] == ["Line", "Block", "Histogram"]
+    assert [a["y"] for a in fdict["layout"]["annotations"]] == pytest.approx(
+        [a["y"] for a in ref["layout"]["annotations"]]
+    )
+
+    assert len(fdict["data"]) == len(ref["data"])
+    for trace, rtrace in zip(fdict["data"], ref["data"]):
+        assert trace["type"] == rtrace["type"]
+        assert trace.get("name", None) == rtrace.get("name", None)
+        assert np.allclose(_decode(trace["x"]), _decode(rtrace["x"]))
+        assert np.allclose(_decode(trace["y"]), _decode(rtrace["y"]))
+
+
+def test_html(tmp_path):
+    fig = _make_figure()
+    path = tmp_path / "fig.html"
+    dict_plotly_renderer(fig, path=path, simplify=0)
+    html = path.read_text()
+    assert html.count("<script") == 2
+    assert '"bdata"' in html
+
+    page = figure_html(dict_plotly_renderer(fig), include_plotlyjs="cdn")
+    assert "cdn.plot.ly" in page
+    assert len(page) < len(html) / 10
+
+    fig.title = "</script><script>alert(1)</script>"
+    page = figure_html(dict_plotly_renderer(fig), include_plotlyjs=False)
+    assert page.count("</script>") == 1
+    assert "alert(1)" in page
+
+    fjson = json.loads(render_to_bytes(fig, backend="plotly-dict", format="json"))
+    assert fjson["layout"]["template"]["layout"]
+    assert len(fjson["data"]) == 5
+
+
+def test_encode_array():
+    a = np.arange(10, dtype=np.int64)
+    assert encode_array(a)["dtype"] == "f8"
+    b = np.arange(10.0).astype(">f4")
+    assert np.array_equal(_decode(encode_array(b)), b)
+
+
+def test_old_plotlyjs(monkeypatch):
+    # plotly.js older than 2.28 does not read the binary arrays
+    monkeypatch.setattr(PlotlyDictRenderer, "_binary_arrays", lambda: False)
+    assert encode_array(np.arange(3.0)) == [0.0, 1.0, 2.0]
+    page = figure_html(dict_plotly_renderer(_make_figure()), include_plotlyjs=False)
+    assert '"bdata"' not in page
+
+
+def test_shared_x_written_once(tmp_path):
+    t = np.linspace(0, 10, 500)
+    fig = BFigure("Shared")
+    gs = fig.add_gridspec(nrows=1, ncols=1)
+    axe = fig.add_axe("Block", spec=gs[0, 0])
+    axe.plot_lines(np.column_stack([np.cos(t), np.sin(t), np.sin(2 * t)]), x=t)
+    axe.plot((t, np.cos(3 * t)))
+    axe.plot((t, np.cos(4 * t)))
+    xdata = encode_array(t)["bdata"]
+
+    # One X variable for the block (a view of t), one for the two plots (a copy of t)
+    fdict = dict_plotly_renderer(fig)
+    assert len({id(trace["x"]) for trace in fdict["data"]}) == 2
+    page = figure_html(fdict, include_plotlyjs=False)
+    assert page.count(xdata) == 2
+    assert page.count('{"$ref":"0"}') == 3
+    assert page.count('{"$ref":"1"}') == 2
+
+    path = tmp_path / "fig.html"
+    simple_plotly_renderer(fig, show=False, path=path)
+    html = path.read_text()
+    assert html.count(xdata) == 2
+    assert html.count("<script") == 2
@@ -0,0 +1,94 @@
+import numpy as np
+
+from soyut.frontend.BFigure import BFigure
+from soyut.frontend.GPlottable import GVariable
+from soyut.frontend.GraphicSpec import AxeProjection
+from soyut.utils import TrigCache, trig_cache
+
+
+def test_north_polar():
+    az = np.linspace(0, 360, 37)
+    elev = np.full_like(az, 30.0)
+
+    fig = BFigure("Antenna pattern")
+    gs = fig.add_gridspec(nrows=1, ncols=3)
+    axe = fig.add_axe("North", spec=gs[0, 0], projection=AxeProjection.NORTH_POLAR)
+    plottable = axe.plot(
+        (
+            {"data": az, "name": "Azimuth", "unit": "deg"},
+            {"data": elev, "name": "Elevation", "unit": "deg"},
+        ),
+        radial_offset=90.0,
+        radial_scale=-1.0,
+    )
+
+    xd, yd, _, xunit, _, yunit = plottable._make_mline(axe)
+    assert (xunit, yunit) == ("deg", "deg")
+    # Azimuth 90 deg is towards +X, with radius 90 - 30
+    assert np.allclose((xd[9], yd[9]), (60.0, 0.0))
+    assert np.allclose((xd[0], yd[0]), (0.0, 60.0))
+    assert np.allclose(np.hypot(xd, yd), 60.0)
+    assert np.all(elev == 30.0)
+
+    # The trigonometric tables are reused by another plot of the same angles
+    hits, misses = trig_cache.hits, trig_cache.misses
+    axe2 = fig.add_axe("North 2", spec=gs[0, 1], projection=AxeProjection.NORTH_POLAR)
+    plottable2 = axe2.plot(
+        (plottable.data_source.xvar, {"data": elev + 10.0, "name": "Elevation", "unit": "deg"}),
+        radial_offset=90.0,
+        radial_scale=-1.0,
+    )
+    xd2, _, _, _, _, _ = plottable2._make_mline(axe2)
+    assert (trig_cache.hits, trig_cache.misses) == (hits + 1, misses)
+    assert np.allclose(xd2, xd * 50.0 / 60.0)
+
+    # A mask leaves the angles unchanged: the renderings of a masked line hit the cache
+    mask = elev > 0
+    mask[5:8] = False
+    plottable2.kwargs["mask"] = mask
+    for _ in range(3):
+        xd3, yd3, _, _, _, _ = plottable2._make_mline(axe2)
+    assert (trig_cache.hits, trig_cache.misses) == (hits + 4, misses)
+    assert np.all(np.isnan(xd3[5:8])) and np.allclose(xd3[8:], xd2[8:])
+
+    # The angles with breaks are new arrays at each rendering, that are not cached
+    plottable2.kwargs["max_dt"] = 5.0
+    plottable2._make_mline(axe2)
+    assert (trig_cache.hits, trig_cache.misses) == (hits + 4, misses)
+
+    # A modified variable is not given its former tables
+    xvar = plottable.data_source.xvar
+    xvar.data[:] = 0.0
+    xvar.invalidate()
+    xd, yd, _, _, _, _ = plottable._make_mline(axe)
+    assert np.allclose(xd, 0.0) and np.allclose(yd, 60.0)
+
+    axe = fig.add_axe("Polar", spec=gs[0, 2], projection=AxeProjection.POLAR)
+    theta = np.array([0.0, np.pi / 2])
+    plottable = axe.plot((theta, np.array([2.0, 3.0])))
+    xd, yd, _, _, _, _ = plottable._make_mline(axe)
+    assert np.allclose(xd, [2.0, 0.0])
+    assert np.allclose(yd, [0.0, 3.0])
+
+
+def test_trig_cache_bytes():
+    # Room for the tables of two variables of 1000 angles
+    cache = TrigCache(maxbytes=2 * 2 * 8000)
+    angles = [GVariable(data=np.linspace(0, 1, 1000) + k) for k in range(3)]
+    for a in angles:
+        cache.get(a)
+    assert cache.nbytes == 2 * 2 * 8000
+    cache.get(angles[2])
+    cache.get(angles[0])
+    assert (cache.hits, cache.misses) == (1, 4)
+
+    # Too large to be cached
+    cache.get(GVariable(data=np.zeros(10_000)))
+    assert cache.nbytes <= cache.maxbytes
+    cache.discard(angles[0])
+    cache.discard(angles[2])
+    assert cache.nbytes == 0
+
+
+if __name__ == "__main__":
+    test_north_polar()
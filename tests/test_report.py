@@ -0,0 +1,52 @@
+import re
+import json
+import base64
+
+import numpy as np
+
+from soyut.frontend.BFigure import BFigure
+from soyut.backend.HtmlReport import HtmlReport
+from soyut.backend.PlotlyDictRenderer import dict_plotly_renderer, figure_html
+
+
+T = np.linspace(0, 10, 5000)
+
+
+def _make_figure(k: int) -> BFigure:
+    fig = BFigure(f"Figure </script> {k}")
+    gs = fig.add_gridspec(nrows=1, ncols=2)
+    axe = fig.add_axe("Sin", spec=gs[0, 0])
+    axe.plot(({"data": T, "name": "Time", "unit": "s"}, {"data": np.sin(k * T), "name": "Y"}))
+    axe = fig.add_axe("Cos", spec=gs[0, 1])
+    axe.plot(({"data": T, "name": "Time", "unit": "s"}, {"data": np.cos(k * T), "name": "Y"}))
+    return fig
+
+
+def _script(page: str, id: str):
+    (content,) = re.findall(f'<script type="application/json" id="{id}">(.*?)</script>', page)
+    return json.loads(content)
+
+
+def test_report(tmp_path):
+    nfig = 20
+    report = HtmlReport("Report", include_plotlyjs=True)
+    for k in range(nfig):
+        assert report.add(_make_figure(k)) == k
+    page = report.write(tmp_path / "report.html").read_text()
+
+    # One time base, shared by all the traces, and k=0 gives sin = 0 and cos = 1
+    assert len(report.blocks) == 1 + 2 * nfig
+    assert page.count("<script") == 5
+    assert page.count('class="soyut-figure"') == nfig
+
+    single = figure_html(dict_plotly_renderer(_make_figure(1)), include_plotlyjs=True)
+    assert "Figure </script> 1" not in single
+    assert len(page) < 3 * len(single)
+
+    blocks = _script(page, "soyut-blocks")
+    figures = _script(page, "soyut-figures")
+    assert figures[3]["layout"]["title"]["text"] == "Figure </script> 3"
+    trace = figures[3]["data"][1]
+    y = np.frombuffer(base64.b64decode(blocks[trace["y"]["$ref"]]["bdata"]), dtype="<f8")
+    assert np.allclose(y, np.cos(3 * T))
+    assert trace["x"] == figures[5]["data"][0]["x"]
@@ -0,0 +1,139 @@
+import os
+import stat
+import threading
+
+import numpy as np
+import pytest
+
+from soyut.frontend.BFigure import BFigure
+from soyut.frontend.GraphicSpec import FigureSpec
+from soyut.backend.AsyncRenderer import RenderQueueFull
+from soyut.backend.RenderServer import RenderClient, RenderJob, RenderServer, main
+
+
+def make_spec():
+    return FigureSpec.specForOneAxeMultiLines(
+        [{"var": "sin", "label": "sine"}, {"var": "cos", "linestyle": "--"}]
+    )
+
+
+def test_from_spec():
+    t = np.linspace(0, 1, 100)
+    data = {"t": t, "sin": np.sin(t), "cos": np.cos(t)}
+    fig = BFigure.from_spec(make_spec(), data, units={"t": "s"})
+
+    (axe,) = fig.list_axes
+    p_sin, p_cos = axe.list_plottables
+    assert p_sin.name == "sine"
+    assert p_cos.kwargs == {"linestyle": "--"}
+    # The X variable is shared by the lines
+    assert p_sin.data_source.xvar is p_cos.data_source.xvar
+    assert p_sin.data_source.xvar.unit == "s"
+
+
+@pytest.mark.parametrize("unix", [False, True])
+def test_render_server(tmp_path, unix):
+    t = np.linspace(0, 1, 100)
+    fig = BFigure("Served")
+    gs = fig.add_gridspec(nrows=1, ncols=1)
+    axe = fig.add_axe("Axe", spec=gs[0, 0])
+    axe.plot((t, np.sin(t)))
+
+    port = None if unix else 0
+    server = RenderServer(port=port, max_workers=2, warm=["mpl"])
+    server.start()
+    try:
+        if unix:
+            assert stat.S_IMODE(os.stat(server.url).st_mode) == 0o600
+            assert stat.S_IMODE(os.stat(os.path.dirname(server.url)).st_mode) == 0o700
+        else:
+            # On TCP, the requests without the token are rejected
+            assert server.url.startswith("http://")
+            with pytest.raises(PermissionError):
+                RenderClient(server.url, timeout=30).render(fig)
+            with pytest.raises(PermissionError):
+                RenderClient(server.url, timeout=30, token="wrong").metrics()
+        client = RenderClient(server.url, timeout=30, token=server.token)
+
+        png = client.render(fig)
+        assert png.startswith(b"\x89PNG")
+
+        job = RenderJob(
+            spec=make_spec(),
+            data={"t": t, "sin": np.sin(t), "cos": np.cos(t)},
+            backend="plotly",
+            format="json",
+        )
+        assert client.submit(job).startswith(b"{")
+
+        path = client.export(fig, tmp_path / "served.svg")
+        assert path.exists()
+
+        with pytest.raises(RuntimeError):
+            client.submit(RenderJob())
+
+        metrics = client.metrics()
+        assert metrics["completed"] == 3
+        assert metrics["failed"] == 1
+        assert metrics["queue_depth"] == 0
+        assert metrics["latency"]["max"] > 0
+
+        server.max_queue = 0
+        with pytest.raises(RenderQueueFull):
+            client.render(fig)
+    finally:
+        server.shutdown()
+    if unix:
+        assert not os.path.exists(os.path.dirname(server.url))
+
+
+def test_max_queue():
+    server = RenderServer(max_workers=1, max_queue=2, warm=[])
+    gate = threading.Event()
+    job = RenderJob()
+    job.run = gate.wait
+    server.start()
+    try:
+        # The first job runs, and blocks the thread
+        first = server.submit(job)
+        barrier = threading.Barrier(8)
+        accepted = []
+
+        def submit():
+            barrier.wait()
+            try:
+                accepted.append(server.submit(job))
+            except RenderQueueFull:
+                pass
+
+        threads = [threading.Thread(target=submit) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert 1 <= len(accepted) <= 2
+        assert server.metrics()["rejected"] == 8 - len(accepted)
+    finally:
+        gate.set()
+        server.shutdown()
+    assert first.result()
+
+
+def test_cli(tmp_path):
+    import pickle
+
+    fig = BFigure("CLI")
+    gs = fig.add_gridspec(nrows=1, ncols=1)
+    axe = fig.add_axe("Axe", spec=gs[0, 0])
+    axe.plot((np.arange(10.0), np.arange(10.0)))
+    inp = tmp_path / "fig.pkl"
+    inp.write_bytes(pickle.dumps(fig))
+
+    socket_path = str(tmp_path / "render.sock")
+    server = RenderServer(socket_path=socket_path, warm=[])
+    server.start()
+    try:
+        assert main(["--socket", socket_path, "render", str(inp), "--format", "svg"]) == 0
+        assert (tmp_path / "fig.svg").exists()
+    finally:
+        server.shutdown()
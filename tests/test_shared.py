@@ -0,0 +1,113 @@
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from soyut.frontend.BFigure import BFigure
+from soyut.backend.AsyncRenderer import AsyncRenderer
+from soyut.backend.SharedTransport import SharedArrayTransport, loads
+
+
+def _make_figure() -> BFigure:
+    x = np.linspace(0, 100, 100000)
+    fig = BFigure("Shared")
+    gs = fig.add_gridspec(nrows=1, ncols=2)
+    axe = fig.add_axe("Sin", spec=gs[0, 0])
+    axe.plot(({"data": x, "unit": "m"}, {"data": np.sin(x)}))
+    axe = fig.add_axe("Cos", spec=gs[0, 1])
+    axe.plot(({"data": x, "unit": "m"}, {"data": np.cos(x)}))
+    return fig
+
+
+def _sum_data(fig: BFigure, shared: bool = False) -> float:
+    total = 0.0
+    for axe in fig.list_axes:
+        for plottable in axe.list_plottables:
+            yvar = plottable.data_source.yvar
+            # The shared arrays are read-only views of the segments
+            assert yvar.data.flags.writeable != shared
+            total += float(np.sum(yvar.data))
+    return total
+
+
+def test_payload_shares_arrays():
+    fig = _make_figure()
+    with SharedArrayTransport() as transport:
+        p1 = transport.dumps(fig)
+        p2 = transport.dumps(fig)
+        # The X variable is interned: x, sin(x) and cos(x) are copied once
+        assert len(transport) == 3
+        assert p1.names == p2.names
+        assert len(p1.data) < 100000
+
+        copy = loads(p1)
+        assert _sum_data(copy, True) == pytest.approx(_sum_data(fig))
+        del copy
+
+        transport.release(p1)
+        assert len(transport) == 3
+        transport.release(p2)
+        assert len(transport) == 0
+        for name in p1.names:
+            with pytest.raises(FileNotFoundError):
+                shared_memory.SharedMemory(name=name)
+
+
+def test_modified_in_place():
+    fig = _make_figure()
+    yvar = fig.list_axes[0].list_plottables[0].data_source.yvar
+    with SharedArrayTransport() as transport:
+        p1 = transport.dumps(fig)
+        yvar.data[:] += 1.0
+        yvar.invalidate()
+        p2 = transport.dumps(fig)
+        # Only the modified array is copied again, the payload sent before keeps its data
+        assert len(transport) == 4
+        assert len(set(p1.names) & set(p2.names)) == 2
+
+        old = loads(p1).list_axes[0].list_plottables[0].data_source.yvar.data
+        new = loads(p2).list_axes[0].list_plottables[0].data_source.yvar.data
+        assert np.array_equal(new, yvar.data)
+        assert np.array_equal(old + 1.0, yvar.data)
+        del old, new
+
+        transport.release(p1)
+        transport.release(p2)
+        assert len(transport) == 0
+
+
+def test_concurrent_release():
+    fig = _make_figure()
+    with SharedArrayTransport() as transport:
+
+        def work():
+            for _ in range(20):
+                transport.release(transport.dumps(fig))
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(transport) == 0
+
+
+def test_process_pool():
+    fig = _make_figure()
+    with SharedArrayTransport() as transport:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            futures = [transport.submit(executor, _sum_data, fig, True) for _ in range(3)]
+            results = [fut.result() for fut in futures]
+        assert results == [pytest.approx(_sum_data(fig))] * 3
+        assert len(transport) == 0
+
+
+def test_async_processes():
+    async def main():
+        async with AsyncRenderer(max_workers=1, use_processes=True) as renderer:
+            return await renderer.render(_make_figure(), format="png")
+
+    assert asyncio.run(main()).startswith(b"\x89PNG")
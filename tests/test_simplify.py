@@ -0,0 +1,60 @@
+import numpy as np
+
+from soyut.frontend.BFigure import BFigure
+from soyut.backend.FigurePreparation import simplification_tolerance
+from soyut.backend.MplRenderer import simple_mpl_renderer
+from soyut.backend.PlotlyRenderer import simple_plotly_renderer
+from soyut.instrumentation import trace
+from soyut.utils import simplify_rdp
+
+
+def _distance_to_polyline(x, y, xs, ys):
+    # Distance of each point (x, y) to the segment of (xs, ys) spanning its abscissa
+    j = np.clip(np.searchsorted(xs, x, side="right") - 1, 0, len(xs) - 2)
+    dx = xs[j + 1] - xs[j]
+    dy = ys[j + 1] - ys[j]
+    return np.abs(dx * (y - ys[j]) - dy * (x - xs[j])) / np.hypot(dx, dy)
+
+
+def test_simplify_rdp():
+    rng = np.random.default_rng(seed=4)
+    x = np.linspace(0, 1000, 20_000)
+    y = 100 * np.sin(x / 50) + rng.normal(scale=0.1, size=len(x))
+    y[5000] = np.nan
+
+    keep = simplify_rdp(x, y, tolerance=1.0)
+    assert len(keep) < len(x) / 20
+    assert 5000 in keep and 4999 in keep and 5001 in keep
+    assert keep[0] == 0 and keep[-1] == len(x) - 1
+
+    # Each segment between breaks stays within the tolerance
+    for sl in (slice(0, 5000), slice(5001, None)):
+        k = keep[(keep >= (sl.start or 0)) & (keep < (sl.stop or len(x)))]
+        d = _distance_to_polyline(x[sl], y[sl], x[k], y[k])
+        assert d.max() <= 1.0 + 1e-9
+
+
+def test_vector_export(tmp_path):
+    x = np.linspace(0, 100, 100_000)
+    fig = BFigure("Export")
+    gs = fig.add_gridspec(nrows=1, ncols=1)
+    axe = fig.add_axe("Axe", spec=gs[0, 0])
+    axe.plot((x, np.sin(x)), name="sin")
+
+    with trace() as tracer:
+        mfig = simple_mpl_renderer(fig, show=False, path=tmp_path / "fig.svg", workers=1)
+    (simplify,) = [rec for rec in tracer.records if rec["name"] == "simplify"]
+    assert simplify["args"]["vertices_in"] == len(x)
+    assert simplify["args"]["vertices_out"] < len(x) / 10
+    assert len(mfig.axes[0].lines[0].get_xdata()) == simplify["args"]["vertices_out"]
+
+    # Raster outputs are not simplified
+    mfig = simple_mpl_renderer(fig, show=False, path=tmp_path / "fig.png")
+    assert len(mfig.axes[0].lines[0].get_xdata()) == len(x)
+
+    pfig = simple_plotly_renderer(fig, show=False, simplify=0.5)
+    assert len(pfig.data[0].x) < len(x) / 10
+
+    # Nor the interactive HTML pages, that can be zoomed in
+    assert simplification_tolerance(tmp_path / "fig.html") == 0.0
+    assert simplification_tolerance(tmp_path / "fig.pdf") > 0.0
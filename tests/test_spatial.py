@@ -0,0 +1,70 @@
+import numpy as np
+
+from soyut.frontend.BFigure import BFigure
+from soyut.frontend.GSpatialIndex import GridIndex, SortedXIndex
+
+
+def test_grid_index():
+    rng = np.random.default_rng(seed=12)
+    x = rng.normal(scale=10.0, size=20_000)
+    y = rng.normal(scale=0.1, size=20_000)
+    x[5] = np.nan
+    idx = GridIndex(x, y)
+
+    # Distances normalized by the range of each coordinate
+    xn = (x - np.nanmin(x)) / (np.nanmax(x) - np.nanmin(x))
+    yn = (y - np.nanmin(y)) / (np.nanmax(y) - np.nanmin(y))
+    for qx, qy in [(0.0, 0.0), (25.0, -0.3), (-100.0, 1.0), (x[5], 0.0)]:
+        if np.isnan(qx):
+            continue
+        qxn = (qx - np.nanmin(x)) / (np.nanmax(x) - np.nanmin(x))
+        qyn = (qy - np.nanmin(y)) / (np.nanmax(y) - np.nanmin(y))
+        i = idx.nearest(qx, qy)
+        assert i == np.nanargmin((xn - qxn) ** 2 + (yn - qyn) ** 2)
+
+    # Queries far from the points, in empty corners of the grid, with small blocks
+    idx4 = GridIndex(x, y, block=4)
+    for qx, qy in rng.uniform([-40, -0.4], [40, 0.4], size=(50, 2)):
+        qxn = (qx - np.nanmin(x)) / (np.nanmax(x) - np.nanmin(x))
+        qyn = (qy - np.nanmin(y)) / (np.nanmax(y) - np.nanmin(y))
+        expected = np.nanargmin((xn - qxn) ** 2 + (yn - qyn) ** 2)
+        assert idx.nearest(qx, qy) == expected
+        assert idx4.nearest(qx, qy) == expected
+
+    sel = idx.in_box(-5.0, 5.0, 0.0, 0.05)
+    expected = np.flatnonzero((x >= -5) & (x <= 5) & (y >= 0) & (y <= 0.05))
+    assert np.array_equal(sel, expected)
+
+    assert GridIndex(np.empty(0), np.empty(0)).nearest(0, 0) == -1
+
+
+def test_sorted_index():
+    x = np.array([0.0, 1.0, 1.0, 3.0, np.nan, 5.0])
+    y = np.array([0.0, 1.0, 2.0, 3.0, 4.0, 5.0])
+    idx = SortedXIndex(x, y)
+    assert idx.nearest(2.1, 0.0) == 3
+    assert idx.nearest(-1.0, 0.0) == 0
+    assert idx.nearest(10.0, 0.0) == 5
+    assert idx.in_box(0.5, 4.0, 1.5, 3.0).tolist() == [2, 3]
+
+
+def test_plottable_index():
+    t = np.linspace(0, 10, 1001)
+    fig = BFigure("Index")
+    gs = fig.add_gridspec(nrows=1, ncols=1)
+    axe = fig.add_axe("Axe", spec=gs[0, 0])
+    line = axe.plot((t, np.sin(t)))
+    cloud = axe.scatter((np.cos(t), np.sin(t)))
+    axe.set_xlim(2, 3)
+
+    idx = line.spatialIndex(axe)
+    assert isinstance(idx, SortedXIndex)
+    # The whole line is indexed, whatever the limits of the axe
+    assert idx.nearest(7.0, 0.0) == 700
+    assert line.spatialIndex(axe) is idx
+
+    assert isinstance(cloud.spatialIndex(axe), GridIndex)
+    assert cloud.spatialIndex(axe).nearest(1.0, 0.0) == 0
+
+    line.data_source.yvar.data = np.cos(t)
+    assert line.spatialIndex(axe) is not idx
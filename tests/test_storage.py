@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from soyut.frontend.BFigure import BFigure
+from soyut.frontend.GPlottable import GVariable
+from soyut.frontend.GStorage import CompactArray, StoragePolicy
+from soyut.backend.FigurePreparation import prepare_figure
+
+
+@pytest.fixture
+def compact_storage():
+    GVariable.default_storage = StoragePolicy(dtype="int16")
+    yield GVariable.default_storage
+    GVariable.default_storage = None
+
+
+def test_time_axis():
+    # Over an hour, timestamps around 1.7e9 s keep a resolution of 0.24 ms
+    t = 1.7e9 + np.arange(0, 3600, 0.01)
+    var = GVariable(data=t, name="t", unit="s", storage=StoragePolicy())
+    assert isinstance(var.data, CompactArray)
+    assert var.nbytes == t.nbytes // 2
+    assert var.float_data.dtype == np.float64
+    assert np.max(np.abs(var.float_data - t)) < 1e-3
+
+
+def test_compact_figure(compact_storage):
+    t = np.arange(100_000.0) * 1e-2
+    y = np.sin(t) * 1e-3
+    y[10] = np.nan
+
+    fig = BFigure("Compact")
+    gs = fig.add_gridspec(nrows=1, ncols=1)
+    axe = fig.add_axe("Axe", spec=gs[0, 0])
+    p = axe.plot(({"data": t, "name": "t", "unit": "s"}, {"data": y, "name": "y", "unit": "m"}))
+
+    xvar, yvar = p.data_source.xvar, p.data_source.yvar
+    # The time axis is stored relative to its first value, in float32
+    assert isinstance(xvar.data, CompactArray)
+    assert xvar.nbytes == t.nbytes // 2
+    assert np.max(np.abs(xvar.float_data - t)) < 1e-4
+    assert yvar.nbytes == y.nbytes // 4
+    assert yvar.stats.nan_count == 1
+
+    ((line,),) = prepare_figure(fig, workers=1)
+    assert line.yd.dtype == np.float32
+    assert line.ylabel == "y (mm)"
+    # Quantization error of 2e-3 m over 65535 levels, in mm
+    assert np.nanmax(np.abs(line.yd - y * 1e3)) < 2e-5
+    assert np.isnan(line.yd[10])
+
+
+def test_abscissa_exact(compact_storage):
+    x = np.arange(1e6) + 1e6
+    fig = BFigure("Exact X")
+    gs = fig.add_gridspec(nrows=1, ncols=1)
+    axe = fig.add_axe("Axe", spec=gs[0, 0])
+    p = axe.plot((x, np.random.default_rng(seed=1).uniform(size=len(x))))
+    q = axe.plot(np.arange(1000.0))
+
+    # Not quantized by the integer storage
+    assert not isinstance(p.data_source.xvar.data, CompactArray)
+    assert np.array_equal(p.data_source.xvar.float_data, x)
+    assert isinstance(p.data_source.yvar.data, CompactArray)
+    assert len(np.unique(q.data_source.xvar.float_data)) == 1000
+
+    # In float32, relative to the first value
+    xvar = GVariable(data=x, storage=StoragePolicy(), abscissa=True)
+    assert xvar.nbytes == x.nbytes // 2
+    assert np.array_equal(xvar.float_data, x)
+
+
+def test_decoded_not_kept(compact_storage):
+    var = GVariable(data=np.linspace(0, 1, 1000))
+    fd = var.float_data
+    # Decoded at each call: the variable only holds the compact data
+    assert var.float_data is not fd
+    assert np.array_equal(var.float_data, fd)
+    assert var.float_window(slice(10, 20)).shape == (10,)
+    assert var.stats.size == 1000
@@ -0,0 +1,30 @@
+import numpy as np
+
+from soyut.frontend.GraphicSpec import FigureSpec
+from soyut.backend.MplTemplate import FigureTemplate
+
+
+def test_template(tmp_path):
+    spec = FigureSpec.specForOneAxeMultiLines([{"var": "y", "linestyle": "--"}, {"var": "z"}])
+    tpl = FigureTemplate(spec, units={"t": "s", "y": "m", "z": "m"})
+    (maxe,) = tpl.maxes
+    line_y, line_z = tpl.artists[0]
+
+    t = np.linspace(0, 1, 50)
+    png = tpl.render({"t": t, "y": t**2, "z": -t})
+    assert png.startswith(b"\x89PNG")
+    assert line_y.get_linestyle() == "--"
+    assert np.array_equal(line_y.get_ydata(), t**2)
+
+    # New run: same artists, new data, new unit multiplier and limits
+    path = tpl.render({"t": t, "y": t * 1e-3, "z": -t * 1e-3}, path=tmp_path / "run.png")
+    assert path.exists()
+    assert tpl.artists[0][0] is line_y
+    assert np.allclose(line_y.get_ydata(), t)
+    assert maxe.get_ylabel() == "z (mm)"
+    ymin, ymax = maxe.get_ylim()
+    assert -2 < ymin <= -1 and 1 <= ymax < 2
+
+    # Variables not given keep their data
+    tpl.render({"z": -t})
+    assert np.allclose(line_z.get_ydata(), -t)
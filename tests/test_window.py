@@ -0,0 +1,81 @@
+import numpy as np
+
+from soyut.frontend.BFigure import BFigure
+from soyut.frontend.GPlottable import GVariable
+from soyut.frontend.GStorage import StoragePolicy
+
+
+def test_monotonic():
+    assert GVariable(data=np.arange(5.0)).monotonic == 1
+    assert GVariable(data=np.arange(5)[::-1]).monotonic == -1
+    assert GVariable(data=np.array([0.0, 2.0, 1.0])).monotonic == 0
+    assert GVariable(data=np.array([0.0, np.nan, 1.0])).monotonic == 0
+
+    var = GVariable(data=np.arange(5.0))
+    assert var.monotonic == 1
+    var.data = np.array([1.0, 0.0, 2.0])
+    assert var.monotonic == 0
+
+
+def test_window():
+    x = GVariable(data=np.arange(100.0))
+    assert x.window(10.5, 20.0) == slice(10, 22)
+    assert x.window(None, 1.0) == slice(0, 3)
+    assert x.window(98.5, None) == slice(98, 100)
+    assert x.window(200.0, 300.0) == slice(99, 100)
+    # Limits of an inverted axis
+    assert x.window(20.0, 10.5) == slice(10, 22)
+
+    unsorted = GVariable(data=np.array([3.0, 1.0, 2.0]))
+    assert unsorted.window(1.5, 2.5) == slice(0, 3)
+
+    for dtype in ("float32", "int16"):
+        c = GVariable(data=np.linspace(0, 99, 100), storage=StoragePolicy(dtype=dtype))
+        sl = c.window(10.5, 20.0)
+        assert sl.start <= 10 and sl.stop >= 21
+        assert sl.stop - sl.start <= 14
+        assert np.allclose(c.float_window(sl), c.float_data[sl], atol=1e-2)
+
+
+def test_make_line_window():
+    t = np.linspace(0, 100, 10001)
+    fig = BFigure("Zoom")
+    gs = fig.add_gridspec(nrows=2, ncols=1)
+    axe = fig.add_axe("Sorted", spec=gs[0, 0])
+    p = axe.plot((t, np.sin(t)), transform=np.abs)
+    axe.set_xlim(10.0, 20.0)
+
+    xd, yd, *_ = p._make_mline(axe)
+    assert len(xd) == 1003
+    assert xd[0] < 10.0 <= xd[1] and xd[-2] <= 20.0 < xd[-1]
+    assert np.array_equal(yd, np.abs(np.sin(xd)))
+
+    # The statistics are the ones of the whole line, whatever the X limits
+    xs, ys = p.getStats(axe)
+    assert (xs.min, xs.max) == (0.0, 100.0)
+    axe.set_xlim(20.0, 10.0)
+    assert len(p._make_mline(axe)[0]) == 1003
+    axe.set_xlim(50.0, 60.0)
+    assert p.getStats(axe)[0].max == 100.0
+
+    # Unsorted X: the whole line is kept
+    axe = fig.add_axe("Unsorted", spec=gs[1, 0])
+    q = axe.plot((np.sin(t), t))
+    axe.set_xlim(0.0, 0.5)
+    xd, yd, *_ = q._make_mline(axe)
+    assert len(xd) == len(t)
+
+
+def test_multiline_window():
+    t = np.linspace(0, 100, 10001)
+    channels = np.vstack([np.sin(t), np.cos(t)])
+    fig = BFigure("Zoom")
+    gs = fig.add_gridspec(nrows=1, ncols=1)
+    axe = fig.add_axe("Channels", spec=gs[0, 0])
+    p = axe.plot_lines(channels.T, x=t)
+    axe.set_xlim(10.0, 20.0)
+
+    xd, yd, *_ = p._make_mline(axe)
+    assert yd.shape == (len(xd), 2)
+    assert np.shares_memory(yd, channels)
+    assert np.array_equal(yd[:, 1], np.cos(xd))